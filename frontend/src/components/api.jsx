@@ -1,8 +1,10 @@
 // api.js
 import axios from "axios";
 
+const BASE_URL = "http://127.0.0.1:8000";
+
 const api = axios.create({
-  baseURL: "http://127.0.0.1:8000",
+  baseURL: BASE_URL,
 });
 
 api.interceptors.request.use(config => {
@@ -11,4 +13,51 @@ api.interceptors.request.use(config => {
   return config;
 }, error => Promise.reject(error));
 
-export default api;
\ No newline at end of file
+// El access token dura poco: ante un 401 se canjea el refresh token por un par
+// nuevo y se reintenta la request una vez. El refresh token rota en cada uso y
+// reusar uno viejo revoca la sesión, así que las requests que fallan juntas
+// comparten un único refresh en curso.
+let refrescando = null;
+
+const refrescarToken = () => {
+  if (!refrescando) {
+    const refreshToken = localStorage.getItem("refreshToken");
+    refrescando = (refreshToken
+      ? axios.post(`${BASE_URL}/usuarios/token/refresh`, { refresh_token: refreshToken })
+      : Promise.reject(new Error("Sin refresh token"))
+    )
+      .then(res => {
+        localStorage.setItem("accessToken", res.data.token);
+        localStorage.setItem("refreshToken", res.data.refresh_token);
+        return res.data.token;
+      })
+      .finally(() => { refrescando = null; });
+  }
+  return refrescando;
+};
+
+const cerrarSesionLocal = () => {
+  ["id", "username", "email", "rol", "accessToken", "refreshToken", "emprendimiento_id"]
+    .forEach(clave => localStorage.removeItem(clave));
+  window.location.assign("/login");
+};
+
+api.interceptors.response.use(response => response, async error => {
+  const original = error.config;
+  const esLogin = original?.url?.includes("/usuarios/login");
+  if (error.response?.status !== 401 || !original || original._reintento || esLogin) {
+    return Promise.reject(error);
+  }
+  original._reintento = true;
+  try {
+    const token = await refrescarToken();
+    original.headers.Authorization = `Bearer ${token}`;
+    return api(original);
+  } catch {
+    // Refresh vencido, revocado o inexistente: hay que volver a loguear
+    cerrarSesionLocal();
+    return Promise.reject(error);
+  }
+});
+
+export default api;
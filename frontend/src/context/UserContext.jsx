@@ -64,7 +64,11 @@ export const UserProvider = ({ children }) => {
 
   const logout = async () => {
     try {
-      await axios.post("http://127.0.0.1:8000/api/logout/");
+      // Revoca el refresh token: sin esto la sesión se podría seguir renovando
+      const refreshToken = localStorage.getItem("refreshToken");
+      if (refreshToken) {
+        await axios.post("http://127.0.0.1:8000/usuarios/logout", { refresh_token: refreshToken });
+      }
     } catch (error) {
       console.error("Error al cerrar sesión:", error);
     }
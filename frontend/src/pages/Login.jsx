@@ -39,7 +39,7 @@ export const Login = () => {
         email: userBackend.email,
         rol: userBackend.rol || "cliente",
         accessToken: res.data.token,
-        refreshToken: res.data.token,
+        refreshToken: res.data.refresh_token,
       });
 
       navigate("/");
@@ -0,0 +1,152 @@
+# app/auditoria.py
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+
+from app.utils.tiempo import ahora_utc
+
+# Log de acceso/auditoría en JSON (una línea por request). Los handlers sólo
+# encolan el registro (QueueHandler, sin I/O); un QueueListener en otro thread
+# lo formatea y lo escribe con rotación por tamaño. Si la cola se llena (disco
+# lento) se descartan registros y se cuentan, antes que frenar requests.
+LOG_ACCESO_ARCHIVO = os.getenv("LOG_ACCESO_ARCHIVO", "logs/acceso.jsonl")
+LOG_ACCESO_MAX_BYTES = int(os.getenv("LOG_ACCESO_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_ACCESO_BACKUPS = int(os.getenv("LOG_ACCESO_BACKUPS", "5"))
+LOG_ACCESO_COLA = 10_000  # registros pendientes de escribir
+
+logger = logging.getLogger("turnera.acceso")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+
+# datos de la request en curso; el dict se comparte con el threadpool (el
+# contextvar se copia, el objeto es el mismo), así que get_current_user o un
+# handler sync pueden anotar y el middleware lo ve al terminar
+_contexto: ContextVar[Optional[Dict]] = ContextVar("auditoria_contexto", default=None)
+
+descartados = 0
+
+
+class _FormatoJSON(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(
+            {"tipo": record.getMessage(), **getattr(record, "datos", {})},
+            ensure_ascii=False, default=str,
+        )
+
+
+class _QueueHandlerSinBloqueo(logging.handlers.QueueHandler):
+    def enqueue(self, record: logging.LogRecord) -> None:
+        global descartados
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            descartados += 1
+
+
+_cola: "queue.Queue[logging.LogRecord]" = queue.Queue(LOG_ACCESO_COLA)
+logger.addHandler(_QueueHandlerSinBloqueo(_cola))
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def iniciar() -> None:
+    """Arranca el thread que escribe el archivo (lifespan de la app)."""
+    global _listener
+    if _listener is not None:
+        return
+    directorio = os.path.dirname(LOG_ACCESO_ARCHIVO)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    archivo = logging.handlers.RotatingFileHandler(
+        LOG_ACCESO_ARCHIVO, maxBytes=LOG_ACCESO_MAX_BYTES,
+        backupCount=LOG_ACCESO_BACKUPS, encoding="utf-8",
+    )
+    archivo.setFormatter(_FormatoJSON())
+    _listener = logging.handlers.QueueListener(_cola, archivo)
+    _listener.start()
+
+
+def detener() -> None:
+    """Escribe lo pendiente y cierra el archivo."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for h in _listener.handlers:
+        h.close()
+    _listener = None
+
+
+# =========================================================
+# Anotaciones desde el código de la request
+# =========================================================
+def anotar_usuario(usuario_id: int) -> None:
+    ctx = _contexto.get()
+    if ctx is not None:
+        ctx["usuario_id"] = usuario_id
+
+
+def evento(accion: str, **datos) -> None:
+    """Evento de auditoría (p. ej. reserva creada) asociado a la request en curso."""
+    ctx = _contexto.get()
+    if ctx is not None:
+        ctx["eventos"].append({"accion": accion, **datos})
+
+
+def instrumentar_engine(engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _contar_sql(conn, cursor, statement, parameters, context, executemany):
+        ctx = _contexto.get()
+        if ctx is not None:
+            ctx["sql"] += 1
+
+
+# =========================================================
+# Middleware
+# =========================================================
+class AuditoriaMiddleware:
+    """Middleware ASGI puro: una línea JSON por request al terminar la respuesta."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        ctx = {"usuario_id": None, "sql": 0, "eventos": []}
+        token = _contexto.set(ctx)
+        status = 500
+        inicio = time.perf_counter()
+
+        async def send_con_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_con_status)
+        finally:
+            _contexto.reset(token)
+            ruta = scope.get("route")
+            datos = {
+                "ts": ahora_utc().isoformat() + "Z",
+                "metodo": scope["method"],
+                "ruta": getattr(ruta, "path", scope["path"]),  # plantilla, ej. /turnos/{turno_id}
+                "path": scope["path"],
+                "status": status,
+                "latencia_ms": round((time.perf_counter() - inicio) * 1000, 2),
+                "usuario_id": ctx["usuario_id"],
+                "ip": scope["client"][0] if scope.get("client") else None,
+                "sql": ctx["sql"],
+            }
+            if ctx["eventos"]:
+                datos["eventos"] = ctx["eventos"]
+            logger.info("acceso", extra={"datos": datos})
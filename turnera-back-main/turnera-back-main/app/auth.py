@@ -1,18 +1,31 @@
 # app/auth.py
+import hashlib
+import os
+import secrets
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 
 import jwt
 from fastapi import HTTPException, Depends, Request
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
 from app.dependencies import get_db
-from app import models
+from app import auditoria, models
+from app.crud import consultas
+from app.utils.tiempo import ahora_utc
 
 # ⚠️ en producción, usá variables de entorno
 SECRET_KEY = "change-me-in-env"
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24h
+# Access token corto + refresh token rotativo: renovar cuesta un lookup por
+# índice en vez de un bcrypt.checkpw en /login.
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DIAS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DIAS", "30"))
+
+# Admins (profiling, etc.): por id de usuario, no por rol, porque el rol lo elige
+# el propio usuario al registrarse. Ej.: ADMIN_IDS="1,7"
+ADMIN_IDS = {int(x) for x in os.getenv("ADMIN_IDS", "").split(",") if x.strip().isdigit()}
 
 def create_access_token(payload: Dict, expires_delta: Optional[timedelta] = None) -> str:
     data = payload.copy()
@@ -49,7 +62,110 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> models.
     except ValueError:
         raise HTTPException(status_code=401, detail="Token inválido")
 
-    usuario = db.query(models.Usuario).filter(models.Usuario.id == user_id).first()
+    usuario = consultas.usuario_por_id(db, user_id)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    auditoria.anotar_usuario(usuario.id)
     return usuario
+
+def get_admin_user(current_user: models.Usuario = Depends(get_current_user)) -> models.Usuario:
+    if current_user.id not in ADMIN_IDS:
+        raise HTTPException(status_code=403, detail="Solo administradores")
+    return current_user
+
+def usuario_de_token(authorization: Optional[str]) -> Optional[int]:
+    """Para middlewares (sin DB): id del usuario de un header Authorization con un JWT válido."""
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    try:
+        sub = decode_token(authorization.split(" ", 1)[1]).get("sub")
+        return int(sub) if sub is not None else None
+    except (jwt.InvalidTokenError, ValueError):
+        return None
+
+def token_es_admin(authorization: Optional[str]) -> bool:
+    """Para middlewares (sin DB): header Authorization con un JWT válido de un admin."""
+    return bool(ADMIN_IDS) and usuario_de_token(authorization) in ADMIN_IDS
+
+
+# =========================================================
+# Refresh tokens
+# =========================================================
+def _hash_refresh(token: str) -> str:
+    # el token es aleatorio de 256 bits: alcanza con SHA-256, no hace falta bcrypt
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def crear_refresh_token(db: Session, usuario_id: int, familia: Optional[str] = None) -> str:
+    """Agrega el registro a la sesión (no hace commit) y devuelve el token en claro."""
+    token = secrets.token_urlsafe(32)
+    ahora = ahora_utc()
+    db.add(models.RefreshToken(
+        usuario_id=usuario_id,
+        token_hash=_hash_refresh(token),
+        familia=familia or secrets.token_hex(16),
+        creado=ahora,
+        expira=ahora + timedelta(days=REFRESH_TOKEN_EXPIRE_DIAS),
+    ))
+    return token
+
+
+def _revocar_familia(db: Session, familia: str) -> None:
+    db.execute(
+        update(models.RefreshToken)
+        .where(models.RefreshToken.familia == familia, models.RefreshToken.revocado.is_(None))
+        .values(revocado=ahora_utc())
+    )
+
+
+def rotar_refresh_token(db: Session, token: str) -> Tuple[models.Usuario, str]:
+    """
+    Canjea un refresh token por uno nuevo de la misma familia (hace commit).
+    Si el token ya se había usado o estaba revocado se revoca toda la familia:
+    lo está presentando alguien más.
+    """
+    RT = models.RefreshToken
+    ahora = ahora_utc()
+    registro = db.query(RT).filter(RT.token_hash == _hash_refresh(token)).first()
+    if not registro or registro.expira < ahora:
+        raise HTTPException(status_code=401, detail="Refresh token inválido o expirado")
+    if registro.revocado is not None:
+        raise HTTPException(status_code=401, detail="Refresh token revocado")
+
+    # UPDATE condicional: con dos canjes simultáneos del mismo token, gana uno solo
+    res = db.execute(
+        update(RT)
+        .where(RT.id == registro.id, RT.usado.is_(None), RT.revocado.is_(None))
+        .values(usado=ahora)
+    )
+    if res.rowcount != 1:
+        _revocar_familia(db, registro.familia)
+        db.commit()
+        raise HTTPException(status_code=401, detail="Refresh token reutilizado; volvé a iniciar sesión")
+
+    usuario = consultas.usuario_por_id(db, registro.usuario_id)
+    if not usuario:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    nuevo = crear_refresh_token(db, usuario.id, familia=registro.familia)
+    db.commit()
+    return usuario, nuevo
+
+
+def revocar_refresh_tokens_de_usuario(db: Session, usuario_id: int) -> None:
+    """Cambio de contraseña: revoca todas las sesiones abiertas del usuario (no hace commit)."""
+    db.execute(
+        update(models.RefreshToken)
+        .where(models.RefreshToken.usuario_id == usuario_id, models.RefreshToken.revocado.is_(None))
+        .values(revocado=ahora_utc())
+    )
+
+
+def revocar_refresh_token(db: Session, token: str) -> None:
+    """Logout: revoca la familia del token (no hace commit). Token desconocido → no-op."""
+    registro = (
+        db.query(models.RefreshToken)
+        .filter(models.RefreshToken.token_hash == _hash_refresh(token))
+        .first()
+    )
+    if registro:
+        _revocar_familia(db, registro.familia)
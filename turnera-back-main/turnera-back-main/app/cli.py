@@ -0,0 +1,112 @@
+# app/cli.py
+# Tareas de mantenimiento por línea de comandos:
+#   python -m app.cli backfill-ocupacion [--emprendedor ID]
+#   python -m app.cli jobs
+#   python -m app.cli archivar [--dias N] [--lote N]
+#   python -m app.cli reindexar-busqueda
+#   python -m app.cli geocodificar [--archivo geocoding.csv] [--todos]
+import argparse
+from datetime import timedelta
+
+from app import database, models, tareas
+from app.utils import archivo, busqueda, geo, ocupacion
+from app.utils.tiempo import ahora_utc
+
+
+def backfill_ocupacion(args):
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        filas = ocupacion.recalcular(db, args.emprendedor)
+        db.commit()
+    finally:
+        db.close()
+    print(f"ocupacion_diaria: {filas} filas recalculadas")
+
+
+def correr_jobs(args):
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        tareas.registrar_jobs(db)
+    finally:
+        db.close()
+    tareas.ejecutar_pendientes()
+
+
+def archivar(args):
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        antes_de = ahora_utc() - timedelta(days=args.dias)
+        n = archivo.archivar_turnos(db, antes_de, lote=args.lote)
+    finally:
+        db.close()
+    print(f"{n} turnos movidos a turnos_historial (anteriores a {antes_de:%Y-%m-%d})")
+
+
+def reindexar_busqueda(args):
+    models.Base.metadata.create_all(bind=database.engine)
+    busqueda.crear_indice(database.engine)
+    if not busqueda.fts_disponible:
+        print("SQLite sin FTS5: no hay índice que reconstruir")
+        return
+    with database.engine.begin() as conn:
+        n = busqueda.reindexar(conn)
+    print(f"{busqueda.FTS_TABLA}: {n} filas indexadas")
+
+
+def geocodificar(args):
+    models.Base.metadata.create_all(bind=database.engine)
+    database.agregar_columnas_faltantes()
+    database.crear_indices_faltantes()
+    db = database.SessionLocal()
+    try:
+        q = db.query(models.Emprendedor).filter(models.Emprendedor.direccion.isnot(None))
+        if not args.todos:
+            q = q.filter(models.Emprendedor.lat.is_(None))
+        ok = sin_datos = 0
+        for e in q:
+            coords = geo.geocodificar(e.direccion, args.archivo)
+            if coords is None:
+                sin_datos += 1
+                continue
+            e.lat, e.lon = coords
+            e.geohash = geo.geohash(*coords)
+            ok += 1
+        db.commit()
+    finally:
+        db.close()
+    print(f"{ok} emprendedores geocodificados, {sin_datos} direcciones sin datos en {args.archivo}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("backfill-ocupacion", help="Reconstruye ocupacion_diaria desde turnos/reservas")
+    p.add_argument("--emprendedor", type=int, default=None, help="Sólo este emprendedor")
+    p.set_defaults(func=backfill_ocupacion)
+
+    p = sub.add_parser("jobs", help="Ejecuta una vez los jobs vencidos (sin levantar la API)")
+    p.set_defaults(func=correr_jobs)
+
+    p = sub.add_parser("archivar", help="Mueve turnos/reservas viejos al historial")
+    p.add_argument("--dias", type=int, default=tareas.ARCHIVO_DIAS, help="Antigüedad mínima en días")
+    p.add_argument("--lote", type=int, default=archivo.ARCHIVO_LOTE, help="Turnos por transacción")
+    p.set_defaults(func=archivar)
+
+    p = sub.add_parser("reindexar-busqueda", help="Reconstruye el índice full-text de /buscar")
+    p.set_defaults(func=reindexar_busqueda)
+
+    p = sub.add_parser("geocodificar", help="Completa lat/lon/geohash desde un archivo local de direcciones")
+    p.add_argument("--archivo", default=geo.GEOCODING_ARCHIVO, help="CSV con columnas direccion,lat,lon")
+    p.add_argument("--todos", action="store_true", help="Re-geocodifica también los que ya tienen coordenadas")
+    p.set_defaults(func=geocodificar)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
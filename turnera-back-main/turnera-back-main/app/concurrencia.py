@@ -0,0 +1,186 @@
+# app/concurrencia.py
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional
+
+logger = logging.getLogger("turnera.concurrencia")
+
+# Límite de concurrencia por tipo de ruta, adaptativo (AIMD), con cola acotada.
+# Los handlers sync corren en el threadpool: sin esto, en un pico todo se encola
+# ahí sin límite y la latencia crece para todos (también para las lecturas
+# baratas). Cada presupuesto deja pasar `limite` requests a la vez; el resto
+# espera en una cola de tamaño fijo hasta COLA_TIMEOUT y si no, 503 + Retry-After.
+# La latencia base (la mínima observada) es por ruta: dentro de un presupuesto
+# conviven rutas de 1 ms y de 50 ms, y mezclarlas haría parecer sobrecarga al
+# tráfico normal. El límite sólo se ajusta con carga (en curso cerca del límite
+# o gente en cola): sube de a poco si las latencias siguen cerca de su base y
+# se recorta un 10% si superan TOLERANCIA x base, como mucho una vez por "ida y
+# vuelta" (requests que empezaron antes del último recorte no recortan de nuevo).
+LIMITE_HABILITADO = os.getenv("LIMITE_HABILITADO", "1") == "1"
+COLA_TIMEOUT = float(os.getenv("COLA_TIMEOUT", "2"))  # segundos esperando lugar
+TOLERANCIA_LATENCIA = float(os.getenv("TOLERANCIA_LATENCIA", "2"))  # x latencia base
+RECORTE = 0.9  # decremento multiplicativo
+CARGA_MIN = 0.75  # fracción del límite en curso a partir de la cual se ajusta
+MAX_RUTAS = 512  # latencias base guardadas por presupuesto (LRU)
+
+# nombre → (límite inicial, límite máximo). El mínimo es siempre 1.
+PRESUPUESTOS = {
+    "auth": (int(os.getenv("LIMITE_AUTH", "4")), int(os.getenv("LIMITE_AUTH_MAX", "8"))),
+    "escritura": (int(os.getenv("LIMITE_ESCRITURA", "16")), int(os.getenv("LIMITE_ESCRITURA_MAX", "32"))),
+    "lectura": (int(os.getenv("LIMITE_LECTURA", "32")), int(os.getenv("LIMITE_LECTURA_MAX", "128"))),
+}
+RUTAS_AUTH = {"/usuarios/login", "/usuarios/registro", "/usuarios/token/refresh"}
+
+
+def clasificar(metodo: str, ruta: str) -> Optional[str]:
+    """Presupuesto de la request, o None si no se limita."""
+    if ruta.endswith("/stream") or metodo == "OPTIONS":
+        return None  # SSE: conexiones largas con su propio límite (eventos.py)
+    if ruta in RUTAS_AUTH:
+        return "auth"  # bcrypt: caro en CPU
+    if metodo in ("GET", "HEAD"):
+        return "lectura"
+    return "escritura"
+
+
+def _ruta(path: str) -> str:
+    """/turnos/12/espera → /turnos/{}/espera (el router todavía no corrió: no hay plantilla)."""
+    return "/".join("{}" if p.isdigit() else p for p in path.split("/"))
+
+
+class Presupuesto:
+    """Sólo se usa desde el event loop: no necesita locks."""
+
+    def __init__(self, nombre: str, inicial: int, maximo: int):
+        self.nombre = nombre
+        self.limite = float(inicial)
+        self.maximo = maximo
+        self.cola_max = 2 * maximo
+        self.en_curso = 0
+        self.cola: Deque[asyncio.Future] = deque()
+        self.bases: "OrderedDict[str, float]" = OrderedDict()  # ruta → latencia base
+        self.ultimo_recorte = 0.0
+        self.aceptadas = 0
+        self.rechazadas_cola_llena = 0
+        self.rechazadas_timeout = 0
+
+    async def entrar(self) -> bool:
+        if self.en_curso < int(self.limite) and not self.cola:
+            self.en_curso += 1
+            return True
+        if len(self.cola) >= self.cola_max:
+            self.rechazadas_cola_llena += 1
+            return False
+        fut = asyncio.get_running_loop().create_future()
+        self.cola.append(fut)
+        try:
+            await asyncio.wait_for(fut, COLA_TIMEOUT)
+            return True
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():
+                return True  # le llegó el lugar justo al vencer
+            try:
+                self.cola.remove(fut)
+            except ValueError:
+                pass
+            self.rechazadas_timeout += 1
+            return False
+
+    def salir(self, ruta: str, inicio: float, latencia: float) -> None:
+        cargado = bool(self.cola) or self.en_curso >= CARGA_MIN * int(self.limite)
+        self.en_curso -= 1
+        self.aceptadas += 1
+        self._ajustar(ruta, inicio, latencia, cargado)
+        while self.cola and self.en_curso < int(self.limite):
+            fut = self.cola.popleft()
+            if not fut.done():
+                self.en_curso += 1
+                fut.set_result(True)
+
+    def _base(self, ruta: str, latencia: float) -> float:
+        # mínimo observado, que sube muy lento para seguir cambios reales
+        base = self.bases.pop(ruta, None)
+        if base is None or latencia < base:
+            base = latencia
+        else:
+            base += (latencia - base) * 0.001
+        self.bases[ruta] = base
+        if len(self.bases) > MAX_RUTAS:
+            self.bases.popitem(last=False)
+        return base
+
+    def _ajustar(self, ruta: str, inicio: float, latencia: float, cargado: bool) -> None:
+        base = self._base(ruta, latencia)
+        if not cargado:
+            return  # sin carga la latencia no dice nada del límite
+        if latencia > TOLERANCIA_LATENCIA * base:
+            if inicio >= self.ultimo_recorte:
+                self.limite = max(1.0, self.limite * RECORTE)
+                self.ultimo_recorte = time.monotonic()
+        else:
+            self.limite = min(float(self.maximo), self.limite + 1 / self.limite)
+
+    def metricas(self) -> Dict:
+        return {
+            "limite": int(self.limite),
+            "maximo": self.maximo,
+            "en_curso": self.en_curso,
+            "esperando": len(self.cola),
+            "rutas_medidas": len(self.bases),
+            "aceptadas": self.aceptadas,
+            "rechazadas_cola_llena": self.rechazadas_cola_llena,
+            "rechazadas_timeout": self.rechazadas_timeout,
+        }
+
+
+_presupuestos: Dict[str, Presupuesto] = {
+    nombre: Presupuesto(nombre, inicial, maximo) for nombre, (inicial, maximo) in PRESUPUESTOS.items()
+}
+
+
+def metricas() -> Dict[str, Dict]:
+    return {nombre: p.metricas() for nombre, p in _presupuestos.items()}
+
+
+class LimiteConcurrenciaMiddleware:
+    """Middleware ASGI puro (no envuelve el body: no rompe los streams SSE)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not LIMITE_HABILITADO:
+            return await self.app(scope, receive, send)
+        nombre = clasificar(scope["method"], scope["path"])
+        if nombre is None:
+            return await self.app(scope, receive, send)
+
+        presupuesto = _presupuestos[nombre]
+        if not await presupuesto.entrar():
+            logger.info("503 por saturación (%s): %s %s", nombre, scope["method"], scope["path"])
+            return await _rechazar(send)
+
+        inicio = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            presupuesto.salir(_ruta(scope["path"]), inicio, time.monotonic() - inicio)
+
+
+async def _rechazar(send) -> None:
+    cuerpo = json.dumps({"detail": "Servidor saturado, reintentá en unos segundos"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(cuerpo)).encode()),
+            (b"retry-after", str(max(1, math.ceil(COLA_TIMEOUT))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": cuerpo})
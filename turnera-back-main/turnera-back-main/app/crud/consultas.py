@@ -0,0 +1,37 @@
+# app/crud/consultas.py
+from typing import Optional
+
+from sqlalchemy import func, lambda_stmt, select
+from sqlalchemy.orm import Session
+
+from app import models
+
+# Consultas del hot path (se corren varias veces por request). Con lambda_stmt
+# SQLAlchemy arma y compila el statement una sola vez por forma de consulta y
+# lo guarda en su cache; en las llamadas siguientes sólo cambia el valor del
+# parámetro (las variables del closure se vuelven bound parameters).
+
+
+def turno_por_id(db: Session, turno_id: int) -> Optional[models.Turno]:
+    stmt = lambda_stmt(lambda: select(models.Turno).where(models.Turno.id == turno_id))
+    return db.execute(stmt).scalar_one_or_none()
+
+
+def reservas_en_turno(db: Session, turno_id: int) -> int:
+    """Cantidad de reservas del turno (COUNT directo, sin el subquery de Query.count())."""
+    stmt = lambda_stmt(
+        lambda: select(func.count(models.Reserva.id)).where(models.Reserva.turno_id == turno_id)
+    )
+    return db.execute(stmt).scalar_one()
+
+
+def emprendedor_de_usuario(db: Session, usuario_id: int) -> Optional[models.Emprendedor]:
+    stmt = lambda_stmt(
+        lambda: select(models.Emprendedor).where(models.Emprendedor.usuario_id == usuario_id)
+    )
+    return db.execute(stmt).scalar_one_or_none()
+
+
+def usuario_por_id(db: Session, usuario_id: int) -> Optional[models.Usuario]:
+    stmt = lambda_stmt(lambda: select(models.Usuario).where(models.Usuario.id == usuario_id))
+    return db.execute(stmt).scalar_one_or_none()
@@ -1,7 +1,12 @@
 # app/crud/horarios.py
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
 from sqlalchemy.orm import Session
+from app import models
 from app.models import Horario
 from app.schemas import HorarioCreate
+from app.utils.tiempo import ahora_utc, a_local, inicio_de_semana, ventana_utc
 
 def get_horarios(db: Session, emprendedor_id: int):
     return db.query(Horario).filter(Horario.emprendedor_id == emprendedor_id).all()
@@ -9,6 +14,7 @@ def get_horarios(db: Session, emprendedor_id: int):
 def create_horario(db: Session, emprendedor_id: int, horario: HorarioCreate):
     db_horario = Horario(**horario.dict(), emprendedor_id=emprendedor_id)
     db.add(db_horario)
+    regenerar_ventanas(db, db.get(models.Emprendedor, emprendedor_id))
     db.commit()
     db.refresh(db_horario)
     return db_horario
@@ -19,6 +25,7 @@ def update_horario(db: Session, horario_id: int, horario: HorarioCreate):
         return None
     for key, value in horario.dict().items():
         setattr(db_horario, key, value)
+    regenerar_ventanas(db, db_horario.emprendedor)
     db.commit()
     db.refresh(db_horario)
     return db_horario
@@ -27,6 +34,122 @@ def delete_horario(db: Session, horario_id: int):
     db_horario = db.query(Horario).filter(Horario.id == horario_id).first()
     if not db_horario:
         return None
+    emprendedor = db_horario.emprendedor
     db.delete(db_horario)
+    regenerar_ventanas(db, emprendedor)
     db.commit()
-    return True
\ No newline at end of file
+    return True
+
+# =========================================================
+# Ventanas UTC precalculadas
+# =========================================================
+VENTANAS_SEMANAS = 8  # semanas que se precalculan al cambiar horarios/zona (y el job las extiende)
+
+
+def _ventanas_semana(emprendedor: models.Emprendedor, horarios, semana: date) -> Iterator[Tuple[Horario, datetime, datetime]]:
+    for h in horarios:
+        limites = ventana_utc(h.dia_semana, h.hora_inicio, h.hora_fin, semana, emprendedor.zona_horaria)
+        if limites:
+            yield h, limites[0], limites[1]
+
+
+def _generar_semana(db: Session, emprendedor: models.Emprendedor, horarios, semana: date):
+    for h, inicio, fin in _ventanas_semana(emprendedor, horarios, semana):
+        db.add(models.HorarioVentana(
+            horario_id=h.id,
+            emprendedor_id=emprendedor.id,
+            semana=semana,
+            inicio_utc=inicio,
+            fin_utc=fin,
+        ))
+
+
+def _semanas(emprendedor: models.Emprendedor, desde: datetime, hasta: datetime) -> Tuple[date, date]:
+    """Primer y último lunes (locales) que pueden tener ventanas dentro de [desde, hasta]."""
+    # margen de un día: un bloque nocturno puede pertenecer a la semana anterior
+    primera = inicio_de_semana(a_local(desde, emprendedor.zona_horaria).date() - timedelta(days=1))
+    ultima = inicio_de_semana(a_local(hasta, emprendedor.zona_horaria).date())
+    return primera, ultima
+
+
+def regenerar_ventanas(db: Session, emprendedor: models.Emprendedor, semanas: int = VENTANAS_SEMANAS):
+    """
+    Borra y recalcula las ventanas UTC del emprendedor desde la semana actual.
+    Llamar después de modificar horarios o la zona horaria (antes del commit).
+    """
+    db.flush()
+    db.query(models.HorarioVentana).filter(
+        models.HorarioVentana.emprendedor_id == emprendedor.id
+    ).delete(synchronize_session=False)
+
+    horarios = db.query(Horario).filter(Horario.emprendedor_id == emprendedor.id).all()
+    if not horarios:
+        return
+    lunes = inicio_de_semana(a_local(ahora_utc(), emprendedor.zona_horaria).date())
+    for i in range(semanas):
+        _generar_semana(db, emprendedor, horarios, lunes + timedelta(weeks=i))
+
+
+def asegurar_ventanas(db: Session, emprendedor: models.Emprendedor, desde: datetime, hasta: datetime):
+    """
+    Genera las semanas que falten para cubrir [desde, hasta] (UTC naive). Escribe:
+    sólo desde writes de horarios o el job que extiende el horizonte, nunca desde
+    una lectura (ver ventanas_entre). Si el emprendedor no tiene horarios no hace nada.
+    """
+    horarios = db.query(Horario).filter(Horario.emprendedor_id == emprendedor.id).all()
+    if not horarios:
+        return
+    primera, ultima = _semanas(emprendedor, desde, hasta)
+    existentes = {
+        s for (s,) in db.query(models.HorarioVentana.semana)
+        .filter(
+            models.HorarioVentana.emprendedor_id == emprendedor.id,
+            models.HorarioVentana.semana >= primera,
+            models.HorarioVentana.semana <= ultima,
+        )
+        .distinct()
+    }
+    semana = primera
+    while semana <= ultima:
+        if semana not in existentes:
+            _generar_semana(db, emprendedor, horarios, semana)
+        semana += timedelta(weeks=1)
+    db.flush()
+
+
+def ventanas_entre(
+    db: Session, emprendedor: models.Emprendedor, desde: datetime, hasta: datetime
+) -> Optional[List[Tuple[datetime, datetime]]]:
+    """
+    Ventanas UTC (inicio, fin) que se cruzan con [desde, hasta), ordenadas.
+    Sólo lee: las semanas precalculadas salen de horarios_ventanas y las que
+    falten se calculan en memoria, sin tocar la sesión (así un GET no toma el
+    lock de escritura de SQLite). None si el emprendedor no cargó horarios.
+    """
+    horarios = db.query(Horario).filter(Horario.emprendedor_id == emprendedor.id).all()
+    if not horarios:
+        return None
+    primera, ultima = _semanas(emprendedor, desde, hasta)
+    HV = models.HorarioVentana
+    guardadas = db.query(HV.semana, HV.inicio_utc, HV.fin_utc).filter(
+        HV.emprendedor_id == emprendedor.id, HV.semana >= primera, HV.semana <= ultima,
+    ).all()
+    semanas_guardadas = {s for s, _, _ in guardadas}
+    ventanas = [(inicio, fin) for _, inicio, fin in guardadas]
+    semana = primera
+    while semana <= ultima:
+        if semana not in semanas_guardadas:
+            ventanas.extend((inicio, fin) for _, inicio, fin in _ventanas_semana(emprendedor, horarios, semana))
+        semana += timedelta(weeks=1)
+    return sorted((inicio, fin) for inicio, fin in ventanas if inicio < hasta and fin > desde)
+
+
+def dentro_de_horario(db: Session, emprendedor: models.Emprendedor, inicio: datetime, fin: datetime) -> Optional[bool]:
+    """
+    True si [inicio, fin) (UTC naive) cae completo dentro de un horario de atención.
+    None si el emprendedor no cargó horarios (no hay contra qué validar).
+    """
+    ventanas = ventanas_entre(db, emprendedor, inicio, fin)
+    if ventanas is None:
+        return None
+    return any(v_inicio <= inicio and v_fin >= fin for v_inicio, v_fin in ventanas)
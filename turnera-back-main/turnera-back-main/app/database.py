@@ -1,10 +1,161 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import MetaData, create_engine, event, inspect, text
+from sqlalchemy.schema import CreateIndex, CreateTable
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 DATABASE_URL = "sqlite:///./basedatos.db"
 
+# Lecturas (GET de listados): réplica si se configura; si no, con SQLite se usa
+# un segundo pool de conexiones read-only sobre el mismo archivo. En modo WAL
+# los lectores ven el último commit sin esperar a una escritura en curso.
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+LECTURA_SEPARADA = os.getenv("LECTURA_SEPARADA", "1") == "1"
+
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+
+@event.listens_for(engine, "connect")
+def _activar_foreign_keys(dbapi_conn, _):
+    # SQLite no aplica FKs (ni ON DELETE CASCADE) salvo que se pida por conexión
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA journal_mode=WAL")  # persiste en el archivo; lectores no bloquean
+    cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _engine_lectura():
+    if DATABASE_REPLICA_URL:
+        return create_engine(DATABASE_REPLICA_URL, connect_args={"check_same_thread": False})
+    if not LECTURA_SEPARADA or not DATABASE_URL.startswith("sqlite:///"):
+        return engine
+    ruta = DATABASE_URL[len("sqlite:///"):]
+    return create_engine(
+        f"sqlite:///file:{ruta}?mode=ro&uri=true", connect_args={"check_same_thread": False}
+    )
+
+
+engine_lectura = _engine_lectura()
+SessionLectura = sessionmaker(autocommit=False, autoflush=False, bind=engine_lectura)
+
 Base = declarative_base()
+
+
+def agregar_columnas_faltantes(bind=engine):
+    """
+    create_all() no altera tablas existentes: agrega (ALTER TABLE ADD COLUMN)
+    las columnas nuevas de los modelos que falten en una DB antigua.
+    Sólo columnas nullable o con server_default, que SQLite permite agregar.
+    """
+    insp = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            existentes = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existentes:
+                    continue
+                if not col.nullable and col.server_default is None:
+                    continue
+                tipo = col.type.compile(dialect=bind.dialect)
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN "{col.name}" {tipo}'
+                if col.server_default is not None:
+                    default = col.server_default.arg
+                    ddl += " DEFAULT " + (getattr(default, "text", None) or f"'{default}'")
+                conn.execute(text(ddl))
+
+
+def crear_indices_faltantes(bind=engine):
+    """Igual que arriba pero para índices nuevos declarados en tablas ya existentes."""
+    insp = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            continue
+        existentes = {i["name"] for i in insp.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existentes:
+                index.create(bind)
+
+
+def _fks_desactualizadas(insp, table) -> bool:
+    """¿Las FKs de la tabla en la DB difieren (en ON DELETE) de las del modelo?"""
+    en_db = {
+        (tuple(fk["constrained_columns"]), fk["referred_table"]): (fk.get("options") or {}).get("ondelete")
+        for fk in insp.get_foreign_keys(table.name)
+    }
+    for fk in table.foreign_key_constraints:
+        clave = (tuple(c.name for c in fk.columns), fk.referred_table.name)
+        if clave in en_db and (en_db[clave] or "").upper() != (fk.ondelete or "").upper():
+            return True
+    return False
+
+
+def _falta_autoincrement(bind, table) -> bool:
+    """¿El modelo pide sqlite_autoincrement y la tabla en la DB se creó sin AUTOINCREMENT?"""
+    if not table.dialect_options["sqlite"]["autoincrement"]:
+        return False
+    with bind.connect() as conn:
+        sql = conn.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :n"), {"n": table.name}
+        ).scalar()
+    return "AUTOINCREMENT" not in (sql or "").upper()
+
+
+def actualizar_foreign_keys(bind=engine):
+    """
+    SQLite no permite ALTER de constraints: las tablas de una DB antigua cuyas
+    FKs no tienen el ON DELETE del modelo (o que no tienen el AUTOINCREMENT que
+    pide el modelo) se reconstruyen (crear nueva, copiar, borrar vieja,
+    renombrar) en una sola transacción, con foreign_keys=OFF.
+    Los triggers de la tabla vieja se pierden: volver a crearlos después.
+    """
+    insp = inspect(bind)
+    pendientes = [
+        t for t in Base.metadata.sorted_tables
+        if insp.has_table(t.name) and (_fks_desactualizadas(insp, t) or _falta_autoincrement(bind, t))
+    ]
+    if not pendientes:
+        return
+    meta = MetaData()  # copia del esquema para poder crear las tablas con otro nombre
+    for t in Base.metadata.sorted_tables:
+        t.to_metadata(meta)
+
+    raw = bind.raw_connection()
+    try:
+        dbapi = raw.driver_connection
+        nivel = dbapi.isolation_level
+        dbapi.isolation_level = None  # BEGIN/COMMIT explícitos: el DDL también queda adentro
+        cur = dbapi.cursor()
+        cur.execute("PRAGMA foreign_keys=OFF")  # sólo tiene efecto fuera de una transacción
+        # sin esto el RENAME revalida los triggers de otras tablas que nombran a la
+        # tabla en reconstrucción (p. ej. reservas → turnos) y falla con la vieja ya borrada
+        cur.execute("PRAGMA legacy_alter_table=ON")
+        try:
+            cur.execute("BEGIN")
+            for table in pendientes:
+                tmp = table.to_metadata(meta, name=f"{table.name}__nueva")
+                columnas = ", ".join(
+                    f'"{c["name"]}"' for c in insp.get_columns(table.name) if c["name"] in table.c
+                )
+                for idx in insp.get_indexes(table.name):
+                    cur.execute(f'DROP INDEX IF EXISTS "{idx["name"]}"')
+                cur.execute(str(CreateTable(tmp).compile(dialect=bind.dialect)))
+                cur.execute(f'INSERT INTO "{tmp.name}" ({columnas}) SELECT {columnas} FROM "{table.name}"')
+                cur.execute(f'DROP TABLE "{table.name}"')
+                cur.execute(f'ALTER TABLE "{tmp.name}" RENAME TO "{table.name}"')
+                for index in table.indexes:
+                    cur.execute(str(CreateIndex(index).compile(dialect=bind.dialect)))
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+        finally:
+            cur.execute("PRAGMA legacy_alter_table=OFF")
+            cur.execute("PRAGMA foreign_keys=ON")
+            dbapi.isolation_level = nivel
+    finally:
+        raw.close()
@@ -1,9 +1,57 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Request
+
 from app import database
 
+# Read-your-writes: después de un POST/PUT/PATCH/DELETE OK, los GET del mismo
+# usuario leen de la primaria durante unos segundos, para ver su propia
+# escritura aunque la réplica atrase. La clave es el usuario autenticado (el
+# middleware de main.py lo saca del JWT) y no una cookie: el front corre en
+# otro origen y no manda cookies. El mapa es por proceso; con varios workers y
+# réplica real hace falta afinidad de sesión en el balanceador.
+LEER_PRIMARIA_SEGUNDOS = int(os.getenv("LEER_PRIMARIA_SEGUNDOS", "5"))
+MAX_USUARIOS_PRIMARIA = 100_000  # entradas guardadas (LRU)
+
+_leer_primaria: "OrderedDict[int, float]" = OrderedDict()  # usuario_id → hasta (monotonic)
+_leer_primaria_lock = threading.Lock()
+
+
+def marcar_escritura(usuario_id: int) -> None:
+    with _leer_primaria_lock:
+        _leer_primaria.pop(usuario_id, None)
+        _leer_primaria[usuario_id] = time.monotonic() + LEER_PRIMARIA_SEGUNDOS
+        if len(_leer_primaria) > MAX_USUARIOS_PRIMARIA:
+            _leer_primaria.popitem(last=False)
+
+
+def lee_de_primaria(usuario_id: int) -> bool:
+    with _leer_primaria_lock:
+        hasta = _leer_primaria.get(usuario_id)
+        if hasta is None:
+            return False
+        if hasta < time.monotonic():
+            del _leer_primaria[usuario_id]
+            return False
+        return True
+
+
 # --- Dependencia DB ---
 def get_db():
     db = database.SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db(request: Request):
+    """Sesión de sólo lectura para GETs de listados (réplica / pool read-only)."""
+    leer_primaria = getattr(request.state, "leer_primaria", False)
+    db = (database.SessionLocal if leer_primaria else database.SessionLectura)()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,150 @@
+# app/escritura.py
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import database
+
+logger = logging.getLogger("turnera.escritura")
+
+T = TypeVar("T")
+
+# Group commit opcional para SQLite. Con ESCRITURA_AGRUPADA=1, las mutaciones
+# de reservas/turnos no hacen commit cada una: se encolan a un único hilo
+# escritor que junta lo que llegue en ESCRITURA_VENTANA_MS y lo confirma en
+# UNA transacción (un solo fsync / lock de archivo para todo el lote).
+# Cada item corre dentro de su SAVEPOINT: si falla (HTTPException de
+# validación, IntegrityError...) se deshace sólo ese item y el resto del
+# lote sigue. El resultado vuelve al request por un Future.
+# El hilo escritor usa su propio engine: pysqlite no emite BEGIN antes de un
+# SAVEPOINT, y sin transacción externa cada RELEASE confirma por su cuenta (un
+# commit por item). Con isolation_level=None + BEGIN explícito el lote es una
+# sola transacción y los SAVEPOINT quedan anidados adentro.
+ESCRITURA_AGRUPADA = os.getenv("ESCRITURA_AGRUPADA", "0") == "1"
+ESCRITURA_VENTANA_MS = float(os.getenv("ESCRITURA_VENTANA_MS", "5"))
+ESCRITURA_MAX_LOTE = int(os.getenv("ESCRITURA_MAX_LOTE", "64"))
+ESCRITURA_TIMEOUT = 30  # segundos que un request espera su resultado
+
+Mutacion = Callable[[Session], T]
+
+
+class EscritorAgrupado:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        ventana_ms: float = ESCRITURA_VENTANA_MS,
+        max_lote: int = ESCRITURA_MAX_LOTE,
+    ):
+        self.session_factory = session_factory
+        self.ventana = ventana_ms / 1000
+        self.max_lote = max_lote
+        self._cola: "queue.Queue[Tuple[Mutacion, Future]]" = queue.Queue()
+        self._hilo = threading.Thread(target=self._correr, name="turnera-escritor", daemon=True)
+        self._hilo.start()
+
+    def enviar(self, fn: Mutacion) -> Future:
+        fut: Future = Future()
+        self._cola.put((fn, fut))
+        return fut
+
+    def _correr(self):
+        while True:
+            lote = [self._cola.get()]
+            limite = time.monotonic() + self.ventana
+            while len(lote) < self.max_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+            try:
+                self._procesar(lote)
+            except Exception:  # no debería pasar; que el hilo no muera
+                logger.exception("error procesando lote de escrituras")
+
+    def _procesar(self, lote: List[Tuple[Mutacion, Future]]):
+        db = self.session_factory()
+        ok = []
+        try:
+            for fn, fut in lote:
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with db.begin_nested():
+                        resultado = fn(db)
+                    ok.append((fut, resultado))
+                except Exception as exc:
+                    fut.set_exception(exc)
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            for fut, _ in ok:
+                fut.set_exception(exc)
+            return
+        finally:
+            db.close()
+        for fut, resultado in ok:
+            fut.set_result(resultado)
+
+
+_escritor: Optional[EscritorAgrupado] = None
+_lock = threading.Lock()
+
+
+def crear_engine_escritor() -> Engine:
+    """Engine sobre la misma DB con transacciones explícitas (receta de SQLAlchemy para pysqlite)."""
+    engine = create_engine(database.DATABASE_URL, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _conectar(dbapi_conn, registro):
+        database._activar_foreign_keys(dbapi_conn, registro)
+        dbapi_conn.isolation_level = None  # que pysqlite no abra ni cierre transacciones solo
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        # IMMEDIATE: el lote siempre escribe; tomar el lock al empezar evita el
+        # SQLITE_BUSY (sin reintento) de subir de lectura a escritura a mitad de lote
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+def get_escritor() -> EscritorAgrupado:
+    global _escritor
+    with _lock:
+        if _escritor is None:
+            # expire_on_commit=False: los objetos devueltos siguen legibles
+            # (desacoplados) cuando el request los serializa.
+            factory = sessionmaker(
+                bind=crear_engine_escritor(), autocommit=False, autoflush=False, expire_on_commit=False
+            )
+            _escritor = EscritorAgrupado(factory)
+        return _escritor
+
+
+def ejecutar(db: Session, fn: Mutacion) -> T:
+    """
+    Ejecuta una mutación y la confirma.
+    `fn(db)` valida, escribe y hace flush si necesita ids, pero NO hace commit.
+    Sin modo agrupado corre en la sesión del request (`db`) con su propio commit.
+    Con modo agrupado corre en el hilo escritor: no usar objetos de `db` dentro de `fn`.
+    """
+    if not ESCRITURA_AGRUPADA:
+        try:
+            resultado = fn(db)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return resultado
+    return get_escritor().enviar(fn).result(timeout=ESCRITURA_TIMEOUT)
@@ -0,0 +1,135 @@
+# app/eventos.py
+import asyncio
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+# Pub/sub de cambios de disponibilidad por servicio (para el stream SSE).
+# Los handlers son sync (threadpool) y publican DESPUÉS del commit; cada
+# suscriptor vive en el event loop, así que la entrega se agenda con
+# call_soon_threadsafe. Con varios workers, enchufar con set_broker() un
+# Broker que reparta entre procesos (Redis pub/sub, NOTIFY de Postgres, etc.).
+SSE_MAX_CONEXIONES = int(os.getenv("SSE_MAX_CONEXIONES", "500"))
+SSE_MAX_POR_SERVICIO = int(os.getenv("SSE_MAX_POR_SERVICIO", "100"))
+SSE_COLA = 100  # eventos pendientes por cliente antes de forzar un resync
+
+
+class LimiteConexiones(Exception):
+    pass
+
+
+class Suscripcion:
+    def __init__(self, canal: str, loop: asyncio.AbstractEventLoop, maxsize: int = SSE_COLA):
+        self.canal = canal
+        self.loop = loop
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize)
+
+    def entregar(self, evento: Dict) -> None:
+        """Corre en el loop del suscriptor."""
+        if self.cola.full():
+            # Backpressure: cliente lento. Tiramos lo pendiente y le pedimos
+            # que recargue /turnos/disponibles, en vez de crecer sin límite.
+            while not self.cola.empty():
+                self.cola.get_nowait()
+            self.cola.put_nowait({"tipo": "resync"})
+            return
+        self.cola.put_nowait(evento)
+
+    async def siguiente(self, timeout: float) -> Optional[Dict]:
+        try:
+            return await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broker:
+    """Interfaz del pub/sub. `publicar` se llama desde threads; `suscribir` desde el loop."""
+
+    def publicar(self, canal: str, evento: Dict) -> None:
+        raise NotImplementedError
+
+    def suscribir(self, canal: str) -> Suscripcion:
+        raise NotImplementedError
+
+    def desuscribir(self, sub: Suscripcion) -> None:
+        raise NotImplementedError
+
+
+class BrokerLocal(Broker):
+    """Broker en memoria: sólo alcanza a los clientes conectados a este proceso."""
+
+    def __init__(self, max_total: int = SSE_MAX_CONEXIONES, max_por_canal: int = SSE_MAX_POR_SERVICIO):
+        self.max_total = max_total
+        self.max_por_canal = max_por_canal
+        self._subs: Dict[str, Set[Suscripcion]] = defaultdict(set)
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def suscribir(self, canal: str) -> Suscripcion:
+        with self._lock:
+            if self._total >= self.max_total or len(self._subs[canal]) >= self.max_por_canal:
+                raise LimiteConexiones(canal)
+            sub = Suscripcion(canal, asyncio.get_running_loop())
+            self._subs[canal].add(sub)
+            self._total += 1
+            return sub
+
+    def desuscribir(self, sub: Suscripcion) -> None:
+        with self._lock:
+            subs = self._subs.get(sub.canal)
+            if subs and sub in subs:
+                subs.discard(sub)
+                self._total -= 1
+                if not subs:
+                    del self._subs[sub.canal]
+
+    def publicar(self, canal: str, evento: Dict) -> None:
+        with self._lock:
+            subs = list(self._subs.get(canal, ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub.entregar, evento)
+            except RuntimeError:  # loop cerrado
+                self.desuscribir(sub)
+
+
+_broker: Broker = BrokerLocal()
+
+
+def get_broker() -> Broker:
+    return _broker
+
+
+def set_broker(broker: Broker) -> None:
+    global _broker
+    _broker = broker
+
+
+def canal_servicio(servicio_id: int) -> str:
+    return f"servicio:{servicio_id}"
+
+
+def publicar_disponibilidad(
+    servicio_id: int,
+    tipo: str,  # "slot-taken" | "slot-freed"
+    turno_id: int,
+    fecha_hora_inicio: datetime,
+    libres: int,
+    motivo: str,
+) -> None:
+    """Llamar después del commit: el evento no debe adelantarse a la DB."""
+    get_broker().publicar(canal_servicio(servicio_id), {
+        "tipo": tipo,
+        "servicio_id": servicio_id,
+        "turno_id": turno_id,
+        "fecha_hora_inicio": fecha_hora_inicio.isoformat() + "Z",  # UTC naive en DB
+        "libres": max(libres, 0),
+        "motivo": motivo,
+    })
+
+
+def formato_sse(evento: Dict) -> str:
+    return f"event: {evento['tipo']}\ndata: {json.dumps(evento, ensure_ascii=False)}\n\n"
@@ -0,0 +1,186 @@
+# app/limite_tasa.py
+import ipaddress
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from fastapi import HTTPException, Request
+
+# Rate limit de los endpoints públicos por código (/emprendedores/by-codigo,
+# /servicios_por_codigo): no piden login y el espacio de códigos (31^6) se
+# puede recorrer a fuerza bruta. Token bucket por IP del cliente y por código,
+# más un cache negativo de códigos inválidos para que los misses no lleguen a
+# la DB. El estado de los buckets vive en un Almacen enchufable: el default es
+# en memoria (por proceso); con varios workers, set_almacen() con uno
+# compartido (Redis, etc.).
+#
+# IP del cliente detrás de un proxy / load balancer: la conexión llega desde el
+# proxy, y con un único bucket para todos los clientes cualquiera bloquea al
+# resto. Dos formas de configurarlo (no hace falta usar las dos):
+#   - uvicorn --proxy-headers --forwarded-allow-ips=<ips del proxy>: uvicorn
+#     reescribe request.client con el X-Forwarded-For y acá llega ya resuelta.
+#   - PROXIES_CONFIABLES=10.0.0.0/8,127.0.0.1 (IPs o redes, separadas por coma):
+#     si la conexión viene de uno de ellos se toma la IP de X-Forwarded-For,
+#     recorriéndolo de derecha a izquierda y salteando los proxies confiables.
+# Sin proxy confiable el header se ignora (lo puede mandar cualquiera).
+PROXIES_CONFIABLES = [
+    ipaddress.ip_network(x.strip(), strict=False)
+    for x in os.getenv("PROXIES_CONFIABLES", "").split(",") if x.strip()
+]
+CODIGO_RAFAGA_IP = int(os.getenv("CODIGO_RAFAGA_IP", "20"))          # requests seguidas
+CODIGO_TASA_IP = float(os.getenv("CODIGO_TASA_IP", "0.5"))           # tokens/segundo
+CODIGO_RAFAGA_CODIGO = int(os.getenv("CODIGO_RAFAGA_CODIGO", "60"))
+CODIGO_TASA_CODIGO = float(os.getenv("CODIGO_TASA_CODIGO", "5"))
+CODIGO_INVALIDO_TTL = float(os.getenv("CODIGO_INVALIDO_TTL", "60"))  # segundos en el cache negativo
+MAX_CLAVES = 100_000  # buckets / códigos inválidos guardados en memoria (LRU)
+
+
+class Almacen:
+    """Interfaz del estado de los buckets. `consumir` se llama desde threads."""
+
+    def consumir(self, clave: str, capacidad: int, tasa: float) -> Tuple[bool, float]:
+        """Descuenta un token. Devuelve (permitido, segundos hasta el próximo token)."""
+        raise NotImplementedError
+
+
+class AlmacenMemoria(Almacen):
+    """Buckets en memoria: el límite es por proceso."""
+
+    def __init__(self, max_claves: int = MAX_CLAVES):
+        self.max_claves = max_claves
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # clave → (tokens, ts)
+        self._lock = threading.Lock()
+
+    def consumir(self, clave: str, capacidad: int, tasa: float) -> Tuple[bool, float]:
+        ahora = time.monotonic()
+        with self._lock:
+            tokens, ts = self._buckets.pop(clave, (float(capacidad), ahora))
+            tokens = min(float(capacidad), tokens + (ahora - ts) * tasa)
+            permitido = tokens >= 1
+            if permitido:
+                tokens -= 1
+            self._buckets[clave] = (tokens, ahora)
+            if len(self._buckets) > self.max_claves:
+                self._buckets.popitem(last=False)  # el bucket menos usado
+        return permitido, 0.0 if permitido else (1 - tokens) / tasa
+
+
+_almacen: Almacen = AlmacenMemoria()
+
+
+def get_almacen() -> Almacen:
+    return _almacen
+
+
+def set_almacen(almacen: Almacen) -> None:
+    global _almacen
+    _almacen = almacen
+
+
+# =========================================================
+# Cache negativo (códigos que no existen)
+# =========================================================
+_invalidos: "OrderedDict[str, float]" = OrderedDict()  # código → vence (monotonic)
+_invalidos_lock = threading.Lock()
+
+
+def es_codigo_invalido(codigo: str) -> bool:
+    with _invalidos_lock:
+        vence = _invalidos.get(codigo)
+        if vence is None:
+            return False
+        if vence < time.monotonic():
+            del _invalidos[codigo]
+            return False
+        return True
+
+
+def marcar_codigo_invalido(codigo: str) -> None:
+    with _invalidos_lock:
+        _invalidos.pop(codigo, None)
+        _invalidos[codigo] = time.monotonic() + CODIGO_INVALIDO_TTL
+        if len(_invalidos) > MAX_CLAVES:
+            _invalidos.popitem(last=False)
+
+
+def olvidar_codigo_invalido(codigo: str) -> None:
+    """Llamar al asignar un código nuevo (en este proceso; en otros vence por TTL)."""
+    with _invalidos_lock:
+        _invalidos.pop(codigo.upper(), None)
+
+
+# =========================================================
+# Contadores
+# =========================================================
+_contadores: Dict[str, int] = {"limitadas_ip": 0, "limitadas_codigo": 0, "invalidos_cacheados": 0}
+_contadores_lock = threading.Lock()
+
+
+def _contar(nombre: str) -> None:
+    with _contadores_lock:
+        _contadores[nombre] += 1
+
+
+def metricas() -> Dict[str, int]:
+    with _contadores_lock:
+        return {**_contadores, "codigos_invalidos_en_cache": len(_invalidos)}
+
+
+# =========================================================
+# Dependencia FastAPI
+# =========================================================
+def _es_proxy_confiable(ip: str) -> bool:
+    try:
+        direccion = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(direccion in red for red in PROXIES_CONFIABLES)
+
+
+def ip_cliente(request: Request) -> str:
+    """IP del cliente: la de la conexión, o la de X-Forwarded-For si la conexión viene de un proxy confiable."""
+    ip = request.client.host if request.client else "desconocida"
+    if not _es_proxy_confiable(ip):
+        return ip
+    saltos = [x.strip() for x in request.headers.get("x-forwarded-for", "").split(",") if x.strip()]
+    for salto in reversed(saltos):  # el de más a la derecha lo agregó nuestro proxy
+        ip = salto
+        if not _es_proxy_confiable(salto):
+            break
+    return ip
+
+
+def _demasiadas(espera: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Demasiadas consultas, reintentá en unos segundos",
+        headers={"Retry-After": str(max(1, math.ceil(espera)))},
+    )
+
+
+def limitar_codigo(codigo: str, request: Request) -> str:
+    """
+    Dependencia de los endpoints por código: aplica los dos buckets y el cache
+    negativo. Devuelve el código normalizado (mayúsculas, sin espacios).
+    """
+    code = (codigo or "").strip().upper()
+    almacen = get_almacen()
+
+    ip = ip_cliente(request)
+    permitido, espera = almacen.consumir(f"ip:{ip}", CODIGO_RAFAGA_IP, CODIGO_TASA_IP)
+    if not permitido:
+        _contar("limitadas_ip")
+        raise _demasiadas(espera)
+
+    if es_codigo_invalido(code):
+        _contar("invalidos_cacheados")
+        raise HTTPException(status_code=404, detail="Código inválido")
+
+    permitido, espera = almacen.consumir(f"codigo:{code}", CODIGO_RAFAGA_CODIGO, CODIGO_TASA_CODIGO)
+    if not permitido:
+        _contar("limitadas_codigo")
+        raise _demasiadas(espera)
+    return code
@@ -1,36 +1,117 @@
 # app/main.py
+from contextlib import asynccontextmanager
 from typing import List, Optional
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta, timezone
-from app import models, schemas, database
-from app.dependencies import get_db
+from datetime import datetime, timedelta
+from app import auditoria, concurrencia, limite_tasa, models, perfilado, schemas, database, escritura, eventos, tareas
+from app.auth import token_es_admin, usuario_de_token
+from app.crud import consultas
+from app.crud import horarios as horarios_crud
+from app.dependencies import get_db, get_read_db, lee_de_primaria, marcar_escritura
+from app.utils import agenda, archivo, busqueda, calendario, espera, ocupacion
+from app.utils.respuesta import GZIP_MIN_BYTES, lista_json
+from app.utils.tiempo import ahora_utc, a_utc_naive
 # Routers
 from app.routers.usuarios import router as router_usuarios
 from app.routers.horarios import router as router_horarios
 from app.routers.emprendedores import router as router_emprendimiento  # <- nombre coherente con tu archivo
+from app.routers.admin import router as router_admin
+from app.routers.calendario import router as router_calendario
 
 # =========================================================
 # App + CORS
 # =========================================================
-app = FastAPI()
-
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Jobs en segundo plano (archivo, limpieza, recordatorios)
+    auditoria.iniciar()
+    tarea = tareas.iniciar()
+    yield
+    await tareas.detener(tarea)
+    auditoria.detener()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Profiling a pedido (X-Profile: 1 de un admin, o PERFIL_MUESTREO); mide sólo el handler
+app.add_middleware(perfilado.PerfiladoMiddleware, es_admin=token_es_admin)
+# Límite de concurrencia adaptativo (queda adentro de CORS: los 503 llevan los headers)
+app.add_middleware(concurrencia.LimiteConcurrenciaMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://127.0.0.1:5173"],
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
-    allow_headers=["Authorization", "Content-Type", "Accept", "Origin"],
+    allow_headers=["Authorization", "Content-Type", "Accept", "Origin", "If-Match"],
+    expose_headers=["ETag"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES)
+
+
+@app.middleware("http")
+async def leer_primaria_tras_escritura(request: Request, call_next):
+    """Read-your-writes: tras una escritura OK, los GET de este usuario van a la primaria un rato."""
+    if database.engine_lectura is database.engine:
+        return await call_next(request)
+    usuario_id = usuario_de_token(request.headers.get("Authorization"))
+    request.state.leer_primaria = usuario_id is not None and lee_de_primaria(usuario_id)  # → get_read_db
+    response = await call_next(request)
+    if (
+        usuario_id is not None
+        and request.method in ("POST", "PUT", "PATCH", "DELETE")
+        and response.status_code < 400
+    ):
+        marcar_escritura(usuario_id)
+    return response
+
+
+# Log de acceso/auditoría (el más externo: la latencia incluye la espera en la cola de concurrencia)
+app.add_middleware(auditoria.AuditoriaMiddleware)
 
 # Incluir routers
 app.include_router(router_usuarios)
 app.include_router(router_horarios)
 app.include_router(router_emprendimiento)
+app.include_router(router_admin)
+app.include_router(router_calendario)
+
+
+@app.get("/metricas/concurrencia")
+def metricas_concurrencia():
+    """Límite actual, en curso, en cola y rechazos por presupuesto (auth / escritura / lectura)."""
+    return concurrencia.metricas()
 
-# Crear tablas
+
+@app.get("/metricas/codigos")
+def metricas_codigos():
+    """Requests limitadas (por IP / por código) y aciertos del cache de códigos inválidos."""
+    return limite_tasa.metricas()
+
+
+# Captura de SQL para los perfiles (no-op si la request no se está perfilando) y conteo para el log
+for _engine in {database.engine, database.engine_lectura}:
+    perfilado.instrumentar_engine(_engine)
+    auditoria.instrumentar_engine(_engine)
+
+# Crear tablas (y columnas/índices nuevos en DBs existentes)
+ocupacion_nueva = not inspect(database.engine).has_table(models.OcupacionDiaria.__tablename__)
 models.Base.metadata.create_all(bind=database.engine)
+database.agregar_columnas_faltantes()
+database.actualizar_foreign_keys()  # ON DELETE CASCADE y AUTOINCREMENT en DBs creadas antes
+archivo.reservar_ids_archivados(database.engine)
+database.crear_indices_faltantes()
+busqueda.crear_indice(database.engine)
+if ocupacion_nueva:
+    # DB anterior al resumen: se llena desde turnos/reservas antes de que los
+    # write paths empiecen a sumarle deltas (si no, quedan filas negativas)
+    with database.SessionLocal() as _db:
+        ocupacion.recalcular(_db)
+        _db.commit()
+calendario.crear_triggers(database.engine)  # contador de cambios de los feeds .ics
 
 # =========================================================
 # RESERVAS
@@ -44,67 +125,85 @@ def crear_reserva(
     db: Session = Depends(get_db),
     current_user: models.Usuario = Depends(get_current_user),
 ):
-    # 1) Turno existente
-    turno = db.query(models.Turno).filter(models.Turno.id == reserva.turno_id).first()
-    if not turno:
-        raise HTTPException(status_code=404, detail="Turno no encontrado")
-
-    # 2) Capacidad del turno
-    reservas_existentes = (
-        db.query(models.Reserva).filter(models.Reserva.turno_id == turno.id).count()
-    )
-    if reservas_existentes >= turno.capacidad:
-        raise HTTPException(status_code=400, detail="No hay lugares disponibles en este turno")
-
-    # 3) Evitar doble reserva en el mismo turno por el mismo usuario (del token)
-    ya_reservo = (
-        db.query(models.Reserva)
-        .filter(
-            models.Reserva.turno_id == turno.id,
-            models.Reserva.usuario_id == current_user.id,
-        )
-        .first()
-    )
-    if ya_reservo:
-        raise HTTPException(status_code=400, detail="Ya tenés una reserva en este turno")
+    usuario_id = current_user.id
 
-    # 4) Regla: si NO sos dueño de esa grilla, permitir solo 1 reserva futura con ese emprendedor
-    servicio = db.query(models.Servicio).filter(models.Servicio.id == turno.servicio_id).first()
-    if not servicio:
-        raise HTTPException(status_code=404, detail="Servicio no encontrado")
+    def escribir(db: Session):
+        # 1) Turno existente
+        turno = consultas.turno_por_id(db, reserva.turno_id)
+        if not turno:
+            raise HTTPException(status_code=404, detail="Turno no encontrado")
 
-    emprendedor_id_del_turno = servicio.emprendedor_id
-
-    # ¿El usuario actual es dueño de esa grilla?
-    es_duenio = db.query(models.Emprendedor).filter(
-        models.Emprendedor.usuario_id == current_user.id,
-        models.Emprendedor.id == emprendedor_id_del_turno,
-    ).first() is not None
+        # 2) Capacidad del turno
+        reservas_existentes = consultas.reservas_en_turno(db, turno.id)
+        if reservas_existentes >= turno.capacidad:
+            raise HTTPException(
+                status_code=400,
+                detail="No hay lugares disponibles en este turno. Podés anotarte en la lista de espera",
+            )
 
-    if not es_duenio:
-        ahora = datetime.utcnow()
-        reserva_activa_con_mismo_emprendedor = (
+        # 3) Evitar doble reserva en el mismo turno por el mismo usuario (del token)
+        ya_reservo = (
             db.query(models.Reserva)
-            .join(models.Turno, models.Reserva.turno_id == models.Turno.id)
-            .join(models.Servicio, models.Turno.servicio_id == models.Servicio.id)
             .filter(
-                models.Reserva.usuario_id == current_user.id,
-                models.Servicio.emprendedor_id == emprendedor_id_del_turno,
-                models.Turno.fecha_hora_inicio >= ahora,  # solo futuras
+                models.Reserva.turno_id == turno.id,
+                models.Reserva.usuario_id == usuario_id,
             )
             .first()
         )
-        if reserva_activa_con_mismo_emprendedor:
-            raise HTTPException(
-                status_code=400,
-                detail="Ya tenés una reserva activa con este emprendimiento",
+        if ya_reservo:
+            raise HTTPException(status_code=400, detail="Ya tenés una reserva en este turno")
+
+        # 4) Regla: si NO sos dueño de esa grilla, permitir solo 1 reserva futura con ese emprendedor
+        servicio = db.query(models.Servicio).filter(models.Servicio.id == turno.servicio_id).first()
+        if not servicio:
+            raise HTTPException(status_code=404, detail="Servicio no encontrado")
+
+        emprendedor_id_del_turno = servicio.emprendedor_id
+
+        # ¿El usuario actual es dueño de esa grilla?
+        es_duenio = db.query(models.Emprendedor).filter(
+            models.Emprendedor.usuario_id == usuario_id,
+            models.Emprendedor.id == emprendedor_id_del_turno,
+        ).first() is not None
+
+        if not es_duenio:
+            ahora = ahora_utc()
+            reserva_activa_con_mismo_emprendedor = (
+                db.query(models.Reserva)
+                .join(models.Turno, models.Reserva.turno_id == models.Turno.id)
+                .join(models.Servicio, models.Turno.servicio_id == models.Servicio.id)
+                .filter(
+                    models.Reserva.usuario_id == usuario_id,
+                    models.Servicio.emprendedor_id == emprendedor_id_del_turno,
+                    models.Turno.fecha_hora_inicio >= ahora,  # solo futuras
+                )
+                .first()
             )
-
-    # 5) Crear reserva (forzamos usuario_id = current_user.id)
-    nueva = models.Reserva(turno_id=reserva.turno_id, usuario_id=current_user.id)
-    db.add(nueva)
-    db.commit()
-    db.refresh(nueva)
+            if reserva_activa_con_mismo_emprendedor:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Ya tenés una reserva activa con este emprendimiento",
+                )
+
+        # 5) Crear reserva (forzamos el usuario del token)
+        nueva = models.Reserva(turno_id=reserva.turno_id, usuario_id=usuario_id)
+        db.add(nueva)
+        ocupacion.reserva_creada(db, turno, servicio.emprendedor)
+        espera.salir_de_la_fila(db, turno.id, usuario_id)  # si estaba esperando este turno
+        db.flush()
+        return nueva, turno, emprendedor_id_del_turno, turno.capacidad - reservas_existentes - 1
+
+    nueva, turno, emprendedor_id, libres = escritura.ejecutar(db, escribir)
+    auditoria.evento("reserva_creada", reserva_id=nueva.id, turno_id=turno.id)
+    if libres <= 0:
+        agenda.marcar_ocupado(
+            emprendedor_id, turno.fecha_hora_inicio,
+            turno.fecha_hora_inicio + timedelta(minutes=turno.duracion_minutos or 30),
+        )
+    eventos.publicar_disponibilidad(
+        turno.servicio_id, "slot-taken", turno.id, turno.fecha_hora_inicio,
+        libres=libres, motivo="reserva",
+    )
     return nueva
 
 
@@ -112,7 +211,7 @@ def crear_reserva(
 def listar_reservas(
     emprendedor_id: Optional[int] = None,
     servicio_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     Devuelve reservas. Si viene emprendedor_id, filtra por dueño del servicio;
@@ -120,7 +219,7 @@ def listar_reservas(
     Esto permite al frontend pedir /reservas?emprendedor_id=XXX para mostrar solo los turnos de esa grilla.
     """
     q = (
-        db.query(models.Reserva)
+        db.query(models.Reserva.id, models.Reserva.turno_id, models.Reserva.usuario_id)
         .join(models.Turno, models.Reserva.turno_id == models.Turno.id)
         .join(models.Servicio, models.Turno.servicio_id == models.Servicio.id)
     )
@@ -130,7 +229,7 @@ def listar_reservas(
     if servicio_id is not None:
         q = q.filter(models.Servicio.id == servicio_id)
 
-    return q.all()
+    return lista_json(schemas.ReservaResponse, q.all())
 
 
 @app.get("/reservas/{reserva_id}", response_model=schemas.ReservaResponse)
@@ -143,138 +242,304 @@ def detalle_reserva(reserva_id: int, db: Session = Depends(get_db)):
 
 @app.delete("/reservas/{reserva_id}")
 def eliminar_reserva(reserva_id: int, db: Session = Depends(get_db)):
-    reserva = db.query(models.Reserva).filter(models.Reserva.id == reserva_id).first()
-    if not reserva:
-        raise HTTPException(status_code=404, detail="Reserva no encontrada")
-    db.delete(reserva)
-    db.commit()
+    def escribir(db: Session):
+        reserva = db.query(models.Reserva).filter(models.Reserva.id == reserva_id).first()
+        if not reserva:
+            raise HTTPException(status_code=404, detail="Reserva no encontrada")
+        turno = reserva.turno
+        ocupacion.reserva_eliminada(db, turno, turno.servicio.emprendedor)
+        db.delete(reserva)
+        db.flush()
+        # el lugar liberado pasa al primero de la lista de espera, en esta misma transacción
+        promovidos = espera.promover(db, turno)
+        ocupadas = consultas.reservas_en_turno(db, turno.id)
+        return turno, turno.servicio.emprendedor_id, ocupadas, promovidos
+
+    turno, emprendedor_id, ocupadas, promovidos = escritura.ejecutar(db, escribir)
+    auditoria.evento("reserva_eliminada", reserva_id=reserva_id, turno_id=turno.id)
+    for usuario_id, promovida_id in promovidos:
+        auditoria.evento("espera_promovida", reserva_id=promovida_id, turno_id=turno.id, usuario_id=usuario_id)
+    espera.notificar_promociones(turno, promovidos)
+    if ocupadas < turno.capacidad:
+        agenda.invalidar(
+            emprendedor_id, turno.fecha_hora_inicio,
+            turno.fecha_hora_inicio + timedelta(minutes=turno.duracion_minutos or 30),
+        )
+        eventos.publicar_disponibilidad(
+            turno.servicio_id, "slot-freed", turno.id, turno.fecha_hora_inicio,
+            libres=turno.capacidad - ocupadas, motivo="cancelacion",
+        )
     return {"ok": True, "mensaje": "Reserva eliminada"}
 
 
-@app.get("/usuarios/{usuario_id}/reservas", response_model=List[schemas.ReservaOut])
-def listar_reservas_usuario(usuario_id: int, db: Session = Depends(get_db)):
-    usuario = db.query(models.Usuario).filter(models.Usuario.id == usuario_id).first()
-    if not usuario:
-        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+# =========================================================
+# LISTA DE ESPERA
+# =========================================================
+@app.post("/turnos/{turno_id}/espera", response_model=schemas.EsperaOut)
+def anotarse_en_espera(
+    turno_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.Usuario = Depends(get_current_user),
+):
+    """
+    Anota al usuario en la fila de un turno lleno. Si se libera un lugar se le
+    asigna la reserva automáticamente y se lo notifica. Idempotente.
+    """
+    usuario_id = current_user.id
+
+    def escribir(db: Session):
+        turno = consultas.turno_por_id(db, turno_id)
+        if not turno:
+            raise HTTPException(status_code=404, detail="Turno no encontrado")
+        if turno.fecha_hora_inicio < ahora_utc():
+            raise HTTPException(status_code=400, detail="El turno ya pasó")
+        ya_reservo = db.query(models.Reserva.id).filter(
+            models.Reserva.turno_id == turno.id,
+            models.Reserva.usuario_id == usuario_id,
+        ).first()
+        if ya_reservo:
+            raise HTTPException(status_code=400, detail="Ya tenés una reserva en este turno")
 
-    reservas = (
-        db.query(models.Reserva)
-        .join(models.Turno, models.Reserva.turno_id == models.Turno.id)
-        .join(models.Servicio, models.Turno.servicio_id == models.Servicio.id)
-        .filter(models.Reserva.usuario_id == usuario_id)
-        .all()
-    )
+        existente = db.query(models.EsperaTurno).filter(
+            models.EsperaTurno.turno_id == turno.id,
+            models.EsperaTurno.usuario_id == usuario_id,
+        ).first()
+        if existente:
+            return schemas.EsperaOut(id=existente.id, turno_id=turno.id, posicion=espera.posicion(db, existente))
 
-    resultados = [
-        schemas.ReservaOut(
-            id=r.id,
-            turno_id=r.turno.id,
-            fecha_hora_inicio=r.turno.fecha_hora_inicio,
-            precio=r.turno.precio,
-            servicio_nombre=r.turno.servicio.nombre,
-            emprendedor_id=r.turno.servicio.emprendedor_id,
-        )
-        for r in reservas
-    ]
-    return resultados
+        ocupadas = consultas.reservas_en_turno(db, turno.id)
+        if ocupadas < turno.capacidad:
+            raise HTTPException(status_code=400, detail="El turno tiene lugares disponibles: reservalo directamente")
 
+        nueva = models.EsperaTurno(turno_id=turno.id, usuario_id=usuario_id)
+        db.add(nueva)
+        db.flush()
+        return schemas.EsperaOut(id=nueva.id, turno_id=turno.id, posicion=espera.posicion(db, nueva))
 
-@app.post("/reservas/directo", response_model=schemas.ReservaResponse)
-def reservar_directo(
-    data: schemas.ReservaDirectaCreate,
+    return escritura.ejecutar(db, escribir)
+
+
+@app.delete("/turnos/{turno_id}/espera")
+def salir_de_espera(
+    turno_id: int,
     db: Session = Depends(get_db),
     current_user: models.Usuario = Depends(get_current_user),
 ):
-    # helper: llevar cualquier datetime (aware o naive) a UTC naive
-    def to_utc_naive(dt: datetime) -> datetime:
-        if dt.tzinfo is None:
-            return dt  # asumimos que ya está en UTC naive
-        return dt.astimezone(timezone.utc).replace(tzinfo=None)
-
-    # 1) Servicio válido
-    servicio = db.query(models.Servicio).filter(models.Servicio.id == data.servicio_id).first()
-    if not servicio:
-        raise HTTPException(status_code=404, detail="Servicio no encontrado")
-
-    # 2) Emprendedor dueño del servicio
+    borradas = db.query(models.EsperaTurno).filter(
+        models.EsperaTurno.turno_id == turno_id,
+        models.EsperaTurno.usuario_id == current_user.id,
+    ).delete(synchronize_session=False)
+    db.commit()
+    if not borradas:
+        raise HTTPException(status_code=404, detail="No estás en la lista de espera de este turno")
+    return {"ok": True, "mensaje": "Saliste de la lista de espera"}
+
+
+@app.get("/usuarios/{usuario_id}/reservas", response_model=List[schemas.ReservaOut])
+def listar_reservas_usuario(usuario_id: int, db: Session = Depends(get_read_db)):
+    usuario = consultas.usuario_por_id(db, usuario_id)
+    if not usuario:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+
+    # activas + historial (turnos archivados) en una sola consulta
+    filas = db.execute(archivo.reservas_de_usuario(usuario_id)).all()
+    return lista_json(schemas.ReservaOut, filas)
+
+
+def _validar_slot_directo(
+    db: Session,
+    servicio: models.Servicio,
+    usuario_id: int,
+    inicio: datetime,
+    reserva_actual: Optional[models.Reserva] = None,
+) -> datetime:
+    """
+    Reglas de /reservas/directo para reservar `servicio` en `inicio` (UTC naive).
+    Con `reserva_actual` (reprogramación) esa reserva y su turno no cuentan.
+    Devuelve el fin estimado.
+    """
     emprendedor_id_del_turno = servicio.emprendedor_id
 
-    # 3) Regla: si NO es dueño, solo 1 reserva futura con ese emprendedor
+    # Regla: si NO es dueño, solo 1 reserva futura con ese emprendedor
     es_duenio = db.query(models.Emprendedor).filter(
-        models.Emprendedor.usuario_id == current_user.id,
+        models.Emprendedor.usuario_id == usuario_id,
         models.Emprendedor.id == emprendedor_id_del_turno,
     ).first() is not None
 
     if not es_duenio:
-        ahora = datetime.utcnow()  # naive UTC
-        reserva_activa_con_mismo_emprendedor = (
+        ahora = ahora_utc()  # naive UTC
+        q = (
             db.query(models.Reserva)
             .join(models.Turno, models.Reserva.turno_id == models.Turno.id)
             .join(models.Servicio, models.Turno.servicio_id == models.Servicio.id)
             .filter(
-                models.Reserva.usuario_id == current_user.id,
+                models.Reserva.usuario_id == usuario_id,
                 models.Servicio.emprendedor_id == emprendedor_id_del_turno,
                 models.Turno.fecha_hora_inicio >= ahora,  # solo futuras
             )
-            .first()
         )
-        if reserva_activa_con_mismo_emprendedor:
+        if reserva_actual is not None:
+            q = q.filter(models.Reserva.id != reserva_actual.id)
+        if q.first():
             raise HTTPException(status_code=400, detail="Ya tenés una reserva activa con este emprendimiento")
 
-    # 4) (opcional) validar contra horarios de atención
-
-    # 5) Evitar superposición con turnos existentes del mismo emprendedor
-    inicio = to_utc_naive(data.fecha_hora_inicio)  # <-- normalizamos
+    # Horario de atención (si lo cargó) y superposición con turnos existentes del
+    # mismo emprendedor. Siempre contra la DB, dentro de la transacción: el bitmap
+    # en memoria puede estar atrasado (otros procesos/conexiones, horarios recién
+    # editados) y no sirve para aceptar una reserva
     dur_min = servicio.duracion or 30
     fin_estimada = inicio + timedelta(minutes=dur_min)
 
-    # Traemos candidatos cercanos y chequeamos solape en Python
-    candidatos = (
-        db.query(models.Turno)
-        .join(models.Servicio, models.Turno.servicio_id == models.Servicio.id)
-        .filter(
-            models.Servicio.emprendedor_id == emprendedor_id_del_turno,
-            models.Turno.fecha_hora_inicio >= (inicio - timedelta(hours=6)),
-            models.Turno.fecha_hora_inicio <= (inicio + timedelta(hours=6)),
+    if horarios_crud.dentro_de_horario(db, servicio.emprendedor, inicio, fin_estimada) is False:
+        raise HTTPException(status_code=400, detail="Fuera del horario de atención")
+
+    excluir = reserva_actual.turno_id if reserva_actual is not None else None
+    if agenda.solape_exacto(db, servicio.emprendedor_id, inicio, fin_estimada, excluir_turno_id=excluir):
+        raise HTTPException(status_code=400, detail="Ese horario ya está ocupado")
+    return fin_estimada
+
+
+@app.post("/reservas/directo", response_model=schemas.ReservaResponse)
+def reservar_directo(
+    data: schemas.ReservaDirectaCreate,
+    db: Session = Depends(get_db),
+    current_user: models.Usuario = Depends(get_current_user),
+):
+    usuario_id = current_user.id
+
+    # Turno + reserva en una sola transacción
+    def escribir(db: Session):
+        # 1) Servicio válido
+        servicio = db.query(models.Servicio).filter(models.Servicio.id == data.servicio_id).first()
+        if not servicio:
+            raise HTTPException(status_code=404, detail="Servicio no encontrado")
+
+        # 2) Normalizamos a UTC naive (sin offset = hora local del emprendedor)
+        inicio = a_utc_naive(data.fecha_hora_inicio, servicio.emprendedor.zona_horaria)
+
+        # 3) Una reserva activa por emprendimiento, horario de atención y solapes
+        fin_estimada = _validar_slot_directo(db, servicio, usuario_id, inicio)
+
+        # 4) Crear Turno (guardamos UTC naive)
+        nuevo_turno = models.Turno(
+            servicio_id=servicio.id,
+            fecha_hora_inicio=inicio,      # UTC naive
+            duracion_minutos=servicio.duracion or 30,
+            capacidad=1,
+            precio=servicio.precio or 0,
+            creado_por_reserva=True,
         )
-        .all()
+        db.add(nuevo_turno)
+        ocupacion.turno_creado(db, nuevo_turno, servicio.emprendedor)
+        db.flush()  # necesitamos el id del turno
+
+        # 5) Crear Reserva inmediata para el usuario actual
+        nueva_reserva = models.Reserva(turno_id=nuevo_turno.id, usuario_id=usuario_id)
+        db.add(nueva_reserva)
+        ocupacion.reserva_creada(db, nuevo_turno, servicio.emprendedor)
+        db.flush()
+        return nueva_reserva, nuevo_turno, servicio.emprendedor_id, fin_estimada
+
+    nueva_reserva, nuevo_turno, emprendedor_id, fin = escritura.ejecutar(db, escribir)
+    auditoria.evento("reserva_creada", reserva_id=nueva_reserva.id, turno_id=nuevo_turno.id, directa=True)
+    agenda.marcar_ocupado(emprendedor_id, nuevo_turno.fecha_hora_inicio, fin)
+    eventos.publicar_disponibilidad(
+        nuevo_turno.servicio_id, "slot-taken", nuevo_turno.id, nuevo_turno.fecha_hora_inicio,
+        libres=0, motivo="reserva",
     )
 
-    def turno_end(t: models.Turno) -> datetime:
-        d = getattr(t, "duracion_minutos", None)
-        if not d:
-            if t.servicio_id == servicio.id:
-                d = dur_min
-            else:
-                svc = db.query(models.Servicio).get(t.servicio_id)
-                d = (svc.duracion if svc and svc.duracion else 30)
-        return t.fecha_hora_inicio + timedelta(minutes=d)
-
-    # Solapa si: A.start < B.end && B.start < A.end
-    for t in candidatos:
-        t_fin = turno_end(t)  # ambos naive
-        solapa = (t.fecha_hora_inicio < fin_estimada) and (inicio < t_fin)
-        if solapa:
-            reservas_count = db.query(models.Reserva).filter(models.Reserva.turno_id == t.id).count()
-            if reservas_count >= (t.capacidad or 1):
-                raise HTTPException(status_code=400, detail="Ese horario ya está ocupado")
-
-    # 6) Crear Turno (guardamos UTC naive)
-    nuevo_turno = models.Turno(
-        servicio_id=servicio.id,
-        fecha_hora_inicio=inicio,      # UTC naive
-        duracion_minutos=dur_min,
-        capacidad=1,
-        precio=servicio.precio or 0,
-    )
-    db.add(nuevo_turno)
-    db.commit()
-    db.refresh(nuevo_turno)
+    return nueva_reserva
 
-    # 7) Crear Reserva inmediata para el usuario actual
-    nueva_reserva = models.Reserva(turno_id=nuevo_turno.id, usuario_id=current_user.id)
-    db.add(nueva_reserva)
-    db.commit()
-    db.refresh(nueva_reserva)
 
-    return nueva_reserva
+@app.post("/reservas/{reserva_id}/reprogramar", response_model=schemas.ReservaResponse)
+def reprogramar_reserva(
+    reserva_id: int,
+    data: schemas.ReservaReprogramar,
+    db: Session = Depends(get_db),
+    current_user: models.Usuario = Depends(get_current_user),
+):
+    """
+    Mueve una reserva a otro horario en UNA transacción: valida el nuevo slot
+    con las reglas de /reservas/directo, mueve la reserva (mismo id), libera el
+    lugar en el turno anterior (lista de espera incluida) y borra ese turno si
+    lo había creado una reserva directa y quedó vacío.
+    """
+    usuario_id = current_user.id
+
+    def escribir(db: Session):
+        reserva = db.query(models.Reserva).filter(models.Reserva.id == reserva_id).first()
+        if not reserva:
+            raise HTTPException(status_code=404, detail="Reserva no encontrada")
+        if reserva.usuario_id != usuario_id:
+            raise HTTPException(status_code=403, detail="No autorizado")
+        anterior = reserva.turno
+        ahora = ahora_utc()
+        if anterior.fecha_hora_inicio < ahora:
+            raise HTTPException(status_code=400, detail="La reserva ya pasó")
+
+        servicio_id = data.servicio_id or anterior.servicio_id
+        servicio = db.query(models.Servicio).filter(models.Servicio.id == servicio_id).first()
+        if not servicio:
+            raise HTTPException(status_code=404, detail="Servicio no encontrado")
+        inicio = a_utc_naive(data.fecha_hora_inicio, servicio.emprendedor.zona_horaria)
+        if inicio < ahora:
+            raise HTTPException(status_code=400, detail="No se puede reprogramar a un horario pasado")
+        fin = _validar_slot_directo(db, servicio, usuario_id, inicio, reserva_actual=reserva)
+
+        # nuevo turno + mover la reserva
+        nuevo = models.Turno(
+            servicio_id=servicio.id,
+            fecha_hora_inicio=inicio,
+            duracion_minutos=servicio.duracion or 30,
+            capacidad=1,
+            precio=servicio.precio or 0,
+            creado_por_reserva=True,
+        )
+        db.add(nuevo)
+        ocupacion.turno_creado(db, nuevo, servicio.emprendedor)
+        db.flush()
+        e_anterior = anterior.servicio.emprendedor
+        ocupacion.reserva_eliminada(db, anterior, e_anterior)
+        reserva.turno_id = nuevo.id
+        reserva.recordatorio_enviado = None  # el recordatorio era del horario viejo
+        ocupacion.reserva_creada(db, nuevo, servicio.emprendedor)
+        db.flush()
+
+        # turno anterior: pasa el primero en espera; si era de una reserva directa y quedó vacío, se borra
+        promovidos = espera.promover(db, anterior)
+        ocupadas = consultas.reservas_en_turno(db, anterior.id)
+        previo = {
+            "id": anterior.id,
+            "servicio_id": anterior.servicio_id,
+            "inicio": anterior.fecha_hora_inicio,
+            "fin": anterior.fecha_hora_inicio + timedelta(minutes=anterior.duracion_minutos or 30),
+            "emprendedor_id": e_anterior.id,
+            "libres": anterior.capacidad - ocupadas,
+            "borrado": anterior.creado_por_reserva and ocupadas == 0,
+        }
+        if previo["borrado"]:
+            ocupacion.turno_eliminado(db, anterior, e_anterior, 0)
+            db.delete(anterior)
+            db.flush()
+        return reserva, nuevo, fin, servicio.emprendedor_id, anterior, previo, promovidos
+
+    reserva, nuevo, fin, emprendedor_id, anterior, previo, promovidos = escritura.ejecutar(db, escribir)
+    auditoria.evento(
+        "reserva_reprogramada", reserva_id=reserva.id, turno_id=nuevo.id, turno_anterior_id=previo["id"],
+    )
+    for usuario_id, promovida_id in promovidos:
+        auditoria.evento("espera_promovida", reserva_id=promovida_id, turno_id=previo["id"], usuario_id=usuario_id)
+
+    agenda.marcar_ocupado(emprendedor_id, nuevo.fecha_hora_inicio, fin)
+    eventos.publicar_disponibilidad(
+        nuevo.servicio_id, "slot-taken", nuevo.id, nuevo.fecha_hora_inicio, libres=0, motivo="reprogramacion",
+    )
+    espera.notificar_promociones(anterior, promovidos)
+    if previo["borrado"] or previo["libres"] > 0:
+        agenda.invalidar(previo["emprendedor_id"], previo["inicio"], previo["fin"])
+        eventos.publicar_disponibilidad(
+            previo["servicio_id"], "slot-taken" if previo["borrado"] else "slot-freed", previo["id"],
+            previo["inicio"], libres=0 if previo["borrado"] else previo["libres"],
+            motivo="turno-eliminado" if previo["borrado"] else "reprogramacion",
+        )
+    return reserva
@@ -1,9 +1,10 @@
 from sqlalchemy import (
-    Column, Integer, String, ForeignKey, DateTime, Float, Text, UniqueConstraint, Time
+    Column, Integer, String, ForeignKey, DateTime, Date, Float, Text, UniqueConstraint, Time, Index,
+    Boolean,
 )
 from sqlalchemy.orm import relationship
 from app.database import Base
-import datetime
+from app.utils.tiempo import ahora_utc
 
 
 # =========================
@@ -13,12 +14,45 @@ class Horario(Base):
     __tablename__ = "horarios"
 
     id = Column(Integer, primary_key=True, index=True)
-    emprendedor_id = Column(Integer, ForeignKey("emprendedores.id"), nullable=False)
+    emprendedor_id = Column(
+        Integer, ForeignKey("emprendedores.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     dia_semana = Column(String, nullable=False)  # "Lunes", "Martes", etc.
     hora_inicio = Column(Time, nullable=False)
     hora_fin = Column(Time, nullable=False)
+    version = Column(Integer, nullable=False, server_default="1")  # concurrencia optimista
 
     emprendedor = relationship("Emprendedor", back_populates="horarios")
+    ventanas = relationship(
+        "HorarioVentana", back_populates="horario",
+        cascade="all, delete-orphan", passive_deletes=True,
+    )
+
+    __mapper_args__ = {"version_id_col": version}
+
+
+# Límites UTC precalculados de cada horario, una fila por horario y semana.
+# Permiten validar disponibilidad con un range scan sobre columnas UTC.
+class HorarioVentana(Base):
+    __tablename__ = "horarios_ventanas"
+
+    id = Column(Integer, primary_key=True, index=True)
+    horario_id = Column(
+        Integer, ForeignKey("horarios.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    emprendedor_id = Column(
+        Integer, ForeignKey("emprendedores.id", ondelete="CASCADE"), nullable=False
+    )
+    semana = Column(Date, nullable=False)  # lunes (hora local del emprendedor)
+    inicio_utc = Column(DateTime, nullable=False)
+    fin_utc = Column(DateTime, nullable=False)
+
+    horario = relationship("Horario", back_populates="ventanas")
+
+    __table_args__ = (
+        Index("ix_ventanas_emprendedor_inicio", "emprendedor_id", "inicio_utc"),
+        Index("ix_ventanas_emprendedor_semana", "emprendedor_id", "semana"),
+    )
 
 
 # =========================
@@ -38,8 +72,32 @@ class Usuario(Base):
 
     token = Column(String, nullable=True)
 
-    emprendedor = relationship("Emprendedor", back_populates="usuario", uselist=False)
-    reservas = relationship("Reserva", back_populates="usuario")
+    # ON DELETE CASCADE en la DB: el ORM no carga los hijos para borrarlos
+    emprendedor = relationship(
+        "Emprendedor", back_populates="usuario", uselist=False,
+        cascade="all, delete-orphan", passive_deletes=True,
+    )
+    reservas = relationship(
+        "Reserva", back_populates="usuario", cascade="all, delete-orphan", passive_deletes=True
+    )
+
+
+# Refresh tokens: se guarda sólo el SHA-256 del token. Cada uso lo rota (se
+# marca `usado` y se emite otro de la misma `familia`); si llega uno ya usado o
+# revocado, se revoca la familia entera (posible robo).
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    usuario_id = Column(
+        Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    token_hash = Column(String, unique=True, index=True, nullable=False)  # sha256 hex
+    familia = Column(String, nullable=False, index=True)  # cadena de rotaciones desde un login
+    creado = Column(DateTime, nullable=False, default=ahora_utc)
+    expira = Column(DateTime, nullable=False)  # UTC naive
+    usado = Column(DateTime, nullable=True)     # rotado → ya no sirve
+    revocado = Column(DateTime, nullable=True)  # logout o reuso detectado
 
 
 # =========================
@@ -49,7 +107,9 @@ class Emprendedor(Base):
     __tablename__ = "emprendedores"
 
     id = Column(Integer, primary_key=True, index=True)
-    usuario_id = Column(Integer, ForeignKey("usuarios.id"), unique=True, nullable=False)
+    usuario_id = Column(
+        Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), unique=True, nullable=False
+    )
 
     # Datos del comercio (compatibilidad: pueden ser NULL en DB antigua)
     negocio = Column(String, nullable=True)
@@ -63,18 +123,31 @@ class Emprendedor(Base):
     cuit = Column(String, nullable=True)
     foto_url = Column(String, nullable=True)
 
+    # Zona IANA en la que el emprendedor carga horarios y turnos (NULL → zona por defecto)
+    zona_horaria = Column(String, nullable=True)
+
+    # Ubicación (cargada a mano o geocodificada offline desde `direccion`)
+    lat = Column(Float, nullable=True)
+    lon = Column(Float, nullable=True)
+    geohash = Column(String, nullable=True, index=True)  # celda para búsquedas "cerca de"
+
     # Código público único para reservar por código
     codigo_cliente = Column(String, unique=True, index=True, nullable=True)
 
+    # Concurrencia optimista (ETag / If-Match en PUT)
+    version = Column(Integer, nullable=False, server_default="1")
+
     # Relaciones
     usuario = relationship("Usuario", back_populates="emprendedor")
     servicios = relationship(
-        "Servicio", back_populates="emprendedor", cascade="all, delete-orphan"
+        "Servicio", back_populates="emprendedor", cascade="all, delete-orphan", passive_deletes=True
     )
     horarios = relationship(
-        "Horario", back_populates="emprendedor", cascade="all, delete-orphan"
+        "Horario", back_populates="emprendedor", cascade="all, delete-orphan", passive_deletes=True
     )
 
+    __mapper_args__ = {"version_id_col": version}
+
 
 # =========================
 # Servicio
@@ -90,10 +163,14 @@ class Servicio(Base):
     duracion = Column(Integer, nullable=False, default=0)  # minutos
     precio = Column(Float, nullable=True, default=0)
 
-    emprendedor_id = Column(Integer, ForeignKey("emprendedores.id"), nullable=False)
+    emprendedor_id = Column(
+        Integer, ForeignKey("emprendedores.id", ondelete="CASCADE"), nullable=False, index=True
+    )
 
     emprendedor = relationship("Emprendedor", back_populates="servicios")
-    turnos = relationship("Turno", back_populates="servicio", cascade="all, delete-orphan")
+    turnos = relationship(
+        "Turno", back_populates="servicio", cascade="all, delete-orphan", passive_deletes=True
+    )
 
 
 # =========================
@@ -103,15 +180,30 @@ class Turno(Base):
     __tablename__ = "turnos"
 
     id = Column(Integer, primary_key=True, index=True)
-    servicio_id = Column(Integer, ForeignKey("servicios.id"), nullable=False)
+    servicio_id = Column(Integer, ForeignKey("servicios.id", ondelete="CASCADE"), nullable=False)
 
-    fecha_hora_inicio = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    fecha_hora_inicio = Column(DateTime, nullable=False, default=ahora_utc)  # UTC naive
     duracion_minutos = Column(Integer, nullable=False)
     capacidad = Column(Integer, nullable=False, default=1)
     precio = Column(Float, nullable=True)
+    version = Column(Integer, nullable=False, server_default="1")  # concurrencia optimista
+    # creado por /reservas/directo (no por el dueño): se borra si queda vacío al reprogramar
+    creado_por_reserva = Column(Boolean, nullable=False, server_default="0")
 
     servicio = relationship("Servicio", back_populates="turnos")
-    reservas = relationship("Reserva", back_populates="turno", cascade="all, delete-orphan")
+    reservas = relationship(
+        "Reserva", back_populates="turno", cascade="all, delete-orphan", passive_deletes=True
+    )
+    esperas = relationship(
+        "EsperaTurno", back_populates="turno", cascade="all, delete-orphan", passive_deletes=True
+    )
+
+    __table_args__ = (
+        # hot path: turnos futuros de un servicio (disponibles, solapes)
+        Index("ix_turnos_servicio_fecha", "servicio_id", "fecha_hora_inicio"),
+        {"sqlite_autoincrement": True},  # ids nunca reusados: turnos_historial conserva el id
+    )
+    __mapper_args__ = {"version_id_col": version}
 
 
 # =========================
@@ -121,12 +213,135 @@ class Reserva(Base):
     __tablename__ = "reservas"
 
     id = Column(Integer, primary_key=True, index=True)
-    turno_id = Column(Integer, ForeignKey("turnos.id"), nullable=False)
-    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+    turno_id = Column(
+        Integer, ForeignKey("turnos.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    usuario_id = Column(
+        Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    recordatorio_enviado = Column(DateTime, nullable=True)  # UTC naive; NULL = pendiente
 
     turno = relationship("Turno", back_populates="reservas")
     usuario = relationship("Usuario", back_populates="reservas")
 
     __table_args__ = (
         UniqueConstraint("turno_id", "usuario_id", name="uq_turno_usuario"),
+        {"sqlite_autoincrement": True},  # ids nunca reusados: reservas_historial conserva el id
+    )
+
+
+# =========================
+# Lista de espera (turnos llenos)
+# =========================
+class EsperaTurno(Base):
+    __tablename__ = "esperas_turno"
+
+    id = Column(Integer, primary_key=True, index=True)
+    turno_id = Column(Integer, ForeignKey("turnos.id", ondelete="CASCADE"), nullable=False)
+    usuario_id = Column(
+        Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    creada = Column(DateTime, nullable=False, default=ahora_utc)  # UTC naive; define el orden
+
+    turno = relationship("Turno", back_populates="esperas")
+
+    __table_args__ = (
+        UniqueConstraint("turno_id", "usuario_id", name="uq_espera_turno_usuario"),
+        Index("ix_esperas_turno_orden", "turno_id", "creada", "id"),
+    )
+
+
+# =========================
+# Ocupación diaria (resumen materializado para dashboards)
+# =========================
+class OcupacionDiaria(Base):
+    __tablename__ = "ocupacion_diaria"
+
+    id = Column(Integer, primary_key=True, index=True)
+    emprendedor_id = Column(
+        Integer, ForeignKey("emprendedores.id", ondelete="CASCADE"), nullable=False
+    )
+    servicio_id = Column(Integer, ForeignKey("servicios.id", ondelete="CASCADE"), nullable=False)
+    fecha = Column(Date, nullable=False)  # día local del emprendedor
+
+    turnos = Column(Integer, nullable=False, default=0)     # cantidad de turnos (slots)
+    capacidad = Column(Integer, nullable=False, default=0)  # suma de capacidades
+    reservados = Column(Integer, nullable=False, default=0)  # reservas hechas
+
+    __table_args__ = (
+        UniqueConstraint("servicio_id", "fecha", name="uq_ocupacion_servicio_fecha"),
+        Index("ix_ocupacion_emprendedor_fecha", "emprendedor_id", "fecha"),
+    )
+
+
+# =========================
+# Historial (turnos/reservas pasados, movidos por el job de archivo)
+# =========================
+class TurnoHistorial(Base):
+    __tablename__ = "turnos_historial"
+
+    id = Column(Integer, primary_key=True)  # mismo id que tenía en turnos
+    servicio_id = Column(Integer, ForeignKey("servicios.id", ondelete="CASCADE"), nullable=False)
+    fecha_hora_inicio = Column(DateTime, nullable=False)
+    duracion_minutos = Column(Integer, nullable=False)
+    capacidad = Column(Integer, nullable=False, default=1)
+    precio = Column(Float, nullable=True)
+    archivado_en = Column(DateTime, nullable=False, default=ahora_utc)
+
+    __table_args__ = (
+        Index("ix_turnos_historial_servicio_fecha", "servicio_id", "fecha_hora_inicio"),
+    )
+
+
+class ReservaHistorial(Base):
+    __tablename__ = "reservas_historial"
+
+    id = Column(Integer, primary_key=True)  # mismo id que tenía en reservas
+    turno_id = Column(
+        Integer, ForeignKey("turnos_historial.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    usuario_id = Column(
+        Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    archivado_en = Column(DateTime, nullable=False, default=ahora_utc)
+
+
+# =========================
+# Jobs en segundo plano (estado persistido, sobrevive reinicios)
+# =========================
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    nombre = Column(String, unique=True, nullable=False)
+    intervalo_segundos = Column(Integer, nullable=False)
+    proxima_ejecucion = Column(DateTime, nullable=False, default=ahora_utc)
+
+    # Lease: sólo el worker que lo tomó lo ejecuta hasta bloqueado_hasta
+    bloqueado_por = Column(String, nullable=True)
+    bloqueado_hasta = Column(DateTime, nullable=True)
+
+    ultima_ejecucion = Column(DateTime, nullable=True)
+    ultimo_error = Column(Text, nullable=True)
+
+
+# =========================
+# Feeds de calendario (.ics)
+# =========================
+class CalendarioFeed(Base):
+    __tablename__ = "calendario_feeds"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tipo = Column(String, nullable=False)  # "usuario" | "emprendedor"
+    dueno_id = Column(Integer, nullable=False)  # usuarios.id o emprendedores.id según tipo
+    token_hash = Column(String, unique=True, index=True, nullable=False)  # sha256 hex
+
+    # Contador de cambios: lo incrementan triggers sobre reservas/turnos/servicios
+    # (utils/calendario.py). Es el ETag del feed; `modificado` su Last-Modified.
+    version = Column(Integer, nullable=False, server_default="1")
+    modificado = Column(DateTime, nullable=False, default=ahora_utc)  # UTC naive
+
+    __table_args__ = (
+        UniqueConstraint("tipo", "dueno_id", name="uq_calendario_feed_dueno"),
+        {"sqlite_autoincrement": True},  # ids nunca reusados: van en el ETag
     )
@@ -0,0 +1,61 @@
+# app/notificaciones.py
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+from app.utils.tiempo import ahora_utc
+
+logger = logging.getLogger("turnera.notificaciones")
+
+# Destino de las notificaciones (recordatorios, avisos, etc.):
+#   NOTIFICACIONES_SINK=log                 → logging (default)
+#   NOTIFICACIONES_SINK=archivo:ruta.jsonl  → una línea JSON por notificación (pruebas locales)
+NOTIFICACIONES_SINK = os.getenv("NOTIFICACIONES_SINK", "log")
+
+
+class Notificador:
+    """Interfaz de un sink de notificaciones. Implementar `enviar` (email, push, etc.)."""
+
+    def enviar(self, tipo: str, usuario_id: int, datos: Dict) -> None:
+        raise NotImplementedError
+
+
+class LogNotificador(Notificador):
+    def enviar(self, tipo: str, usuario_id: int, datos: Dict) -> None:
+        logger.info("notificacion %s usuario=%s %s", tipo, usuario_id, datos)
+
+
+class ArchivoNotificador(Notificador):
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+
+    def enviar(self, tipo: str, usuario_id: int, datos: Dict) -> None:
+        linea = json.dumps(
+            {"tipo": tipo, "usuario_id": usuario_id, "datos": datos, "creada": ahora_utc().isoformat()},
+            default=str,
+            ensure_ascii=False,
+        )
+        with self._lock, open(self.ruta, "a", encoding="utf-8") as f:
+            f.write(linea + "\n")
+
+
+_notificador: Optional[Notificador] = None
+
+
+def get_notificador() -> Notificador:
+    global _notificador
+    if _notificador is None:
+        if NOTIFICACIONES_SINK.startswith("archivo:"):
+            _notificador = ArchivoNotificador(NOTIFICACIONES_SINK.split(":", 1)[1])
+        else:
+            _notificador = LogNotificador()
+    return _notificador
+
+
+def set_notificador(notificador: Notificador) -> None:
+    """Permite enchufar otro sink (ej. uno real de email) al iniciar la app."""
+    global _notificador
+    _notificador = notificador
@@ -0,0 +1,224 @@
+# app/perfilado.py
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+import anyio
+from sqlalchemy import event
+
+from app.utils.tiempo import ahora_utc
+
+logger = logging.getLogger("turnera.perfilado")
+
+# Profiling a pedido: un admin manda `X-Profile: 1` (o se muestrea una fracción
+# PERFIL_MUESTREO de las requests) y la request corre con un profiler de
+# muestreo + captura de SQL. Los handlers sync corren en el threadpool, así que
+# cProfile en el middleware (event loop) no vería nada: un thread aparte toma
+# los stacks de todos los threads cada PERFIL_INTERVALO_MS y se quedan los que
+# pasan por código de app/ (con requests concurrentes pueden mezclarse). El SQL
+# sí es exacto: el contextvar viaja al threadpool. Cada perfil se guarda como
+# JSON en PERFIL_DIR, que funciona como ring buffer de PERFIL_MAX archivos.
+# Sin perfil activo el costo es un ContextVar.get() por query.
+PERFIL_DIR = os.getenv("PERFIL_DIR", "perfiles")
+PERFIL_MAX = int(os.getenv("PERFIL_MAX", "50"))
+PERFIL_MUESTREO = float(os.getenv("PERFIL_MUESTREO", "0"))  # 0..1
+PERFIL_INTERVALO_MS = float(os.getenv("PERFIL_INTERVALO_MS", "2"))
+MAX_SQL = 500  # statements guardados por perfil
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Perfil:
+    def __init__(self, metodo: str, ruta: str, motivo: str):
+        self.id = f"{ahora_utc():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.metodo = metodo
+        self.ruta = ruta
+        self.motivo = motivo  # "header" | "muestreo"
+        self.muestras: Counter = Counter()
+        self.sql: List[Dict] = []
+        self._sql_lock = threading.Lock()
+        self._parar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    # ---- muestreo de stacks ----
+    def iniciar(self) -> None:
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._parar.set()
+        if self._hilo:
+            self._hilo.join()
+
+    def _muestrear(self) -> None:
+        propio = threading.get_ident()
+        intervalo = PERFIL_INTERVALO_MS / 1000
+        while not self._parar.wait(intervalo):
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                pila = _pila(frame)
+                if pila:
+                    self.muestras[pila] += 1
+
+    # ---- SQL ----
+    def registrar_sql(self, sql: str, ms: float) -> None:
+        with self._sql_lock:
+            if len(self.sql) < MAX_SQL:
+                self.sql.append({"sql": sql, "ms": round(ms, 3)})
+
+    def a_dict(self, status: int, duracion: float) -> Dict:
+        return {
+            "id": self.id,
+            "creado": ahora_utc().isoformat() + "Z",
+            "metodo": self.metodo,
+            "ruta": self.ruta,
+            "motivo": self.motivo,
+            "status": status,
+            "duracion_ms": round(duracion * 1000, 2),
+            "intervalo_ms": PERFIL_INTERVALO_MS,
+            "sql_total_ms": round(sum(s["ms"] for s in self.sql), 3),
+            "sql": self.sql,
+            # formato "collapsed" (flamegraph.pl / speedscope): raíz;...;hoja → muestras
+            "muestras": dict(self.muestras.most_common()),
+        }
+
+
+def _pila(frame) -> Optional[str]:
+    """Stack raíz→hoja como 'archivo:funcion;...', sólo si pasa por código de app/."""
+    partes, de_app = [], False
+    while frame is not None and len(partes) < 80:
+        archivo = frame.f_code.co_filename
+        if archivo.startswith(_APP_DIR) and not archivo.endswith("perfilado.py"):
+            de_app = True
+        partes.append(f"{os.path.basename(archivo)}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    if not de_app:
+        return None
+    return ";".join(reversed(partes))
+
+
+_perfil_actual: ContextVar[Optional[Perfil]] = ContextVar("perfil_actual", default=None)
+
+
+# =========================================================
+# Captura de SQL (todas las engines; no-op sin perfil activo)
+# =========================================================
+def instrumentar_engine(engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        if _perfil_actual.get() is not None:
+            conn.info.setdefault("perfil_inicio", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        perfil = _perfil_actual.get()
+        if perfil is not None and conn.info.get("perfil_inicio"):
+            inicio = conn.info["perfil_inicio"].pop()
+            perfil.registrar_sql(statement, (time.perf_counter() - inicio) * 1000)
+
+
+# =========================================================
+# Ring buffer en disco
+# =========================================================
+def _guardar(datos: Dict) -> None:
+    os.makedirs(PERFIL_DIR, exist_ok=True)
+    with open(os.path.join(PERFIL_DIR, f"{datos['id']}.json"), "w", encoding="utf-8") as f:
+        json.dump(datos, f)
+    archivos = sorted(a for a in os.listdir(PERFIL_DIR) if a.endswith(".json"))
+    for viejo in archivos[:-PERFIL_MAX]:  # los ids empiezan con la fecha: orden = antigüedad
+        try:
+            os.remove(os.path.join(PERFIL_DIR, viejo))
+        except FileNotFoundError:
+            pass
+
+
+def listar() -> List[Dict]:
+    """Resumen de los perfiles guardados, del más nuevo al más viejo."""
+    if not os.path.isdir(PERFIL_DIR):
+        return []
+    resumen = []
+    for nombre in sorted(os.listdir(PERFIL_DIR), reverse=True):
+        if not nombre.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PERFIL_DIR, nombre), encoding="utf-8") as f:
+                d = json.load(f)
+        except (OSError, ValueError):
+            continue  # lo están rotando o quedó a medias
+        resumen.append({
+            k: d.get(k) for k in ("id", "creado", "metodo", "ruta", "motivo", "status", "duracion_ms", "sql_total_ms")
+        } | {"sql_count": len(d.get("sql", []))})
+    return resumen
+
+
+def ruta_perfil(perfil_id: str) -> Optional[str]:
+    if not perfil_id.replace("-", "").isalnum():
+        return None  # nada de "../"
+    ruta = os.path.join(PERFIL_DIR, f"{perfil_id}.json")
+    return ruta if os.path.isfile(ruta) else None
+
+
+# =========================================================
+# Middleware
+# =========================================================
+class PerfiladoMiddleware:
+    """
+    Middleware ASGI puro. `es_admin(authorization)` decide si se acepta
+    X-Profile (se inyecta desde main para no acoplar este módulo a auth).
+    """
+
+    def __init__(self, app, es_admin):
+        self.app = app
+        self.es_admin = es_admin
+
+    def _motivo(self, scope) -> Optional[str]:
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") == b"1":
+            authorization = headers.get(b"authorization", b"").decode("latin-1")
+            if self.es_admin(authorization):
+                return "header"
+        if PERFIL_MUESTREO and random.random() < PERFIL_MUESTREO:
+            return "muestreo"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/admin/profiles"):
+            return await self.app(scope, receive, send)
+        motivo = self._motivo(scope)
+        if motivo is None:
+            return await self.app(scope, receive, send)
+
+        perfil = Perfil(scope["method"], scope["path"], motivo)
+        status = 500
+
+        async def send_con_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", perfil.id.encode())
+                ]
+            await send(message)
+
+        token = _perfil_actual.set(perfil)
+        perfil.iniciar()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_con_id)
+        finally:
+            duracion = time.perf_counter() - inicio
+            _perfil_actual.reset(token)
+            await anyio.to_thread.run_sync(perfil.detener)
+            try:
+                await anyio.to_thread.run_sync(_guardar, perfil.a_dict(status, duracion))
+            except OSError:
+                logger.exception("No se pudo guardar el perfil %s", perfil.id)
@@ -0,0 +1,24 @@
+# app/routers/admin.py
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from app import models, perfilado
+from app.auth import get_admin_user
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+# ===========================
+# Perfiles (X-Profile: 1)
+# ===========================
+@router.get("/profiles")
+def listar_perfiles(admin: models.Usuario = Depends(get_admin_user)):
+    return perfilado.listar()
+
+
+@router.get("/profiles/{perfil_id}")
+def descargar_perfil(perfil_id: str, admin: models.Usuario = Depends(get_admin_user)):
+    ruta = perfilado.ruta_perfil(perfil_id)
+    if not ruta:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return FileResponse(ruta, media_type="application/json", filename=f"{perfil_id}.json")
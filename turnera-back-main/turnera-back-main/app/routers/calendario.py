@@ -0,0 +1,95 @@
+# app/routers/calendario.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+
+from app import models
+from app.auth import get_current_user
+from app.dependencies import get_db, get_read_db
+from app.utils import calendario
+from app.utils.emprendedor import obtener_emprendedor
+
+router = APIRouter(tags=["calendario"])
+
+
+def _url(request: Request, token: str) -> dict:
+    return {"url": str(request.url_for("feed_calendario", token=token))}
+
+
+def _mi_emprendedor_id(db: Session, usuario_id: int) -> int:
+    e = obtener_emprendedor(db, usuario_id)
+    if not e:
+        raise HTTPException(status_code=404, detail="Emprendedor no encontrado")
+    return e.id
+
+
+# ===========================
+# Alta / baja de feeds (protegido)
+# ===========================
+@router.post("/usuarios/me/calendario")
+def crear_feed_usuario(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: models.Usuario = Depends(get_current_user),
+):
+    """URL .ics con mis reservas. Llamarlo de nuevo cambia la URL (la anterior deja de andar)."""
+    return _url(request, calendario.rotar_token(db, "usuario", current_user.id))
+
+
+@router.delete("/usuarios/me/calendario")
+def borrar_feed_usuario(
+    db: Session = Depends(get_db),
+    current_user: models.Usuario = Depends(get_current_user),
+):
+    if not calendario.borrar_feed(db, "usuario", current_user.id):
+        raise HTTPException(status_code=404, detail="Calendario no encontrado")
+    return {"message": "Calendario eliminado"}
+
+
+@router.post("/emprendedores/mi/calendario")
+def crear_feed_emprendedor(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: models.Usuario = Depends(get_current_user),
+):
+    """URL .ics con los turnos de mi emprendimiento (con ocupación y clientes)."""
+    e_id = _mi_emprendedor_id(db, current_user.id)
+    return _url(request, calendario.rotar_token(db, "emprendedor", e_id))
+
+
+@router.delete("/emprendedores/mi/calendario")
+def borrar_feed_emprendedor(
+    db: Session = Depends(get_db),
+    current_user: models.Usuario = Depends(get_current_user),
+):
+    e_id = _mi_emprendedor_id(db, current_user.id)
+    if not calendario.borrar_feed(db, "emprendedor", e_id):
+        raise HTTPException(status_code=404, detail="Calendario no encontrado")
+    return {"message": "Calendario eliminado"}
+
+
+# ===========================
+# Feed público (el token es la credencial)
+# ===========================
+@router.get("/calendario/{token}.ics", name="feed_calendario")
+def feed_calendario(
+    token: str,
+    db: Session = Depends(get_read_db),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+):
+    feed = calendario.feed_por_token(db, token)
+    if not feed:
+        raise HTTPException(status_code=404, detail="Calendario no encontrado")
+
+    headers = {
+        "ETag": calendario.etag(feed),
+        "Last-Modified": calendario.ultima_modificacion(feed),
+        "Cache-Control": "private, no-cache",  # que revaliden siempre: el 304 es barato
+    }
+    if calendario.no_modificado(feed, if_none_match, if_modified_since):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        calendario.contenido(db, feed), media_type="text/calendar; charset=utf-8", headers=headers,
+    )
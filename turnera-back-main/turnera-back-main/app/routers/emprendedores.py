@@ -1,16 +1,28 @@
 # app/routers/emprendimiento.py
-from datetime import datetime
-from typing import List
+from datetime import date, datetime, timedelta
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy import func
+from sqlalchemy import and_, delete, func, or_
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
-from app import models, schemas
-from app.dependencies import get_db
+from app import auditoria, database, escritura, eventos, models, schemas
+from app.dependencies import get_db, get_read_db
 from app.auth import get_current_user
-from app.utils.emprendedor import ensure_emprendedor_for_user, generate_unique_cliente_code
+from app.crud import consultas
+from app.limite_tasa import limitar_codigo, marcar_codigo_invalido
+from app.crud.horarios import regenerar_ventanas
+from app.utils import agenda, busqueda, disponibilidad, espera, geo, ocupacion
+from app.utils.emprendedor import (
+    ensure_emprendedor_for_user, generate_unique_cliente_code, obtener_emprendedor,
+)
+from app.utils.tiempo import ahora_utc, a_utc_naive, validar_zona
+from app.utils.respuesta import lista_json
+from app.utils.version import conflicto, poner_etag, verificar_if_match
 
 router = APIRouter(tags=["emprendimiento"])
 
@@ -28,12 +40,14 @@ def emprendedor_mi(
     db: Session = Depends(get_db),
     current_user: models.Usuario = Depends(get_current_user),
 ):
-    e = ensure_emprendedor_for_user(db, current_user.id)
+    e = obtener_emprendedor(db, current_user.id)  # GET: sin escrituras
+    if not e:
+        raise HTTPException(status_code=404, detail="Emprendedor no encontrado")
     # devolvemos también el código público
     return {
         "id": e.id,
         "usuario_id": e.usuario_id,
-        "codigo_cliente": getattr(e, "codigo_cliente", None),
+        "codigo_cliente": e.codigo_cliente,
     }
 
 @router.get("/usuarios/me/emprendedor")
@@ -41,11 +55,13 @@ def mi_emprendedor(
     db: Session = Depends(get_db),
     current_user: models.Usuario = Depends(get_current_user),
 ):
-    e = ensure_emprendedor_for_user(db, current_user.id)
+    e = obtener_emprendedor(db, current_user.id)  # GET: sin escrituras
+    if not e:
+        raise HTTPException(status_code=404, detail="Emprendedor no encontrado")
     return {
         "id": e.id,
         "usuario_id": e.usuario_id,
-        "codigo_cliente": getattr(e, "codigo_cliente", None),
+        "codigo_cliente": e.codigo_cliente,
     }
 
 # =========================================================
@@ -78,14 +94,14 @@ def generar_codigo_publico(
 # Buscar emprendedor / servicios por CÓDIGO
 # =========================================================
 @router.get("/emprendedores/by-codigo/{codigo}")
-def emprendedor_por_codigo(codigo: str, db: Session = Depends(get_db)):
-    code = (codigo or "").strip().upper()
+def emprendedor_por_codigo(code: str = Depends(limitar_codigo), db: Session = Depends(get_db)):
     e = (
         db.query(models.Emprendedor)
         .filter(func.upper(models.Emprendedor.codigo_cliente) == code)
         .first()
     )
     if not e:
+        marcar_codigo_invalido(code)
         raise HTTPException(status_code=404, detail="Código inválido")
     return {
         "id": e.id,
@@ -93,17 +109,18 @@ def emprendedor_por_codigo(codigo: str, db: Session = Depends(get_db)):
         "negocio": getattr(e, "negocio", None),
         "descripcion": getattr(e, "descripcion", None),
         "codigo_cliente": e.codigo_cliente,
+        "zona_horaria": e.zona_horaria,
     }
 
 @router.get("/servicios_por_codigo/{codigo}", response_model=list[schemas.ServicioResponse])
-def servicios_por_codigo(codigo: str, db: Session = Depends(get_db)):
-    code = (codigo or "").strip().upper()
+def servicios_por_codigo(code: str = Depends(limitar_codigo), db: Session = Depends(get_read_db)):
     emprendedor = (
         db.query(models.Emprendedor)
         .filter(func.upper(models.Emprendedor.codigo_cliente) == code)
         .first()
     )
     if not emprendedor:
+        marcar_codigo_invalido(code)
         raise HTTPException(status_code=404, detail="Código inválido")
     return (
         db.query(models.Servicio)
@@ -114,18 +131,25 @@ def servicios_por_codigo(codigo: str, db: Session = Depends(get_db)):
 # =========================================================
 # SERVICIOS → TURNOS (consultas por servicio)
 # =========================================================
+# columnas de schemas.TurnoResponse, para listar sin cargar objetos ORM
+_COLUMNAS_TURNO = (
+    models.Turno.id, models.Turno.fecha_hora_inicio, models.Turno.capacidad,
+    models.Turno.precio, models.Turno.version,
+)
+
 @router.get("/servicios/{servicio_id}/turnos", response_model=List[schemas.TurnoResponse])
-def turnos_por_servicio(servicio_id: int, db: Session = Depends(get_db)):
-    return (
-        db.query(models.Turno)
+def turnos_por_servicio(servicio_id: int, db: Session = Depends(get_read_db)):
+    filas = (
+        db.query(*_COLUMNAS_TURNO)
         .filter(models.Turno.servicio_id == servicio_id)
         .order_by(models.Turno.fecha_hora_inicio.asc())
         .all()
     )
+    return lista_json(schemas.TurnoResponse, filas)
 
 @router.get("/servicios/{servicio_id}/turnos/disponibles", response_model=List[schemas.TurnoResponse])
-def turnos_disponibles_por_servicio(servicio_id: int, db: Session = Depends(get_db)):
-    ahora = datetime.utcnow()
+def turnos_disponibles_por_servicio(servicio_id: int, db: Session = Depends(get_read_db)):
+    ahora = ahora_utc()
     turnos = (
         db.query(models.Turno)
         .filter(
@@ -137,20 +161,67 @@ def turnos_disponibles_por_servicio(servicio_id: int, db: Session = Depends(get_
     )
     disponibles = []
     for t in turnos:
-        reservas_count = db.query(models.Reserva).filter(models.Reserva.turno_id == t.id).count()
+        reservas_count = consultas.reservas_en_turno(db, t.id)
         if reservas_count < t.capacidad:
             disponibles.append(t)
     return disponibles
 
+SSE_HEARTBEAT = 15  # segundos; mantiene viva la conexión detrás de proxies
+
+def _existe_servicio(servicio_id: int) -> bool:
+    with database.SessionLocal() as db:
+        return db.get(models.Servicio, servicio_id) is not None
+
+
+@router.get("/servicios/{servicio_id}/turnos/stream")
+async def turnos_stream(servicio_id: int, request: Request):
+    """
+    Server-Sent Events con los cambios de disponibilidad del servicio
+    (slot-taken / slot-freed). Reemplaza el polling de /turnos/disponibles:
+    el cliente carga la lista una vez y aplica los eventos. Si recibe
+    `resync` (se atrasó), vuelve a pedir la lista.
+    Sin Depends(get_db): la sesión viviría lo que dure el stream y cada
+    dashboard abierto retendría una conexión del pool.
+    """
+    if not await run_in_threadpool(_existe_servicio, servicio_id):
+        raise HTTPException(status_code=404, detail="Servicio no encontrado")
+
+    broker = eventos.get_broker()
+    try:
+        sub = broker.suscribir(eventos.canal_servicio(servicio_id))
+    except eventos.LimiteConexiones:
+        raise HTTPException(
+            status_code=503,
+            detail="Demasiadas conexiones, reintentá más tarde",
+            headers={"Retry-After": "30"},
+        )
+
+    async def generar():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                evento = await sub.siguiente(timeout=SSE_HEARTBEAT)
+                yield eventos.formato_sse(evento) if evento else ": ping\n\n"
+        finally:
+            broker.desuscribir(sub)
+
+    return StreamingResponse(
+        generar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # =========================================================
 # MIS servicios / MIS turnos (protegidos)
 # =========================================================
 @router.get("/servicios/mis-servicios", response_model=List[schemas.ServicioResponse])
 def mis_servicios(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.Usuario = Depends(get_current_user),
 ):
-    emprendedor = ensure_emprendedor_for_user(db, current_user.id)
+    emprendedor = obtener_emprendedor(db, current_user.id)
+    if not emprendedor:
+        return []
     return (
         db.query(models.Servicio)
         .filter(models.Servicio.emprendedor_id == emprendedor.id)
@@ -159,33 +230,61 @@ def mis_servicios(
 
 @router.get("/turnos/mis-turnos", response_model=List[schemas.TurnoResponse])
 def mis_turnos(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.Usuario = Depends(get_current_user),
 ):
-    emprendedor = ensure_emprendedor_for_user(db, current_user.id)
-    return (
-        db.query(models.Turno)
+    emprendedor = obtener_emprendedor(db, current_user.id)
+    if not emprendedor:
+        return []
+    filas = (
+        db.query(*_COLUMNAS_TURNO)
         .join(models.Servicio, models.Turno.servicio_id == models.Servicio.id)
         .filter(models.Servicio.emprendedor_id == emprendedor.id)
         .all()
     )
+    return lista_json(schemas.TurnoResponse, filas)
 
 # =========================================================
 # EMPRENDEDORES (CRUD)
 # =========================================================
+def _ubicar(emprendedor: models.Emprendedor, cambios: dict):
+    """
+    lat/lon explícitos mandan; si sólo cambió la dirección se geocodifica con
+    el archivo local (o se limpian las coordenadas viejas). Recalcula geohash.
+    """
+    if "lat" in cambios or "lon" in cambios:
+        lat, lon = cambios.get("lat", emprendedor.lat), cambios.get("lon", emprendedor.lon)
+        if (lat is not None or lon is not None) and not geo.coordenadas_validas(lat, lon):
+            raise HTTPException(status_code=400, detail="Coordenadas inválidas")
+    elif "direccion" in cambios:
+        lat, lon = geo.geocodificar(cambios["direccion"]) or (None, None)
+    else:
+        return
+    emprendedor.lat, emprendedor.lon = lat, lon
+    emprendedor.geohash = geo.geohash(lat, lon) if lat is not None else None
+
 @router.post("/emprendedores/", response_model=schemas.EmprendedorResponse)
 def crear_emprendedor(empr: schemas.EmprendedorCreate, db: Session = Depends(get_db)):
+    if empr.zona_horaria:
+        validar_zona(empr.zona_horaria)
+    if not db.get(models.Usuario, empr.usuario_id):
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
     existente = (
         db.query(models.Emprendedor)
         .filter(models.Emprendedor.usuario_id == empr.usuario_id)
         .first()
     )
     if existente:
-        for campo, valor in empr.dict(exclude={"usuario_id", "codigo_cliente"}).items():
+        cambios = empr.dict(exclude={"usuario_id", "codigo_cliente"})
+        if cambios["lat"] is None and cambios["lon"] is None:
+            del cambios["lat"], cambios["lon"]  # sin coordenadas: geocodificar la dirección
+        for campo, valor in cambios.items():
             setattr(existente, campo, valor)
+        _ubicar(existente, cambios)
         # si no tiene código, asignamos uno
         if not getattr(existente, "codigo_cliente", None):
             existente.codigo_cliente = generate_unique_cliente_code(db)
+        regenerar_ventanas(db, existente)
         db.commit()
         db.refresh(existente)
         return existente
@@ -196,17 +295,55 @@ def crear_emprendedor(empr: schemas.EmprendedorCreate, db: Session = Depends(get
     data["codigo_cliente"] = generate_unique_cliente_code(db)
 
     nuevo = models.Emprendedor(**data)
+    if data["lat"] is None and data["lon"] is None:
+        del data["lat"], data["lon"]
+    _ubicar(nuevo, data)
     db.add(nuevo)
     db.commit()
     db.refresh(nuevo)
     return nuevo
 
 @router.get("/emprendedores/", response_model=List[schemas.EmprendedorResponse])
-def listar_emprendedores(db: Session = Depends(get_db)):
+def listar_emprendedores(db: Session = Depends(get_read_db)):
     return db.query(models.Emprendedor).all()
 
+# Antes de /emprendedores/{emprendedor_id} para que "cerca" no se tome como id
+@router.get("/emprendedores/cerca", response_model=List[schemas.EmprendedorCercaOut])
+def emprendedores_cerca(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radio_km: float = Query(5, gt=0, le=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
+):
+    # 1) poda por celdas geohash (rangos sobre el índice de la columna)
+    celdas = geo.celdas_para_radio(lat, lon, radio_km)
+    candidatos = (
+        db.query(models.Emprendedor)
+        .filter(or_(*[
+            and_(models.Emprendedor.geohash >= c, models.Emprendedor.geohash < c + "~")
+            for c in celdas
+        ]))
+        .all()
+    )
+    # 2) distancia exacta (haversine), orden y paginado
+    cerca = []
+    for e in candidatos:
+        d = geo.haversine_km(lat, lon, e.lat, e.lon)
+        if d <= radio_km:
+            cerca.append((d, e))
+    cerca.sort(key=lambda x: (x[0], x[1].id))
+    return [
+        schemas.EmprendedorCercaOut(
+            id=e.id, negocio=e.negocio, rubro=e.rubro, direccion=e.direccion,
+            lat=e.lat, lon=e.lon, distancia_km=round(d, 3),
+        )
+        for d, e in cerca[offset:offset + limit]
+    ]
+
 @router.get("/emprendedores/{emprendedor_id}", response_model=schemas.EmprendedorResponse)
-def detalle_emprendedor(emprendedor_id: int, db: Session = Depends(get_db)):
+def detalle_emprendedor(emprendedor_id: int, response: Response, db: Session = Depends(get_db)):
     emprendedor = (
         db.query(models.Emprendedor)
         .filter(models.Emprendedor.id == emprendedor_id)
@@ -214,11 +351,16 @@ def detalle_emprendedor(emprendedor_id: int, db: Session = Depends(get_db)):
     )
     if not emprendedor:
         raise HTTPException(status_code=404, detail="Emprendedor no encontrado")
+    poner_etag(response, emprendedor)
     return emprendedor
 
 @router.put("/emprendedores/{emprendedor_id}", response_model=schemas.EmprendedorResponse)
 def actualizar_emprendedor(
-    emprendedor_id: int, datos: schemas.EmprendedorUpdate, db: Session = Depends(get_db)
+    emprendedor_id: int,
+    datos: schemas.EmprendedorUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
 ):
     emprendedor = (
         db.query(models.Emprendedor)
@@ -227,32 +369,180 @@ def actualizar_emprendedor(
     )
     if not emprendedor:
         raise HTTPException(status_code=404, detail="Emprendedor no encontrado")
+    verificar_if_match(if_match, emprendedor)
 
-    for campo, valor in datos.dict(exclude_unset=True).items():
+    cambios = datos.dict(exclude_unset=True)
+    if cambios.get("zona_horaria"):
+        validar_zona(cambios["zona_horaria"])
+    for campo, valor in cambios.items():
         setattr(emprendedor, campo, valor)
+    _ubicar(emprendedor, cambios)
+    if "zona_horaria" in cambios:
+        regenerar_ventanas(db, emprendedor)
+        db.flush()
+        ocupacion.recalcular(db, emprendedor.id)  # los días locales cambian
 
-    db.commit()
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise conflicto()
+    if "zona_horaria" in cambios:
+        agenda.invalidar(emprendedor.id)
     db.refresh(emprendedor)
+    poner_etag(response, emprendedor)
     return emprendedor
 
 @router.delete("/emprendedores/{emprendedor_id}")
 def eliminar_emprendedor(emprendedor_id: int, db: Session = Depends(get_db)):
-    emprendedor = (
-        db.query(models.Emprendedor)
-        .filter(models.Emprendedor.id == emprendedor_id)
-        .first()
-    )
-    if not emprendedor:
+    # Un solo DELETE: servicios, turnos, reservas, horarios, ventanas, ocupación,
+    # lista de espera e historial se borran por ON DELETE CASCADE en la DB,
+    # sin cargar los hijos en memoria.
+    borrados = db.execute(
+        delete(models.Emprendedor).where(models.Emprendedor.id == emprendedor_id)
+    ).rowcount
+    if not borrados:
         raise HTTPException(status_code=404, detail="Emprendedor no encontrado")
-    db.delete(emprendedor)
     db.commit()
+    agenda.invalidar(emprendedor_id)
     return {"ok": True, "mensaje": "Emprendedor eliminado"}
 
+# =========================================================
+# OCUPACIÓN (lee sólo el resumen ocupacion_diaria)
+# =========================================================
+@router.get(
+    "/emprendedores/{emprendedor_id}/ocupacion",
+    response_model=List[schemas.OcupacionDiariaOut],
+)
+def ocupacion_emprendedor(
+    emprendedor_id: int,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    db: Session = Depends(get_read_db),
+    current_user: models.Usuario = Depends(get_current_user),
+):
+    e = db.get(models.Emprendedor, emprendedor_id)
+    if not e:
+        raise HTTPException(status_code=404, detail="Emprendedor no encontrado")
+    if e.usuario_id != current_user.id:
+        raise HTTPException(status_code=403, detail="No autorizado")
+
+    q = db.query(models.OcupacionDiaria).filter(
+        models.OcupacionDiaria.emprendedor_id == emprendedor_id,
+        models.OcupacionDiaria.turnos > 0,
+    )
+    if desde is not None:
+        q = q.filter(models.OcupacionDiaria.fecha >= desde)
+    if hasta is not None:
+        q = q.filter(models.OcupacionDiaria.fecha <= hasta)
+
+    return [
+        schemas.OcupacionDiariaOut(
+            servicio_id=o.servicio_id,
+            fecha=o.fecha,
+            turnos=o.turnos,
+            capacidad=o.capacidad,
+            reservados=o.reservados,
+            porcentaje=round(o.reservados * 100 / o.capacidad, 2) if o.capacidad else 0.0,
+        )
+        for o in q.order_by(models.OcupacionDiaria.fecha, models.OcupacionDiaria.servicio_id)
+    ]
+
+# =========================================================
+# DISPONIBILIDAD (próximo disponible / batch)
+# =========================================================
+@router.get(
+    "/emprendedores/{emprendedor_id}/proximo-disponible",
+    response_model=List[schemas.ProximoDisponibleOut],
+)
+def proximo_disponible(
+    emprendedor_id: int,
+    servicio_id: Optional[int] = None,
+    desde: Optional[datetime] = None,  # sin offset = hora local del emprendedor
+    n: int = Query(5, ge=1, le=50),
+    db: Session = Depends(get_read_db),  # sólo lee: las ventanas que falten se calculan en memoria
+):
+    e = db.get(models.Emprendedor, emprendedor_id)
+    if not e:
+        raise HTTPException(status_code=404, detail="Emprendedor no encontrado")
+
+    q = db.query(models.Servicio).filter(models.Servicio.emprendedor_id == emprendedor_id)
+    if servicio_id is not None:
+        q = q.filter(models.Servicio.id == servicio_id)
+    servicios = q.order_by(models.Servicio.id).all()
+    if servicio_id is not None and not servicios:
+        raise HTTPException(status_code=404, detail="Servicio no encontrado")
+
+    ahora = ahora_utc()
+    inicio = max(a_utc_naive(desde, e.zona_horaria), ahora) if desde else ahora
+    return [
+        schemas.ProximoDisponibleOut(
+            servicio_id=h.servicio_id,
+            turno_id=h.turno_id,
+            fecha_hora_inicio=h.inicio,
+            fecha_hora_fin=h.inicio + timedelta(minutes=h.duracion),
+            libres=h.libres,
+        )
+        for h in disponibilidad.proximos(db, e, servicios, inicio, n)
+    ]
+
+@router.post("/disponibilidad:batch", response_model=schemas.DisponibilidadBatchOut)
+def disponibilidad_batch(data: schemas.DisponibilidadBatchIn, db: Session = Depends(get_db)):
+    if not data.servicio_ids:
+        raise HTTPException(status_code=400, detail="Indicá al menos un servicio")
+    if len(set(data.servicio_ids)) > disponibilidad.BATCH_MAX_SERVICIOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {disponibilidad.BATCH_MAX_SERVICIOS} servicios por consulta",
+        )
+    if data.hasta < data.desde:
+        raise HTTPException(status_code=400, detail="'hasta' debe ser posterior a 'desde'")
+    if (data.hasta - data.desde).days + 1 > disponibilidad.BATCH_MAX_DIAS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {disponibilidad.BATCH_MAX_DIAS} días por consulta",
+        )
+
+    por_servicio, no_encontrados = disponibilidad.por_dia(db, data.servicio_ids, data.desde, data.hasta)
+    return schemas.DisponibilidadBatchOut(
+        servicios=[
+            schemas.DisponibilidadServicioOut(
+                servicio_id=s_id,
+                dias=[
+                    schemas.DisponibilidadDiaOut(
+                        fecha=fecha,
+                        libres=sum(libres for _, _, libres in slots),
+                        slots=[
+                            schemas.SlotLibreOut(turno_id=t_id, fecha_hora_inicio=inicio, libres=libres)
+                            for t_id, inicio, libres in slots
+                        ],
+                    )
+                    for fecha, slots in dias.items()
+                ],
+            )
+            for s_id, dias in por_servicio.items()
+        ],
+        no_encontrados=no_encontrados,
+    )
+
+# =========================================================
+# BÚSQUEDA
+# =========================================================
+@router.get("/buscar", response_model=List[schemas.BusquedaResultado])
+def buscar(
+    q: str = Query(..., min_length=1, max_length=200),
+    rubro: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
+):
+    return busqueda.buscar(db, q, rubro, limit, offset)
+
 # =========================================================
 # SERVICIOS
 # =========================================================
 @router.get("/servicios/", response_model=List[schemas.ServicioResponse])
-def list_servicios(db: Session = Depends(get_db)):
+def list_servicios(db: Session = Depends(get_read_db)):
     return db.query(models.Servicio).all()
 
 @router.get(
@@ -260,7 +550,7 @@ def list_servicios(db: Session = Depends(get_db)):
     response_model=List[schemas.ServicioResponse],
 )
 def listar_servicios_por_emprendedor(
-    emprendedor_id: int, db: Session = Depends(get_db)
+    emprendedor_id: int, db: Session = Depends(get_read_db)
 ):
     emprendedor = (
         db.query(models.Emprendedor)
@@ -330,55 +620,102 @@ def crear_turno(
 ):
     if current_user.rol != "emprendedor":
         raise HTTPException(status_code=403, detail="Solo emprendedores")
-
-    servicio = db.query(models.Servicio).filter(models.Servicio.id == turno.servicio_id).first()
-    if not servicio:
-        raise HTTPException(status_code=404, detail="Servicio no encontrado")
-
-    e = ensure_emprendedor_for_user(db, current_user.id)
-    if servicio.emprendedor_id != e.id:
-        raise HTTPException(status_code=403, detail="No autorizado")
-
-    nuevo = models.Turno(**turno.dict())
-    db.add(nuevo)
-    db.commit()
-    db.refresh(nuevo)
+    e_id = ensure_emprendedor_for_user(db, current_user.id).id
+
+    def escribir(db: Session):
+        servicio = db.query(models.Servicio).filter(models.Servicio.id == turno.servicio_id).first()
+        if not servicio:
+            raise HTTPException(status_code=404, detail="Servicio no encontrado")
+        if servicio.emprendedor_id != e_id:
+            raise HTTPException(status_code=403, detail="No autorizado")
+
+        e = servicio.emprendedor
+        nuevo = models.Turno(**turno.dict())
+        nuevo.fecha_hora_inicio = a_utc_naive(turno.fecha_hora_inicio, e.zona_horaria)
+        db.add(nuevo)
+        ocupacion.turno_creado(db, nuevo, e)
+        db.flush()
+        return nuevo
+
+    nuevo = escritura.ejecutar(db, escribir)
+    eventos.publicar_disponibilidad(
+        nuevo.servicio_id, "slot-freed", nuevo.id, nuevo.fecha_hora_inicio,
+        libres=nuevo.capacidad, motivo="turno-creado",
+    )
     return nuevo
 
 @router.get("/turnos/", response_model=List[schemas.TurnoResponse])
-def listar_turnos(db: Session = Depends(get_db)):
-    return db.query(models.Turno).all()
+def listar_turnos(db: Session = Depends(get_read_db)):
+    return lista_json(schemas.TurnoResponse, db.query(*_COLUMNAS_TURNO).all())
 
 @router.get("/turnos/{turno_id}", response_model=schemas.TurnoResponse)
-def detalle_turno(turno_id: int, db: Session = Depends(get_db)):
-    turno = db.query(models.Turno).filter(models.Turno.id == turno_id).first()
+def detalle_turno(turno_id: int, response: Response, db: Session = Depends(get_db)):
+    turno = consultas.turno_por_id(db, turno_id)
     if not turno:
         raise HTTPException(status_code=404, detail="Turno no encontrado")
+    poner_etag(response, turno)
+    return turno
+
+def _fin(turno: models.Turno) -> datetime:
+    return turno.fecha_hora_inicio + timedelta(minutes=turno.duracion_minutos or 30)
+
+def _turno_propio(db: Session, turno_id: int, e_id: int) -> models.Turno:
+    turno = consultas.turno_por_id(db, turno_id)
+    if not turno:
+        raise HTTPException(status_code=404, detail="Turno no encontrado")
+    if turno.servicio.emprendedor_id != e_id:
+        raise HTTPException(status_code=403, detail="No autorizado")
     return turno
 
 @router.put("/turnos/{turno_id}", response_model=schemas.TurnoResponse)
 def actualizar_turno(
     turno_id: int,
     datos: schemas.TurnoBase,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: models.Usuario = Depends(get_current_user),
 ):
     if current_user.rol != "emprendedor":
         raise HTTPException(status_code=403, detail="Solo emprendedores")
-
-    turno = db.query(models.Turno).filter(models.Turno.id == turno_id).first()
-    if not turno:
-        raise HTTPException(status_code=404, detail="Turno no encontrado")
-
-    servicio = db.query(models.Servicio).filter(models.Servicio.id == turno.servicio_id).first()
-    e = ensure_emprendedor_for_user(db, current_user.id)
-    if servicio.emprendedor_id != e.id:
-        raise HTTPException(status_code=403, detail="No autorizado")
-
-    for campo, valor in datos.dict().items():
-        setattr(turno, campo, valor)
-    db.commit()
-    db.refresh(turno)
+    e_id = ensure_emprendedor_for_user(db, current_user.id).id
+
+    def escribir(db: Session):
+        turno = _turno_propio(db, turno_id, e_id)
+        verificar_if_match(if_match, turno)
+        e = turno.servicio.emprendedor
+
+        fecha_anterior = ocupacion.fecha_local(turno, e)
+        capacidad_anterior = turno.capacidad
+        rango_anterior = (turno.fecha_hora_inicio, _fin(turno))
+        for campo, valor in datos.dict().items():
+            setattr(turno, campo, valor)
+        turno.fecha_hora_inicio = a_utc_naive(datos.fecha_hora_inicio, e.zona_horaria)
+        reservas = consultas.reservas_en_turno(db, turno.id)
+        ocupacion.turno_modificado(db, turno, e, fecha_anterior, capacidad_anterior, reservas)
+        db.flush()
+        # más capacidad en un turno futuro: los lugares nuevos son de la lista de espera
+        promovidos = []
+        if turno.capacidad > capacidad_anterior and turno.fecha_hora_inicio >= ahora_utc():
+            promovidos = espera.promover(db, turno)
+            reservas += len(promovidos)
+        return turno, rango_anterior, reservas, promovidos
+
+    try:
+        turno, rango_anterior, reservas, promovidos = escritura.ejecutar(db, escribir)
+    except StaleDataError:  # otro UPDATE ganó entre la lectura y la escritura
+        raise conflicto()
+    for usuario_id, promovida_id in promovidos:
+        auditoria.evento("espera_promovida", reserva_id=promovida_id, turno_id=turno.id, usuario_id=usuario_id)
+    espera.notificar_promociones(turno, promovidos)
+    agenda.invalidar(e_id, *rango_anterior)
+    agenda.invalidar(e_id, turno.fecha_hora_inicio, _fin(turno))
+    libres = turno.capacidad - reservas
+    eventos.publicar_disponibilidad(
+        turno.servicio_id, "slot-freed" if libres > 0 else "slot-taken", turno.id,
+        turno.fecha_hora_inicio, libres=libres, motivo="turno-modificado",
+    )
+    poner_etag(response, turno)
     return turno
 
 @router.delete("/turnos/{turno_id}")
@@ -389,16 +726,19 @@ def eliminar_turno(
 ):
     if current_user.rol != "emprendedor":
         raise HTTPException(status_code=403, detail="Solo emprendedores")
-
-    turno = db.query(models.Turno).filter(models.Turno.id == turno_id).first()
-    if not turno:
-        raise HTTPException(status_code=404, detail="Turno no encontrado")
-
-    servicio = db.query(models.Servicio).filter(models.Servicio.id == turno.servicio_id).first()
-    e = ensure_emprendedor_for_user(db, current_user.id)
-    if servicio.emprendedor_id != e.id:
-        raise HTTPException(status_code=403, detail="No autorizado")
-
-    db.delete(turno)
-    db.commit()
+    e_id = ensure_emprendedor_for_user(db, current_user.id).id
+
+    def escribir(db: Session):
+        turno = _turno_propio(db, turno_id, e_id)
+        reservas = consultas.reservas_en_turno(db, turno.id)
+        ocupacion.turno_eliminado(db, turno, turno.servicio.emprendedor, reservas)
+        servicio_id, fecha, fin = turno.servicio_id, turno.fecha_hora_inicio, _fin(turno)
+        db.delete(turno)
+        return servicio_id, fecha, fin
+
+    servicio_id, fecha, fin = escritura.ejecutar(db, escribir)
+    agenda.invalidar(e_id, fecha, fin)
+    eventos.publicar_disponibilidad(
+        servicio_id, "slot-taken", turno_id, fecha, libres=0, motivo="turno-eliminado",
+    )
     return {"ok": True, "mensaje": "Turno eliminado"}
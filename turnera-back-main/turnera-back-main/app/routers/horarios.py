@@ -1,10 +1,14 @@
 # app/routers/horarios.py
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List, Union
+from sqlalchemy.orm.exc import StaleDataError
+from typing import List, Optional, Union
 from datetime import datetime, time as dtime
 
-from app.dependencies import get_db
+from app.crud.horarios import regenerar_ventanas
+from app.dependencies import get_db, get_read_db
+from app.utils import agenda
+from app.utils.version import conflicto, poner_etag, verificar_if_match
 from app.models import Horario as HorarioModel, Emprendedor
 # Usa tus schemas existentes; si los tuyos difieren, ajusta los nombres:
 from app.schemas import Horario as HorarioOut, HorarioCreate, HorarioUpdate
@@ -50,7 +54,7 @@ def replace_horarios(
     horarios: List[HorarioUpdate],  # espera items con dia_semana, hora_inicio, hora_fin
     db: Session = Depends(get_db),
 ):
-    ensure_emprendedor(db, emprendedor_id)
+    emp = ensure_emprendedor(db, emprendedor_id)
 
     # borrar todos los anteriores de ese emprendedor
     db.query(HorarioModel).filter(
@@ -66,11 +70,13 @@ def replace_horarios(
             hora_fin       = to_sql_time(h.hora_fin),
         ))
 
+    regenerar_ventanas(db, emp)
     db.commit()
+    agenda.invalidar(emprendedor_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 @router.get("/{emprendedor_id}/horarios", response_model=List[HorarioOut])
-def listar_horarios(emprendedor_id: int, db: Session = Depends(get_db)):
+def listar_horarios(emprendedor_id: int, db: Session = Depends(get_read_db)):
     ensure_emprendedor(db, emprendedor_id)
     return db.query(HorarioModel).filter(
         HorarioModel.emprendedor_id == emprendedor_id
@@ -78,25 +84,43 @@ def listar_horarios(emprendedor_id: int, db: Session = Depends(get_db)):
 
 @router.post("/{emprendedor_id}/horarios", response_model=HorarioOut, status_code=201)
 def crear_horario(emprendedor_id: int, horario: HorarioCreate, db: Session = Depends(get_db)):
-    ensure_emprendedor(db, emprendedor_id)
+    emp = ensure_emprendedor(db, emprendedor_id)
     obj = HorarioModel(
         emprendedor_id = emprendedor_id,
         dia_semana     = norm_day(horario.dia_semana),
         hora_inicio    = to_sql_time(horario.hora_inicio),
         hora_fin       = to_sql_time(horario.hora_fin),
     )
-    db.add(obj); db.commit(); db.refresh(obj)
+    db.add(obj)
+    regenerar_ventanas(db, emp)
+    db.commit(); db.refresh(obj)
+    agenda.invalidar(emprendedor_id)
     return obj
 
 @router.put("/horarios/{horario_id}", response_model=HorarioOut)
-def actualizar_horario(horario_id: int, horario: HorarioCreate, db: Session = Depends(get_db)):
+def actualizar_horario(
+    horario_id: int,
+    horario: HorarioCreate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
     obj = db.get(HorarioModel, horario_id)
     if not obj:
         raise HTTPException(status_code=404, detail="Horario no encontrado")
+    verificar_if_match(if_match, obj)
     obj.dia_semana  = norm_day(horario.dia_semana)
     obj.hora_inicio = to_sql_time(horario.hora_inicio)
     obj.hora_fin    = to_sql_time(horario.hora_fin)
-    db.commit(); db.refresh(obj)
+    try:
+        regenerar_ventanas(db, obj.emprendedor)  # hace flush: el UPDATE versionado corre acá
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise conflicto()
+    db.refresh(obj)
+    agenda.invalidar(obj.emprendedor_id)
+    poner_etag(response, obj)
     return obj
 
 @router.delete("/horarios/{horario_id}", status_code=204)
@@ -104,5 +128,9 @@ def borrar_horario(horario_id: int, db: Session = Depends(get_db)):
     obj = db.get(HorarioModel, horario_id)
     if not obj:
         raise HTTPException(status_code=404, detail="Horario no encontrado")
-    db.delete(obj); db.commit()
+    emp = obj.emprendedor
+    db.delete(obj)
+    regenerar_ventanas(db, emp)
+    db.commit()
+    agenda.invalidar(emp.id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,12 +1,21 @@
 # app/routers/usuarios.py
 import bcrypt
 from fastapi import APIRouter, Depends, HTTPException, Request, status, UploadFile, File
+from sqlalchemy import delete
 from sqlalchemy.orm import Session
 import os, uuid
-from app import models, schemas
-from app.dependencies import get_db
+from datetime import timedelta
+from typing import Optional
+from app import eventos, models, schemas
+from app.crud import consultas
+from app.dependencies import get_db, get_read_db
 from app.auth import get_current_user, create_access_token  # ⬅️ IMPORTANTE
+from app.auth import (
+    crear_refresh_token, revocar_refresh_token, revocar_refresh_tokens_de_usuario, rotar_refresh_token,
+)
+from app.utils import agenda, espera, ocupacion
 from app.utils.emprendedor import ensure_emprendedor_for_user
+from app.utils.tiempo import ahora_utc
 from app.auth import create_access_token, get_current_user
 from sqlalchemy.exc import IntegrityError
 import bcrypt
@@ -79,6 +88,10 @@ def sign_up(request_data: schemas.RegisterSchema, db: Session = Depends(get_db))
     db.commit()
     db.refresh(nuevo_usuario)
 
+    # Los GET (/emprendedores/mi, etc.) ya no lo crean al vuelo: queda creado acá
+    if nuevo_usuario.rol == "emprendedor":
+        ensure_emprendedor_for_user(db, nuevo_usuario.id)
+
     schema = schemas.UsuarioResponse.model_validate(nuevo_usuario)
     return {"message": schema}
 
@@ -120,9 +133,25 @@ def login(request_data: schemas.LoginSchema, db: Session = Depends(get_db)):
         "username": user.username,
         "rol": user.rol,
     })
+    refresh_token = crear_refresh_token(db, user.id)
+    db.commit()
 
-    # El front espera user_schema y token
-    return {"user_schema": schema, "token": token}
+    # El front espera user_schema y token; con refresh_token renueva sin volver a loguear
+    return {"user_schema": schema, "token": token, "refresh_token": refresh_token}
+
+
+# ===========================
+# Refresh (rota el refresh token)
+# ===========================
+@router.post("/token/refresh")
+def refresh_token(data: schemas.RefreshTokenIn, db: Session = Depends(get_db)):
+    usuario, nuevo_refresh = rotar_refresh_token(db, data.refresh_token)
+    token = create_access_token({
+        "sub": usuario.id,
+        "username": usuario.username,
+        "rol": usuario.rol,
+    })
+    return {"token": token, "refresh_token": nuevo_refresh}
 
 # ===========================
 # Perfil (protegido)
@@ -155,7 +184,7 @@ def activar_emprendedor(
     if current_user.id != usuario_id:
         raise HTTPException(status_code=403, detail="No autorizado")
 
-    usuario = db.query(models.Usuario).filter(models.Usuario.id == usuario_id).first()
+    usuario = consultas.usuario_por_id(db, usuario_id)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
@@ -185,17 +214,21 @@ def activar_emprendedor(
     }
 
 # ===========================
-# Logout (dummy)
+# Logout
 # ===========================
 @router.post("/logout")
-def logout(request: Request):
+def logout(data: Optional[schemas.RefreshTokenIn] = None, db: Session = Depends(get_db)):
+    # El access token vence solo (es corto); lo que se revoca es el refresh token
+    if data is not None:
+        revocar_refresh_token(db, data.refresh_token)
+        db.commit()
     return {"message": "Logged out"}
 
 # ===========================
 # CRUD Usuarios (opcional)
 # ===========================
 @router.get("/", response_model=list[schemas.UsuarioResponse])
-def listar_usuarios(db: Session = Depends(get_db)):
+def listar_usuarios(db: Session = Depends(get_read_db)):
     return db.query(models.Usuario).all()
 
 @router.put("/{usuario_id}", response_model=schemas.UsuarioResponse)
@@ -208,7 +241,7 @@ def actualizar_usuario(
     if current_user.id != usuario_id:
         raise HTTPException(status_code=403, detail="No autorizado")
 
-    usuario = db.query(models.Usuario).filter(models.Usuario.id == usuario_id).first()
+    usuario = consultas.usuario_por_id(db, usuario_id)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
@@ -233,6 +266,8 @@ def actualizar_usuario(
         if not ok:
             raise HTTPException(status_code=400, detail="Contraseña actual incorrecta")
         usuario.password = bcrypt.hashpw(datos.new_password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        # un refresh token robado no debe sobrevivir al cambio de contraseña (mismo commit)
+        revocar_refresh_tokens_de_usuario(db, usuario.id)
 
     try:
         db.commit()
@@ -253,9 +288,39 @@ def actualizar_usuario(
 
 @router.delete("/{usuario_id}")
 def eliminar_usuario(usuario_id: int, db: Session = Depends(get_db)):
-    usuario = db.query(models.Usuario).filter(models.Usuario.id == usuario_id).first()
-    if not usuario:
+    existe = db.query(models.Usuario.id).filter(models.Usuario.id == usuario_id).first()
+    if not existe:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    db.delete(usuario)
+    propio = db.query(models.Emprendedor.id).filter(models.Emprendedor.usuario_id == usuario_id).scalar()
+
+    # Sus reservas en turnos de otros emprendimientos liberan lugar: se descuentan
+    # del resumen de ocupación y, si el turno es futuro, pasa el primero en espera.
+    # Lo propio (emprendimiento, servicios, turnos...) se lo lleva el ON DELETE CASCADE.
+    turnos = [
+        t for t in
+        db.query(models.Turno)
+        .join(models.Reserva, models.Reserva.turno_id == models.Turno.id)
+        .filter(models.Reserva.usuario_id == usuario_id)
+        if t.servicio.emprendedor_id != propio
+    ]
+    for t in turnos:
+        ocupacion.reserva_eliminada(db, t, t.servicio.emprendedor)
+
+    db.execute(delete(models.Usuario).where(models.Usuario.id == usuario_id))
+    ahora = ahora_utc()
+    promociones = [(t, espera.promover(db, t)) for t in turnos if t.fecha_hora_inicio >= ahora]
     db.commit()
+
+    if propio is not None:
+        agenda.invalidar(propio)
+    for t, promovidos in promociones:
+        espera.notificar_promociones(t, promovidos)
+        ocupadas = consultas.reservas_en_turno(db, t.id)
+        if ocupadas < t.capacidad:
+            fin = t.fecha_hora_inicio + timedelta(minutes=t.duracion_minutos or 30)
+            agenda.invalidar(t.servicio.emprendedor_id, t.fecha_hora_inicio, fin)
+            eventos.publicar_disponibilidad(
+                t.servicio_id, "slot-freed", t.id, t.fecha_hora_inicio,
+                libres=t.capacidad - ocupadas, motivo="cancelacion",
+            )
     return {"ok": True, "mensaje": "Usuario eliminado"}
@@ -1,8 +1,18 @@
 # app/schemas.py
-from datetime import datetime, time
-from typing import Optional, List
+from datetime import date, datetime, time, timezone
+from typing import Annotated, Optional, List
 
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, PlainSerializer
+
+# La DB guarda UTC naive; hacia afuera siempre devolvemos el offset explícito
+# para que el front no lo interprete como hora local.
+FechaUTC = Annotated[
+    datetime,
+    PlainSerializer(
+        lambda dt: (dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt).isoformat(),
+        return_type=str,
+    ),
+]
 
 # =========================
 # Horarios
@@ -24,6 +34,7 @@ class HorarioCreate(HorarioBase):
 class Horario(HorarioBase):
     id: int
     emprendedor_id: int
+    version: Optional[int] = None  # mandar como If-Match al actualizar
     model_config = ConfigDict(from_attributes=True)
 
 # =========================
@@ -39,6 +50,9 @@ class LoginSchema(BaseModel):
     username: str
     password: str
 
+class RefreshTokenIn(BaseModel):
+    refresh_token: str
+
 # =========================
 # Usuario
 # =========================
@@ -78,6 +92,9 @@ class EmprendedorBase(BaseModel):
     email_contacto: Optional[str] = None
     cuit: Optional[str] = None
     foto_url: Optional[str] = None
+    zona_horaria: Optional[str] = None  # IANA, ej. "America/Argentina/Buenos_Aires"
+    lat: Optional[float] = None
+    lon: Optional[float] = None
 
 class EmprendedorCreate(EmprendedorBase):
     usuario_id: int
@@ -95,21 +112,35 @@ class EmprendedorUpdate(BaseModel):
     email_contacto: Optional[str] = None
     cuit: Optional[str] = None
     foto_url: Optional[str] = None
+    zona_horaria: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
 
 class EmprendedorResponse(EmprendedorBase):
     id: int
     usuario_id: int
     codigo_cliente: Optional[str] = None  # expuesto para frontend público
+    version: Optional[int] = None  # mandar como If-Match al actualizar
     model_config = ConfigDict(from_attributes=True)
 
+class EmprendedorCercaOut(BaseModel):
+    id: int
+    negocio: Optional[str] = None
+    rubro: Optional[str] = None
+    direccion: Optional[str] = None
+    lat: float
+    lon: float
+    distancia_km: float
+
 # =========================
 # Turno (para anidar en servicios)
 # =========================
 class TurnoResponse(BaseModel):
     id: int
-    fecha_hora_inicio: datetime
+    fecha_hora_inicio: FechaUTC
     capacidad: int
     precio: Optional[float] = None
+    version: Optional[int] = None  # mandar como If-Match al actualizar
     model_config = ConfigDict(from_attributes=True)
 
 # =========================
@@ -151,6 +182,7 @@ class TurnoCreate(TurnoBase):
 
 class TurnoResponseCreate(TurnoBase):
     id: int
+    fecha_hora_inicio: FechaUTC
     model_config = ConfigDict(from_attributes=True)
 
 # >>> NUEVO: para devolver nombre(s) de cliente en listados del dueño
@@ -175,7 +207,7 @@ class ReservaResponse(BaseModel):
 class ReservaOut(BaseModel):
     id: int
     turno_id: int
-    fecha_hora_inicio: datetime
+    fecha_hora_inicio: FechaUTC
     precio: Optional[float] = None
     servicio_nombre: str
     emprendedor_id: int
@@ -184,8 +216,8 @@ class ReservaOut(BaseModel):
 class ReservaAgendaItem(BaseModel):
     id: int                    # id de la reserva
     turno_id: int
-    fecha_hora_inicio: datetime
-    fecha_hora_fin: datetime
+    fecha_hora_inicio: FechaUTC
+    fecha_hora_fin: FechaUTC
     servicio_nombre: str
     cliente_id: int
     cliente_nombre: str
@@ -194,6 +226,74 @@ class ReservaAgendaItem(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class EsperaOut(BaseModel):
+    id: int
+    turno_id: int
+    posicion: int  # 1 = el próximo en ser promovido
+
+
 class ReservaDirectaCreate(BaseModel):
     servicio_id: int
-    fecha_hora_inicio: datetime
\ No newline at end of file
+    # con offset → se respeta; sin offset → hora local del emprendedor
+    fecha_hora_inicio: datetime
+
+class ReservaReprogramar(BaseModel):
+    fecha_hora_inicio: datetime  # igual que en ReservaDirectaCreate
+    servicio_id: Optional[int] = None  # None → el mismo servicio de la reserva
+
+# =========================
+# Ocupación (dashboards)
+# =========================
+class OcupacionDiariaOut(BaseModel):
+    servicio_id: int
+    fecha: date
+    turnos: int
+    capacidad: int
+    reservados: int
+    porcentaje: float  # reservados / capacidad * 100
+    model_config = ConfigDict(from_attributes=True)
+
+# =========================
+# Disponibilidad
+# =========================
+class ProximoDisponibleOut(BaseModel):
+    servicio_id: int
+    turno_id: Optional[int] = None  # None → reservar con /reservas/directo
+    fecha_hora_inicio: FechaUTC
+    fecha_hora_fin: FechaUTC
+    libres: int
+
+class DisponibilidadBatchIn(BaseModel):
+    servicio_ids: List[int]
+    desde: date  # fecha local de cada emprendedor
+    hasta: date
+
+class SlotLibreOut(BaseModel):
+    turno_id: int
+    fecha_hora_inicio: FechaUTC
+    libres: int
+
+class DisponibilidadDiaOut(BaseModel):
+    fecha: date
+    libres: int  # lugares libres sumando todos los turnos del día
+    slots: List[SlotLibreOut]
+
+class DisponibilidadServicioOut(BaseModel):
+    servicio_id: int
+    dias: List[DisponibilidadDiaOut]
+
+class DisponibilidadBatchOut(BaseModel):
+    servicios: List[DisponibilidadServicioOut]
+    no_encontrados: List[int] = []
+
+# =========================
+# Búsqueda
+# =========================
+class BusquedaResultado(BaseModel):
+    tipo: str  # "emprendedor" | "servicio"
+    id: int
+    emprendedor_id: int
+    nombre: Optional[str] = None
+    descripcion: Optional[str] = None
+    rubro: Optional[str] = None
+    relevancia: float
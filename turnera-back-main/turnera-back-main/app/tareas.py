@@ -0,0 +1,202 @@
+# app/tareas.py
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import timedelta
+from typing import Callable, Dict, Tuple
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from app import database, models
+from app.crud.horarios import VENTANAS_SEMANAS, asegurar_ventanas
+from app.notificaciones import get_notificador
+from app.utils.archivo import archivar_turnos, purgar_turnos_vacios
+from app.utils.tiempo import ahora_utc
+
+logger = logging.getLogger("turnera.tareas")
+
+# Scheduler in-process: un asyncio.Task (arrancado desde el lifespan de FastAPI)
+# revisa la tabla `jobs` cada TAREAS_TICK segundos. Para ejecutar un job hay que
+# tomar su lease con un UPDATE condicional; así, con varios workers/procesos,
+# sólo uno lo corre, y el estado (próxima ejecución) sobrevive reinicios.
+TAREAS_HABILITADAS = os.getenv("TAREAS_HABILITADAS", "1") == "1"
+TAREAS_TICK = int(os.getenv("TAREAS_TICK", "30"))  # segundos
+LEASE_SEGUNDOS = 600  # si un worker muere con el lease tomado, otro lo retoma pasado este tiempo
+
+ARCHIVO_DIAS = int(os.getenv("ARCHIVO_DIAS", "30"))  # antigüedad para pasar a historial
+RECORDATORIO_HORAS = int(os.getenv("RECORDATORIO_HORAS", "24"))
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+# =========================================================
+# Jobs
+# =========================================================
+def job_purgar_turnos_vacios(db: Session) -> str:
+    n = purgar_turnos_vacios(db, ahora_utc())
+    return f"{n} turnos vacíos purgados"
+
+
+def job_archivar(db: Session) -> str:
+    n = archivar_turnos(db, ahora_utc() - timedelta(days=ARCHIVO_DIAS))
+    return f"{n} turnos archivados"
+
+
+def job_purgar_refresh_tokens(db: Session) -> str:
+    """Borra refresh tokens vencidos (los usados/revocados sirven hasta vencer para detectar reuso)."""
+    n = (
+        db.query(models.RefreshToken)
+        .filter(models.RefreshToken.expira < ahora_utc())
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return f"{n} refresh tokens purgados"
+
+
+def job_recordatorios(db: Session) -> str:
+    """Encola un recordatorio por cada reserva que empieza dentro de RECORDATORIO_HORAS."""
+    ahora = ahora_utc()
+    pendientes = (
+        db.query(models.Reserva, models.Turno, models.Servicio)
+        .join(models.Turno, models.Reserva.turno_id == models.Turno.id)
+        .join(models.Servicio, models.Turno.servicio_id == models.Servicio.id)
+        .filter(
+            models.Reserva.recordatorio_enviado.is_(None),
+            models.Turno.fecha_hora_inicio >= ahora,
+            models.Turno.fecha_hora_inicio < ahora + timedelta(hours=RECORDATORIO_HORAS),
+        )
+        .limit(500)
+        .all()
+    )
+    sink = get_notificador()
+    for reserva, turno, servicio in pendientes:
+        sink.enviar("recordatorio", reserva.usuario_id, {
+            "reserva_id": reserva.id,
+            "turno_id": turno.id,
+            "servicio": servicio.nombre,
+            "emprendedor_id": servicio.emprendedor_id,
+            "fecha_hora_inicio": turno.fecha_hora_inicio.isoformat() + "Z",
+        })
+        reserva.recordatorio_enviado = ahora
+        db.commit()  # uno por uno: si el sink falla a mitad, no se reenvían los ya enviados
+    return f"{len(pendientes)} recordatorios encolados"
+
+
+def job_extender_ventanas(db: Session) -> str:
+    """
+    Mantiene precalculadas las ventanas UTC de las próximas VENTANAS_SEMANAS
+    semanas. Las lecturas no las generan (calculan en memoria lo que falte).
+    """
+    ahora = ahora_utc()
+    hasta = ahora + timedelta(weeks=VENTANAS_SEMANAS)
+    emprendedores = (
+        db.query(models.Emprendedor)
+        .filter(models.Emprendedor.id.in_(db.query(models.Horario.emprendedor_id)))
+        .all()
+    )
+    for e in emprendedores:
+        asegurar_ventanas(db, e, ahora, hasta)
+        db.commit()  # uno por uno: no retener el lock de escritura de SQLite
+    return f"ventanas al día para {len(emprendedores)} emprendedores"
+
+
+# nombre → (función, intervalo en segundos)
+JOBS: Dict[str, Tuple[Callable[[Session], str], int]] = {
+    "purgar_turnos_vacios": (job_purgar_turnos_vacios, 3600),
+    "archivar": (job_archivar, 6 * 3600),
+    "recordatorios": (job_recordatorios, 300),
+    "purgar_refresh_tokens": (job_purgar_refresh_tokens, 24 * 3600),
+    "extender_ventanas": (job_extender_ventanas, 24 * 3600),
+}
+
+
+# =========================================================
+# Scheduler
+# =========================================================
+def registrar_jobs(db: Session):
+    existentes = {nombre for (nombre,) in db.query(models.Job.nombre)}
+    for nombre, (_, intervalo) in JOBS.items():
+        if nombre not in existentes:
+            db.add(models.Job(nombre=nombre, intervalo_segundos=intervalo, proxima_ejecucion=ahora_utc()))
+    db.commit()
+
+
+def tomar_job(db: Session, nombre: str) -> bool:
+    """UPDATE condicional: devuelve True sólo al worker que consiguió el lease."""
+    ahora = ahora_utc()
+    res = db.execute(
+        update(models.Job)
+        .where(
+            models.Job.nombre == nombre,
+            models.Job.proxima_ejecucion <= ahora,
+            or_(models.Job.bloqueado_hasta.is_(None), models.Job.bloqueado_hasta < ahora),
+        )
+        .values(bloqueado_por=WORKER_ID, bloqueado_hasta=ahora + timedelta(seconds=LEASE_SEGUNDOS))
+    )
+    db.commit()
+    return res.rowcount == 1
+
+
+def ejecutar_pendientes() -> None:
+    """Corre (sincrónicamente) los jobs vencidos cuyo lease se pudo tomar."""
+    db = database.SessionLocal()
+    try:
+        for nombre, (func, intervalo) in JOBS.items():
+            if not tomar_job(db, nombre):
+                continue
+            error = None
+            try:
+                logger.info("job %s: %s", nombre, func(db))
+            except Exception as exc:  # un job roto no debe frenar a los demás
+                db.rollback()
+                error = repr(exc)
+                logger.exception("job %s falló", nombre)
+            ahora = ahora_utc()
+            db.execute(
+                update(models.Job)
+                .where(models.Job.nombre == nombre, models.Job.bloqueado_por == WORKER_ID)
+                .values(
+                    bloqueado_por=None,
+                    bloqueado_hasta=None,
+                    ultima_ejecucion=ahora,
+                    ultimo_error=error,
+                    proxima_ejecucion=ahora + timedelta(seconds=intervalo),
+                )
+            )
+            db.commit()
+    finally:
+        db.close()
+
+
+async def _loop():
+    db = database.SessionLocal()
+    try:
+        registrar_jobs(db)
+    finally:
+        db.close()
+    while True:
+        try:
+            # la DB es sync: no bloqueamos el event loop
+            await asyncio.to_thread(ejecutar_pendientes)
+        except Exception:
+            logger.exception("error en el scheduler")
+        await asyncio.sleep(TAREAS_TICK)
+
+
+def iniciar() -> "asyncio.Task | None":
+    if not TAREAS_HABILITADAS:
+        return None
+    return asyncio.create_task(_loop(), name="turnera-tareas")
+
+
+async def detener(tarea: "asyncio.Task | None") -> None:
+    if tarea is None:
+        return
+    tarea.cancel()
+    try:
+        await tarea
+    except asyncio.CancelledError:
+        pass
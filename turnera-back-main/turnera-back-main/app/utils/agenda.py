@@ -0,0 +1,194 @@
+# app/utils/agenda.py
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app import models
+
+# Cache en memoria, por emprendedor y día (UTC), de la agenda como bitmap de
+# SLOT_MINUTOS: un bit por slot, guardado en un int de Python.
+#   ocupado: slots cubiertos por turnos llenos (redondeo hacia afuera)
+# Con ese redondeo la respuesta rápida sirve para listar disponibilidad: "no hay
+# solape" se decide con un AND; en el caso dudoso se confirma contra la DB, que
+# sigue siendo la fuente de verdad.
+# El cache es por proceso: se actualiza/invalida desde los write paths de este
+# proceso y AGENDA_TTL acota lo desactualizado que puede estar con varios workers
+# (o con escrituras de otras conexiones). Por eso al reservar no se usa: los
+# write paths validan con solape_exacto y crud.horarios.dentro_de_horario dentro
+# de la transacción.
+SLOT_MINUTOS = 5
+AGENDA_MAX_DIAS = int(os.getenv("AGENDA_MAX_DIAS", "4096"))  # entradas (emprendedor, día) en el LRU
+AGENDA_TTL = float(os.getenv("AGENDA_TTL", "60"))  # segundos
+LOOKBACK = timedelta(hours=6)  # un turno que empezó el día anterior puede pisar este
+
+
+class DiaAgenda:
+    __slots__ = ("ocupado", "creado")
+
+    def __init__(self, ocupado: int):
+        self.ocupado = ocupado
+        self.creado = time.monotonic()
+
+
+_cache: "OrderedDict[Tuple[int, date], DiaAgenda]" = OrderedDict()
+_lock = threading.Lock()
+# cambios (marcar_ocupado / invalidar) por emprendedor: un día que se construyó
+# mientras hubo un cambio puede no incluirlo, y no se guarda
+_cambios: Dict[int, int] = {}
+
+
+# =========================================================
+# Bits
+# =========================================================
+def _dia_inicio(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day)
+
+
+def _mascara(d: date, inicio: datetime, fin: datetime, hacia_afuera: bool) -> int:
+    """Bits del día `d` cubiertos por [inicio, fin). Vacío si no se tocan."""
+    base = _dia_inicio(d)
+    a = (max(inicio, base) - base).total_seconds() / 60 / SLOT_MINUTOS
+    b = (min(fin, base + timedelta(days=1)) - base).total_seconds() / 60 / SLOT_MINUTOS
+    if hacia_afuera:
+        a, b = math.floor(a), math.ceil(b)
+    else:
+        a, b = math.ceil(a), math.floor(b)
+    if b <= a:
+        return 0
+    return ((1 << (b - a)) - 1) << a
+
+
+def _dias(inicio: datetime, fin: datetime):
+    d = inicio.date()
+    while _dia_inicio(d) < fin:
+        yield d
+        d += timedelta(days=1)
+
+
+# =========================================================
+# Construcción (lazy, en el miss)
+# =========================================================
+def _turnos_llenos(
+    db: Session, emprendedor_id: int, desde: datetime, hasta: datetime, excluir_turno_id: Optional[int] = None
+):
+    """(inicio, duración) de los turnos sin lugar que empiezan en [desde - LOOKBACK, hasta)."""
+    reservas = (
+        select(func.count(models.Reserva.id))
+        .where(models.Reserva.turno_id == models.Turno.id)
+        .correlate(models.Turno)
+        .scalar_subquery()
+    )
+    q = (
+        db.query(models.Turno.fecha_hora_inicio, models.Turno.duracion_minutos)
+        .join(models.Servicio, models.Turno.servicio_id == models.Servicio.id)
+        .filter(
+            models.Servicio.emprendedor_id == emprendedor_id,
+            models.Turno.fecha_hora_inicio >= desde - LOOKBACK,
+            models.Turno.fecha_hora_inicio < hasta,
+            reservas >= func.coalesce(models.Turno.capacidad, 1),
+        )
+    )
+    if excluir_turno_id is not None:
+        q = q.filter(models.Turno.id != excluir_turno_id)
+    return q
+
+
+def _construir(db: Session, emprendedor: models.Emprendedor, d: date) -> DiaAgenda:
+    desde, hasta = _dia_inicio(d), _dia_inicio(d) + timedelta(days=1)
+
+    ocupado = 0
+    for inicio, dur in _turnos_llenos(db, emprendedor.id, desde, hasta):
+        ocupado |= _mascara(d, inicio, inicio + timedelta(minutes=dur or 30), hacia_afuera=True)
+    return DiaAgenda(ocupado)
+
+
+def _dia(db: Session, emprendedor: models.Emprendedor, d: date) -> DiaAgenda:
+    clave = (emprendedor.id, d)
+    with _lock:
+        dia = _cache.get(clave)
+        if dia is not None and time.monotonic() - dia.creado < AGENDA_TTL:
+            _cache.move_to_end(clave)
+            return dia
+        cambios = _cambios.get(emprendedor.id, 0)
+    # se construye fuera del lock (son queries); si en el medio
+    # hubo un marcar_ocupado/invalidar, el resultado sirve para esta consulta
+    # pero no se cachea (si no, pisaría los bits recién marcados)
+    dia = _construir(db, emprendedor, d)
+    with _lock:
+        if _cambios.get(emprendedor.id, 0) != cambios:
+            return dia
+        _cache[clave] = dia
+        _cache.move_to_end(clave)
+        while len(_cache) > AGENDA_MAX_DIAS:
+            _cache.popitem(last=False)
+    return dia
+
+
+# =========================================================
+# Consultas
+# =========================================================
+def hay_solape(
+    db: Session,
+    emprendedor: models.Emprendedor,
+    inicio: datetime,
+    fin: datetime,
+    excluir_turno_id: Optional[int] = None,
+) -> bool:
+    """
+    ¿[inicio, fin) (UTC naive) pisa algún turno lleno del emprendedor?
+    Para listados: el bitmap puede estar atrasado y decir "libre" de más. Para
+    validar una reserva usar solape_exacto.
+    `excluir_turno_id`: turno que no cuenta (el que se está dejando al reprogramar).
+    """
+    posible = any(
+        _dia(db, emprendedor, d).ocupado & _mascara(d, inicio, fin, hacia_afuera=True)
+        for d in _dias(inicio, fin)
+    )
+    if not posible:
+        return False
+    return solape_exacto(db, emprendedor.id, inicio, fin, excluir_turno_id)
+
+
+def solape_exacto(
+    db: Session, emprendedor_id: int, inicio: datetime, fin: datetime, excluir_turno_id: Optional[int] = None
+) -> bool:
+    """Chequeo contra la DB: A.start < B.end && B.start < A.end, sólo turnos llenos."""
+    return any(
+        inicio < t_inicio + timedelta(minutes=dur or 30)
+        for t_inicio, dur in _turnos_llenos(db, emprendedor_id, inicio, fin, excluir_turno_id)
+    )
+
+
+# =========================================================
+# Write paths (llamar después del commit)
+# =========================================================
+def marcar_ocupado(emprendedor_id: int, inicio: datetime, fin: datetime) -> None:
+    """Un turno quedó lleno: prendemos sus bits en los días cacheados."""
+    with _lock:
+        _cambios[emprendedor_id] = _cambios.get(emprendedor_id, 0) + 1
+        for d in _dias(inicio, fin):
+            dia = _cache.get((emprendedor_id, d))
+            if dia is not None:
+                dia.ocupado |= _mascara(d, inicio, fin, hacia_afuera=True)
+
+
+def invalidar(emprendedor_id: int, inicio: Optional[datetime] = None, fin: Optional[datetime] = None) -> None:
+    """
+    Se liberó lugar o cambiaron horarios: los bits no se pueden apagar sin
+    recontar, así que descartamos los días afectados (o todos, sin rango).
+    """
+    with _lock:
+        _cambios[emprendedor_id] = _cambios.get(emprendedor_id, 0) + 1
+        if inicio is None:
+            for clave in [k for k in _cache if k[0] == emprendedor_id]:
+                del _cache[clave]
+            return
+        for d in _dias(inicio, fin or inicio + timedelta(minutes=1)):
+            _cache.pop((emprendedor_id, d), None)
@@ -0,0 +1,125 @@
+# app/utils/archivo.py
+from datetime import datetime
+
+from sqlalchemy import delete, exists, func, insert, literal, select, text, union_all
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.tiempo import ahora_utc
+
+ARCHIVO_LOTE = 500  # filas de turnos por transacción
+
+
+def _mover_a_historial(db: Session, ids) -> None:
+    """Copia los turnos `ids` (y sus reservas) al historial y los borra de las tablas activas. Sin commit."""
+    T, R = models.Turno, models.Reserva
+    TH, RH = models.TurnoHistorial, models.ReservaHistorial
+    ahora = literal(ahora_utc())
+    db.execute(
+        insert(TH).from_select(
+            ["id", "servicio_id", "fecha_hora_inicio", "duracion_minutos", "capacidad", "precio", "archivado_en"],
+            select(T.id, T.servicio_id, T.fecha_hora_inicio, T.duracion_minutos, T.capacidad, T.precio, ahora)
+            .where(T.id.in_(ids)),
+        )
+    )
+    db.execute(
+        insert(RH).from_select(
+            ["id", "turno_id", "usuario_id", "archivado_en"],
+            select(R.id, R.turno_id, R.usuario_id, ahora).where(R.turno_id.in_(ids)),
+        )
+    )
+    db.execute(delete(R).where(R.turno_id.in_(ids)))
+    db.execute(delete(models.EsperaTurno).where(models.EsperaTurno.turno_id.in_(ids)))  # ya no hay a qué promover
+    db.execute(delete(T).where(T.id.in_(ids)))
+
+
+def purgar_turnos_vacios(db: Session, antes_de: datetime, lote: int = ARCHIVO_LOTE) -> int:
+    """
+    Saca de `turnos` los que empezaron antes de `antes_de` y nunca tuvieron
+    reservas, sin esperar los días de archivar_turnos. No se borran: pasan a
+    turnos_historial, porque fueron capacidad ofrecida y cuentan en la
+    ocupación (ocupacion_diaria no cambia y recalcular los sigue viendo).
+    Un commit por lote para no retener el lock de escritura de SQLite.
+    """
+    T, R = models.Turno, models.Reserva
+    total = 0
+    while True:
+        ids = [
+            i for (i,) in db.query(T.id)
+            .filter(T.fecha_hora_inicio < antes_de, ~exists().where(R.turno_id == T.id))
+            .order_by(T.id)
+            .limit(lote)
+        ]
+        if not ids:
+            return total
+        _mover_a_historial(db, ids)
+        db.commit()
+        total += len(ids)
+
+
+def reservar_ids_archivados(bind) -> None:
+    """
+    turnos/reservas usan AUTOINCREMENT para que un id archivado no se reuse (el
+    historial conserva el id original y reservas_de_usuario une ambas tablas).
+    En una DB migrada la secuencia arranca en el máximo de la tabla activa: se
+    sube al máximo del historial. Idempotente; se corre al arrancar.
+    """
+    pares = ((models.Turno, models.TurnoHistorial), (models.Reserva, models.ReservaHistorial))
+    with bind.begin() as conn:
+        for activa, historial in pares:
+            tope = conn.execute(select(func.max(historial.id))).scalar()
+            if tope is None:
+                continue
+            nombre = {"n": activa.__tablename__, "t": tope}
+            actual = conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = :n"), nombre).scalar()
+            if actual is None:
+                conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:n, :t)"), nombre)
+            elif actual < tope:
+                conn.execute(text("UPDATE sqlite_sequence SET seq = :t WHERE name = :n"), nombre)
+
+
+def archivar_turnos(db: Session, antes_de: datetime, lote: int = ARCHIVO_LOTE) -> int:
+    """
+    Mueve turnos anteriores a `antes_de` (y sus reservas) a turnos_historial /
+    reservas_historial. Cada lote es una transacción: copiar + borrar.
+    """
+    T = models.Turno
+    total = 0
+    while True:
+        ids = [
+            i for (i,) in db.query(T.id)
+            .filter(T.fecha_hora_inicio < antes_de)
+            .order_by(T.id)
+            .limit(lote)
+        ]
+        if not ids:
+            return total
+        _mover_a_historial(db, ids)
+        db.commit()
+        total += len(ids)
+
+
+def reservas_de_usuario(usuario_id: int):
+    """
+    SELECT de las reservas de un usuario uniendo la tabla caliente y el historial
+    (UNION ALL). Columnas: id, turno_id, fecha_hora_inicio, precio, servicio_nombre,
+    emprendedor_id. Cada rama usa su propio índice por usuario_id.
+    """
+    T, R, S = models.Turno, models.Reserva, models.Servicio
+    TH, RH = models.TurnoHistorial, models.ReservaHistorial
+    activas = (
+        select(R.id, R.turno_id, T.fecha_hora_inicio, T.precio,
+               S.nombre.label("servicio_nombre"), S.emprendedor_id)
+        .join(T, R.turno_id == T.id)
+        .join(S, T.servicio_id == S.id)
+        .where(R.usuario_id == usuario_id)
+    )
+    archivadas = (
+        select(RH.id, RH.turno_id, TH.fecha_hora_inicio, TH.precio,
+               S.nombre.label("servicio_nombre"), S.emprendedor_id)
+        .join(TH, RH.turno_id == TH.id)
+        .join(S, TH.servicio_id == S.id)
+        .where(RH.usuario_id == usuario_id)
+    )
+    u = union_all(activas, archivadas).subquery()
+    return select(u).order_by(u.c.fecha_hora_inicio, u.c.id)
@@ -0,0 +1,162 @@
+# app/utils/busqueda.py
+import logging
+import re
+from typing import List, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("turnera.busqueda")
+
+# Índice full-text (SQLite FTS5) de emprendedores y servicios.
+# Lo mantienen al día triggers sobre las tablas base, así que cubre cualquier
+# write path (ORM, bulk deletes, scripts). `remove_diacritics 2` hace que
+# "peluqueria" encuentre "Peluquería". El rowid codifica el origen:
+#   emprendedor → id * 2, servicio → id * 2 + 1
+FTS_TABLA = "busqueda_fts"
+MAX_TERMINOS = 8
+
+_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLA} USING fts5(
+        tipo UNINDEXED, emprendedor_id UNINDEXED, nombre, descripcion, rubro,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    # --- emprendedores ---
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLA}_emp_ai AFTER INSERT ON emprendedores BEGIN
+        INSERT INTO {FTS_TABLA}(rowid, tipo, emprendedor_id, nombre, descripcion, rubro)
+        VALUES (new.id * 2, 'emprendedor', new.id, new.negocio, new.descripcion, new.rubro);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLA}_emp_au
+    AFTER UPDATE OF negocio, descripcion, rubro ON emprendedores BEGIN
+        DELETE FROM {FTS_TABLA} WHERE rowid = old.id * 2;
+        INSERT INTO {FTS_TABLA}(rowid, tipo, emprendedor_id, nombre, descripcion, rubro)
+        VALUES (new.id * 2, 'emprendedor', new.id, new.negocio, new.descripcion, new.rubro);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLA}_emp_ad AFTER DELETE ON emprendedores BEGIN
+        DELETE FROM {FTS_TABLA} WHERE rowid = old.id * 2;
+    END
+    """,
+    # --- servicios ---
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLA}_serv_ai AFTER INSERT ON servicios BEGIN
+        INSERT INTO {FTS_TABLA}(rowid, tipo, emprendedor_id, nombre, descripcion, rubro)
+        VALUES (new.id * 2 + 1, 'servicio', new.emprendedor_id, new.nombre, new.descripcion, NULL);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLA}_serv_au
+    AFTER UPDATE OF nombre, descripcion, emprendedor_id ON servicios BEGIN
+        DELETE FROM {FTS_TABLA} WHERE rowid = old.id * 2 + 1;
+        INSERT INTO {FTS_TABLA}(rowid, tipo, emprendedor_id, nombre, descripcion, rubro)
+        VALUES (new.id * 2 + 1, 'servicio', new.emprendedor_id, new.nombre, new.descripcion, NULL);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLA}_serv_ad AFTER DELETE ON servicios BEGIN
+        DELETE FROM {FTS_TABLA} WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+]
+
+fts_disponible = True  # False si el SQLite no trae FTS5 → se busca con LIKE
+
+
+def crear_indice(bind: Engine) -> None:
+    """Crea la tabla FTS y los triggers si faltan; si la tabla es nueva, la llena."""
+    global fts_disponible
+    nueva = not inspect(bind).has_table(FTS_TABLA)
+    try:
+        with bind.begin() as conn:
+            for ddl in _DDL:
+                conn.execute(text(ddl))
+    except Exception:
+        fts_disponible = False
+        logger.warning("SQLite sin FTS5: /buscar usa LIKE", exc_info=True)
+        return
+    if nueva:
+        with bind.begin() as conn:
+            reindexar(conn)
+
+
+def reindexar(conn) -> int:
+    """Reconstruye el índice desde emprendedores + servicios. Devuelve filas indexadas."""
+    conn.execute(text(f"DELETE FROM {FTS_TABLA}"))
+    conn.execute(text(f"""
+        INSERT INTO {FTS_TABLA}(rowid, tipo, emprendedor_id, nombre, descripcion, rubro)
+        SELECT id * 2, 'emprendedor', id, negocio, descripcion, rubro FROM emprendedores
+    """))
+    conn.execute(text(f"""
+        INSERT INTO {FTS_TABLA}(rowid, tipo, emprendedor_id, nombre, descripcion, rubro)
+        SELECT id * 2 + 1, 'servicio', emprendedor_id, nombre, descripcion, NULL FROM servicios
+    """))
+    return conn.execute(text(f"SELECT count(*) FROM {FTS_TABLA}")).scalar()
+
+
+def _consulta_fts(q: str) -> Optional[str]:
+    """Texto libre → consulta FTS5 segura: cada palabra como prefijo entre comillas (AND)."""
+    terminos = re.findall(r"\w+", q)[:MAX_TERMINOS]
+    if not terminos:
+        return None
+    return " ".join(f'"{t}"*' for t in terminos)
+
+
+def buscar(db: Session, q: str, rubro: Optional[str], limit: int, offset: int) -> List[dict]:
+    """
+    Resultados ordenados por relevancia (BM25; pesa más el nombre que la
+    descripción). `rubro` filtra por el rubro del emprendedor, sin importar
+    mayúsculas.
+    """
+    if not fts_disponible:
+        return _buscar_like(db, q, rubro, limit, offset)
+    consulta = _consulta_fts(q)
+    if consulta is None:
+        return []
+    sql = f"""
+        SELECT f.tipo, f.rowid / 2 AS id, f.emprendedor_id, f.nombre, f.descripcion,
+               e.rubro, -bm25({FTS_TABLA}, 0, 0, 10.0, 2.0, 5.0) AS relevancia
+        FROM {FTS_TABLA} f
+        JOIN emprendedores e ON e.id = f.emprendedor_id
+        WHERE {FTS_TABLA} MATCH :consulta
+          AND (:rubro IS NULL OR lower(e.rubro) = lower(:rubro))
+        ORDER BY bm25({FTS_TABLA}, 0, 0, 10.0, 2.0, 5.0), f.rowid
+        LIMIT :limit OFFSET :offset
+    """
+    filas = db.execute(text(sql), {
+        "consulta": consulta, "rubro": rubro, "limit": limit, "offset": offset,
+    })
+    return [dict(f._mapping) for f in filas]
+
+
+def _buscar_like(db: Session, q: str, rubro: Optional[str], limit: int, offset: int) -> List[dict]:
+    """Fallback sin FTS5: LIKE sobre nombre/descripcion (sin ranking ni acentos)."""
+    terminos = re.findall(r"\w+", q)[:MAX_TERMINOS]
+    if not terminos:
+        return []
+    params = {"rubro": rubro, "limit": limit, "offset": offset}
+    condiciones = []
+    for i, t in enumerate(terminos):
+        params[f"t{i}"] = f"%{t}%"
+        condiciones.append(f"(u.nombre LIKE :t{i} OR u.descripcion LIKE :t{i})")
+    sql = f"""
+        SELECT u.tipo, u.id, u.emprendedor_id, u.nombre, u.descripcion, e.rubro, 0.0 AS relevancia
+        FROM (
+            SELECT 'emprendedor' AS tipo, id, id AS emprendedor_id, negocio AS nombre, descripcion
+            FROM emprendedores
+            UNION ALL
+            SELECT 'servicio', id, emprendedor_id, nombre, descripcion FROM servicios
+        ) u
+        JOIN emprendedores e ON e.id = u.emprendedor_id
+        WHERE {" AND ".join(condiciones)}
+          AND (:rubro IS NULL OR lower(e.rubro) = lower(:rubro))
+        ORDER BY u.tipo, u.id
+        LIMIT :limit OFFSET :offset
+    """
+    return [dict(f._mapping) for f in db.execute(text(sql), params)]
@@ -0,0 +1,341 @@
+# app/utils/calendario.py
+import hashlib
+import os
+import secrets
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.tiempo import ahora_utc
+
+# Feeds .ics por usuario (sus reservas) y por emprendedor (sus turnos), con URL
+# secreta para suscribirse desde Google Calendar, Apple, Outlook, etc.
+# Cada feed tiene un contador `version` que incrementan triggers sobre
+# reservas/turnos/servicios/emprendedores (cubre cualquier write path, igual que
+# el índice de búsqueda). Un poll trae ETag = id-versión y Last-Modified =
+# `modificado`: si no cambió nada, 304 con un SELECT por índice. Si cambió, el
+# .ics sale de una sola consulta (proyección) y queda en memoria por token y versión.
+CALENDARIO_DIAS_PASADOS = int(os.getenv("CALENDARIO_DIAS_PASADOS", "30"))
+CALENDARIO_CACHE_MAX = 1000  # feeds generados en memoria (LRU)
+TIPOS = ("usuario", "emprendedor")
+
+_cache: "OrderedDict[str, Tuple[int, bytes]]" = OrderedDict()  # token_hash → (version, .ics)
+_cache_lock = threading.Lock()
+
+
+def _tocar(tipo: str, condicion: str) -> str:
+    # `modificado` crece al menos 1 s por cambio: si dos cambios caen en el mismo
+    # segundo, el segundo igual cambia el Last-Modified (If-Modified-Since no
+    # tiene más resolución que el segundo).
+    return f"""
+        UPDATE calendario_feeds
+        SET version = version + 1,
+            modificado = max(CURRENT_TIMESTAMP, datetime(modificado, '+1 second'))
+        WHERE tipo = '{tipo}' AND dueno_id {condicion};
+    """
+
+
+def _emp_de_turno(turno_id: str) -> str:
+    return f"""= (SELECT s.emprendedor_id FROM turnos t JOIN servicios s ON s.id = t.servicio_id
+                  WHERE t.id = {turno_id})"""
+
+
+_USUARIOS_DE_SERVICIO = """IN (SELECT r.usuario_id FROM reservas r JOIN turnos t ON t.id = r.turno_id
+                          WHERE t.servicio_id = {id})"""
+
+_DDL = [
+    # --- reservas: el cliente y el emprendedor del turno ---
+    f"""
+    CREATE TRIGGER IF NOT EXISTS calendario_res_ai AFTER INSERT ON reservas BEGIN
+        {_tocar("usuario", "= new.usuario_id")}
+        {_tocar("emprendedor", _emp_de_turno("new.turno_id"))}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS calendario_res_au AFTER UPDATE OF turno_id, usuario_id ON reservas BEGIN
+        {_tocar("usuario", "IN (old.usuario_id, new.usuario_id)")}
+        {_tocar("emprendedor", _emp_de_turno("old.turno_id"))}
+        {_tocar("emprendedor", _emp_de_turno("new.turno_id"))}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS calendario_res_ad AFTER DELETE ON reservas BEGIN
+        {_tocar("usuario", "= old.usuario_id")}
+        {_tocar("emprendedor", _emp_de_turno("old.turno_id"))}
+    END
+    """,
+    # --- turnos: el emprendedor y los clientes anotados ---
+    f"""
+    CREATE TRIGGER IF NOT EXISTS calendario_tur_ai AFTER INSERT ON turnos BEGIN
+        {_tocar("emprendedor", "= (SELECT emprendedor_id FROM servicios WHERE id = new.servicio_id)")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS calendario_tur_au
+    AFTER UPDATE OF fecha_hora_inicio, duracion_minutos, capacidad, servicio_id ON turnos BEGIN
+        {_tocar("emprendedor", "IN (SELECT emprendedor_id FROM servicios WHERE id IN (old.servicio_id, new.servicio_id))")}
+        {_tocar("usuario", "IN (SELECT usuario_id FROM reservas WHERE turno_id = new.id)")}
+    END
+    """,
+    # al borrar un turno, sus reservas se borran en cascada (y avisan a los clientes)
+    f"""
+    CREATE TRIGGER IF NOT EXISTS calendario_tur_ad AFTER DELETE ON turnos BEGIN
+        {_tocar("emprendedor", "= (SELECT emprendedor_id FROM servicios WHERE id = old.servicio_id)")}
+    END
+    """,
+    # --- servicios / emprendedores: el nombre y la dirección salen en los eventos ---
+    f"""
+    CREATE TRIGGER IF NOT EXISTS calendario_serv_au AFTER UPDATE OF nombre ON servicios BEGIN
+        {_tocar("emprendedor", "= new.emprendedor_id")}
+        {_tocar("usuario", _USUARIOS_DE_SERVICIO.format(id="new.id"))}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS calendario_serv_ad AFTER DELETE ON servicios BEGIN
+        {_tocar("emprendedor", "= old.emprendedor_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS calendario_emp_au AFTER UPDATE OF negocio, direccion ON emprendedores BEGIN
+        {_tocar("usuario", '''IN (SELECT r.usuario_id FROM reservas r
+                                  JOIN turnos t ON t.id = r.turno_id
+                                  JOIN servicios s ON s.id = t.servicio_id
+                                  WHERE s.emprendedor_id = new.id)''')}
+    END
+    """,
+    # --- dueño borrado: el feed no tiene FK (es polimórfico) ---
+    """
+    CREATE TRIGGER IF NOT EXISTS calendario_usu_ad AFTER DELETE ON usuarios BEGIN
+        DELETE FROM calendario_feeds WHERE tipo = 'usuario' AND dueno_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS calendario_emp_ad AFTER DELETE ON emprendedores BEGIN
+        DELETE FROM calendario_feeds WHERE tipo = 'emprendedor' AND dueno_id = old.id;
+    END
+    """,
+]
+
+
+def crear_triggers(bind: Engine) -> None:
+    """Crea los triggers si faltan (después de actualizar_foreign_keys, que los pierde)."""
+    with bind.begin() as conn:
+        for ddl in _DDL:
+            conn.execute(text(ddl))
+
+
+# =========================================================
+# Tokens
+# =========================================================
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _olvidar(db: Session, tipo: str, dueno_id: int) -> None:
+    """Saca de la cache (de este proceso) el .ics del token actual del dueño."""
+    anterior = (
+        db.query(models.CalendarioFeed.token_hash)
+        .filter(models.CalendarioFeed.tipo == tipo, models.CalendarioFeed.dueno_id == dueno_id)
+        .scalar()
+    )
+    if anterior is not None:
+        with _cache_lock:
+            _cache.pop(anterior, None)
+
+
+def rotar_token(db: Session, tipo: str, dueno_id: int) -> str:
+    """
+    Crea el feed o le cambia el token (la URL anterior deja de andar). Hace
+    commit y devuelve el token en claro: sólo se muestra esta vez.
+    """
+    _olvidar(db, tipo, dueno_id)
+    token = secrets.token_urlsafe(32)
+    stmt = (
+        insert(models.CalendarioFeed)
+        .values(
+            tipo=tipo, dueno_id=dueno_id, token_hash=_hash_token(token),
+            version=1, modificado=ahora_utc().replace(microsecond=0),
+        )
+        .on_conflict_do_update(
+            index_elements=[models.CalendarioFeed.tipo, models.CalendarioFeed.dueno_id],
+            set_={"token_hash": _hash_token(token)},
+        )
+    )
+    db.execute(stmt)
+    db.commit()
+    return token
+
+
+def borrar_feed(db: Session, tipo: str, dueno_id: int) -> bool:
+    _olvidar(db, tipo, dueno_id)
+    n = (
+        db.query(models.CalendarioFeed)
+        .filter(models.CalendarioFeed.tipo == tipo, models.CalendarioFeed.dueno_id == dueno_id)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return n > 0
+
+
+def feed_por_token(db: Session, token: str) -> Optional[models.CalendarioFeed]:
+    return (
+        db.query(models.CalendarioFeed)
+        .filter(models.CalendarioFeed.token_hash == _hash_token(token))
+        .first()
+    )
+
+
+# =========================================================
+# Validación condicional (304)
+# =========================================================
+def etag(feed: models.CalendarioFeed) -> str:
+    # el id (AUTOINCREMENT, no se reusa) distingue feeds que van por la misma versión
+    return f'"{feed.id}-{feed.version}"'
+
+
+def ultima_modificacion(feed: models.CalendarioFeed) -> str:
+    return format_datetime(feed.modificado.replace(microsecond=0, tzinfo=timezone.utc), usegmt=True)
+
+
+def no_modificado(
+    feed: models.CalendarioFeed, if_none_match: Optional[str], if_modified_since: Optional[str]
+) -> bool:
+    """If-None-Match manda; If-Modified-Since sólo se mira si no vino ETag (RFC 9110)."""
+    if if_none_match is not None:
+        candidatos = [c.strip() for c in if_none_match.split(",")]
+        return "*" in candidatos or etag(feed) in [c[2:] if c.startswith("W/") else c for c in candidatos]
+    if if_modified_since is not None:
+        try:
+            desde = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False  # fecha inválida: se ignora el header
+        if desde.tzinfo is None:
+            return False
+        desde = desde.astimezone(timezone.utc).replace(tzinfo=None)
+        return feed.modificado.replace(microsecond=0) <= desde
+    return False
+
+
+# =========================================================
+# Proyección + .ics
+# =========================================================
+def _eventos_usuario(db: Session, usuario_id: int, desde: datetime) -> List[Tuple[str, datetime, int, str, Optional[str]]]:
+    T, R, S, E = models.Turno, models.Reserva, models.Servicio, models.Emprendedor
+    filas = db.execute(
+        select(R.id, T.fecha_hora_inicio, T.duracion_minutos, S.nombre, E.negocio, E.direccion)
+        .join(T, T.id == R.turno_id)
+        .join(S, S.id == T.servicio_id)
+        .join(E, E.id == S.emprendedor_id)
+        .where(R.usuario_id == usuario_id, T.fecha_hora_inicio >= desde)
+        .order_by(T.fecha_hora_inicio)
+    ).all()
+    return [
+        (f"reserva-{r_id}", inicio, dur, f"{servicio} — {negocio}" if negocio else servicio, direccion)
+        for r_id, inicio, dur, servicio, negocio, direccion in filas
+    ]
+
+
+def _eventos_emprendedor(db: Session, emprendedor_id: int, desde: datetime) -> List[Tuple[str, datetime, int, str, Optional[str]]]:
+    T, R, S, U = models.Turno, models.Reserva, models.Servicio, models.Usuario
+    filas = db.execute(
+        select(
+            T.id, T.fecha_hora_inicio, T.duracion_minutos, T.capacidad, S.nombre,
+            func.count(R.id), func.group_concat(U.username, ", "),
+        )
+        .join(S, S.id == T.servicio_id)
+        .outerjoin(R, R.turno_id == T.id)
+        .outerjoin(U, U.id == R.usuario_id)
+        .where(S.emprendedor_id == emprendedor_id, T.fecha_hora_inicio >= desde)
+        .group_by(T.id)
+        .order_by(T.fecha_hora_inicio)
+    ).all()
+    return [
+        (f"turno-{t_id}", inicio, dur, f"{servicio} ({reservados}/{capacidad})", clientes)
+        for t_id, inicio, dur, capacidad, servicio, reservados, clientes in filas
+    ]
+
+
+def _texto(valor: str) -> str:
+    """Escapado de TEXT (RFC 5545 §3.3.11)."""
+    return (
+        valor.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _plegar(linea: str) -> str:
+    """Líneas de a lo sumo 75 octetos; las siguientes empiezan con espacio (§3.1)."""
+    if len(linea.encode("utf-8")) <= 75:
+        return linea
+    partes, actual, tam = [], "", 0
+    for c in linea:
+        n = len(c.encode("utf-8"))
+        if tam + n > (75 if not partes else 74):
+            partes.append(actual)
+            actual, tam = "", 0
+        actual += c
+        tam += n
+    partes.append(actual)
+    return "\r\n ".join(partes)
+
+
+def _fecha(dt: datetime) -> str:
+    return dt.strftime("%Y%m%dT%H%M%SZ")  # UTC naive de la DB
+
+
+def generar_ics(feed: models.CalendarioFeed, eventos, nombre: str) -> bytes:
+    dtstamp = _fecha(feed.modificado)
+    lineas = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Turnera//Turnos//ES",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_texto(nombre)}",
+    ]
+    for uid, inicio, duracion, resumen, detalle in eventos:
+        lineas += [
+            "BEGIN:VEVENT",
+            f"UID:{uid}@turnera",
+            f"DTSTAMP:{dtstamp}",
+            f"DTSTART:{_fecha(inicio)}",
+            f"DTEND:{_fecha(inicio + timedelta(minutes=duracion))}",
+            f"SUMMARY:{_texto(resumen)}",
+        ]
+        if detalle:
+            campo = "LOCATION" if feed.tipo == "usuario" else "DESCRIPTION"
+            lineas.append(f"{campo}:{_texto(detalle)}")
+        lineas.append("END:VEVENT")
+    lineas.append("END:VCALENDAR")
+    return ("\r\n".join(_plegar(l) for l in lineas) + "\r\n").encode("utf-8")
+
+
+def contenido(db: Session, feed: models.CalendarioFeed) -> bytes:
+    """El .ics de la versión actual del feed (de la cache si ya se generó)."""
+    # clave = token_hash: un feed nuevo (o rotado) nunca ve lo generado para otro
+    with _cache_lock:
+        guardado = _cache.get(feed.token_hash)
+        if guardado and guardado[0] == feed.version:
+            _cache.move_to_end(feed.token_hash)
+            return guardado[1]
+
+    desde = ahora_utc() - timedelta(days=CALENDARIO_DIAS_PASADOS)
+    if feed.tipo == "usuario":
+        cuerpo = generar_ics(feed, _eventos_usuario(db, feed.dueno_id, desde), "Mis turnos")
+    else:
+        cuerpo = generar_ics(feed, _eventos_emprendedor(db, feed.dueno_id, desde), "Agenda")
+
+    with _cache_lock:
+        _cache[feed.token_hash] = (feed.version, cuerpo)
+        _cache.move_to_end(feed.token_hash)
+        if len(_cache) > CALENDARIO_CACHE_MAX:
+            _cache.popitem(last=False)
+    return cuerpo
@@ -0,0 +1,197 @@
+# app/utils/disponibilidad.py
+import heapq
+import os
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.crud.horarios import ventanas_entre
+from app.utils import agenda
+from app.utils.tiempo import a_local, ahora_utc, local_a_utc
+
+BUSQUEDA_MAX_DIAS = int(os.getenv("BUSQUEDA_MAX_DIAS", "60"))  # horizonte de "próximo disponible"
+BATCH_MAX_SERVICIOS = 50
+BATCH_MAX_DIAS = 31
+
+
+class Hueco(NamedTuple):
+    inicio: datetime  # UTC naive
+    orden: int  # 0 = turno existente, 1 = inicio libre en horario (desempata a favor del turno)
+    servicio_id: int
+    turno_id: Optional[int]
+    duracion: int
+    libres: int
+
+
+def _dia_inicio(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day)
+
+
+# =========================================================
+# Fuentes (cada una ordenada por inicio)
+# =========================================================
+def _turnos_con_lugar(db: Session, servicio_id: int, desde: datetime, hasta: datetime) -> Iterator[Hueco]:
+    """Turnos ya creados del servicio que todavía tienen lugar, en orden."""
+    reservas = (
+        select(func.count(models.Reserva.id))
+        .where(models.Reserva.turno_id == models.Turno.id)
+        .correlate(models.Turno)
+        .scalar_subquery()
+    )
+    capacidad = func.coalesce(models.Turno.capacidad, 1)
+    q = (
+        db.query(models.Turno.id, models.Turno.fecha_hora_inicio, models.Turno.duracion_minutos,
+                 (capacidad - reservas).label("libres"))
+        .filter(
+            models.Turno.servicio_id == servicio_id,
+            models.Turno.fecha_hora_inicio >= desde,
+            models.Turno.fecha_hora_inicio < hasta,
+            reservas < capacidad,
+        )
+        .order_by(models.Turno.fecha_hora_inicio, models.Turno.id)
+        .yield_per(50)
+    )
+    for turno_id, inicio, dur, libres in q:
+        yield Hueco(inicio, 0, servicio_id, turno_id, dur or 30, libres)
+
+
+def _inicios_en_horario(
+    db: Session,
+    emprendedor: models.Emprendedor,
+    servicio: models.Servicio,
+    desde: datetime,
+    hasta: datetime,
+    ventanas_dia,
+) -> Iterator[Hueco]:
+    """
+    Inicios libres para una reserva directa: se recorren las ventanas de
+    atención día por día, en pasos de la duración del servicio, descartando
+    los que pisan un turno lleno (bitmap de la agenda).
+    """
+    dur = servicio.duracion or 30
+    paso = timedelta(minutes=dur)
+    d = desde.date()
+    while _dia_inicio(d) < hasta:
+        base = _dia_inicio(d)
+        for v_inicio, v_fin in ventanas_dia(d):
+            t = v_inicio
+            while t + paso <= v_fin and t < base + timedelta(days=1):
+                # una ventana que cruza la medianoche UTC se reparte entre los dos días
+                if t >= base and t >= desde and t < hasta and not agenda.hay_solape(db, emprendedor, t, t + paso):
+                    yield Hueco(t, 1, servicio.id, None, dur, 1)
+                t += paso
+        d += timedelta(days=1)
+
+
+# =========================================================
+# Búsqueda
+# =========================================================
+def proximos(
+    db: Session,
+    emprendedor: models.Emprendedor,
+    servicios: List[models.Servicio],
+    desde: datetime,
+    n: int,
+    max_dias: int = BUSQUEDA_MAX_DIAS,
+) -> List[Hueco]:
+    """
+    Primeros `n` inicios disponibles desde `desde` (UTC naive) entre todos los
+    servicios: merge con heap de los iteradores ordenados (turnos con lugar +
+    inicios libres en horario), que son lazy y se cortan apenas hay `n`.
+    """
+    hasta = desde + timedelta(days=max_dias)
+    tiene_horarios = db.query(models.Horario.id).filter(
+        models.Horario.emprendedor_id == emprendedor.id
+    ).first() is not None
+
+    # las ventanas son del emprendedor: se leen una vez por día y se comparten entre servicios
+    cache: Dict[date, list] = {}
+
+    def ventanas_dia(d: date):
+        if d not in cache:
+            base = _dia_inicio(d)
+            cache[d] = ventanas_entre(db, emprendedor, base, base + timedelta(days=1)) or []
+        return cache[d]
+
+    fuentes = []
+    for s in servicios:
+        fuentes.append(_turnos_con_lugar(db, s.id, desde, hasta))
+        if tiene_horarios:
+            fuentes.append(_inicios_en_horario(db, emprendedor, s, desde, hasta, ventanas_dia))
+
+    vistos = set()
+
+    def sin_duplicados(huecos):
+        # un inicio libre que coincide con un turno existente del mismo servicio se
+        # ofrece como ese turno (llega antes por `orden`)
+        for h in huecos:
+            clave = (h.servicio_id, h.inicio)
+            if clave in vistos:
+                continue
+            vistos.add(clave)
+            yield h
+
+    return list(islice(sin_duplicados(heapq.merge(*fuentes)), n))
+
+
+# =========================================================
+# Batch (varios servicios x varios días)
+# =========================================================
+def por_dia(
+    db: Session,
+    servicio_ids: List[int],
+    desde: date,
+    hasta: date,
+) -> Tuple[Dict[int, Dict[date, list]], List[int]]:
+    """
+    Turnos con lugar de varios servicios en [desde, hasta] (fechas locales de
+    cada emprendedor), agrupados por servicio y día. Una sola query agrupada
+    para todos los servicios; el reparto por día se hace en memoria.
+    Devuelve ({servicio_id: {fecha: [(turno_id, inicio, libres)]}}, ids no encontrados).
+    """
+    ids = list(dict.fromkeys(servicio_ids))  # mismo id repetido → se calcula una vez
+    zonas = {
+        s_id: zona for s_id, zona in
+        db.query(models.Servicio.id, models.Emprendedor.zona_horaria)
+        .join(models.Emprendedor, models.Servicio.emprendedor_id == models.Emprendedor.id)
+        .filter(models.Servicio.id.in_(ids))
+    }
+    no_encontrados = [i for i in ids if i not in zonas]
+    dias = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+    resultado: Dict[int, Dict[date, list]] = {
+        s_id: {d: [] for d in dias} for s_id in ids if s_id in zonas
+    }
+    if not resultado:
+        return resultado, no_encontrados
+
+    # rango UTC que cubre los días locales de todas las zonas involucradas
+    inicio = max(
+        min(local_a_utc(desde, time.min, z) for z in set(zonas.values())),
+        ahora_utc(),
+    )
+    fin = max(local_a_utc(hasta + timedelta(days=1), time.min, z) for z in set(zonas.values()))
+
+    reservados = func.count(models.Reserva.id)
+    capacidad = func.coalesce(models.Turno.capacidad, 1)
+    filas = (
+        db.query(models.Turno.id, models.Turno.servicio_id, models.Turno.fecha_hora_inicio,
+                 (capacidad - reservados).label("libres"))
+        .outerjoin(models.Reserva, models.Reserva.turno_id == models.Turno.id)
+        .filter(
+            models.Turno.servicio_id.in_(list(resultado)),
+            models.Turno.fecha_hora_inicio >= inicio,
+            models.Turno.fecha_hora_inicio < fin,
+        )
+        .group_by(models.Turno.id)
+        .having(reservados < capacidad)
+        .order_by(models.Turno.fecha_hora_inicio, models.Turno.id)
+    )
+    for turno_id, s_id, t_inicio, libres in filas:
+        dia = resultado[s_id].get(a_local(t_inicio, zonas[s_id]).date())
+        if dia is not None:  # cae fuera del rango local de su propio emprendedor
+            dia.append((turno_id, t_inicio, libres))
+    return resultado, no_encontrados
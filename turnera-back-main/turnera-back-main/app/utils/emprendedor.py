@@ -1,10 +1,18 @@
 # app/utils/emprendedor.py
 import random
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from app import models
+from app.crud import consultas
+from app.limite_tasa import olvidar_codigo_invalido
 
 ALPHABET = "ABCDEFGHJKMNPQRSTUVWXYZ23456789"  # sin O, I, L, 0, 1 para evitar confusiones
+MAX_INTENTOS_CODIGO = 5  # reintentos del INSERT si justo choca el codigo_cliente
 
 def generate_unique_cliente_code(db: Session, length: int = 6) -> str:
     """
@@ -18,63 +26,61 @@ def generate_unique_cliente_code(db: Session, length: int = 6) -> str:
             .first()
         )
         if not exists:
+            olvidar_codigo_invalido(code)  # pudo haberse consultado antes de existir
             return code
     raise RuntimeError("No se pudo generar un código único. Intenta de nuevo.")
 
+def obtener_emprendedor(db: Session, usuario_id: int) -> Optional[models.Emprendedor]:
+    """Sólo lectura (para GETs): un SELECT por el índice único de usuario_id."""
+    return consultas.emprendedor_de_usuario(db, usuario_id)
+
 def ensure_emprendedor_for_user(db: Session, usuario_id: int) -> models.Emprendedor:
     """
     Devuelve el Emprendedor del usuario. Si no existe, lo crea con datos válidos.
-    Si no tiene codigo_cliente, se genera uno.
-    Soporta ambos esquemas de Emprendedor.
+    Si no tiene codigo_cliente, se genera uno. Puede hacer commit: usar sólo
+    en paths de escritura (los GET usan obtener_emprendedor).
     """
-    # 1) Si ya existe, devolvemos
-    e = (
-        db.query(models.Emprendedor)
-        .filter(models.Emprendedor.usuario_id == usuario_id)
-        .first()
-    )
-    if e:
-        # Aseguramos que tenga código (sin reemplazar uno existente)
-        if not getattr(e, "codigo_cliente", None):
-            e.codigo_cliente = generate_unique_cliente_code(db)
-            db.commit()
-            db.refresh(e)
-        return e
-
-    # 2) Tomamos datos del usuario para defaults legibles
-    u = None
-    try:
-        u = db.get(models.Usuario, usuario_id)  # SQLAlchemy 1.4+
-    except Exception:
-        u = db.query(models.Usuario).filter(models.Usuario.id == usuario_id).first()
-
-    username_o_email = (u.username if u and u.username else None) or (u.email if u else None)
-
-    # Fallbacks legibles
-    negocio_defecto = username_o_email or f"Negocio {usuario_id}"
-    nombre_defecto = username_o_email or f"Usuario {usuario_id}"
-
-    # 3) Armamos kwargs según columnas disponibles en el modelo actual
-    kwargs = {"usuario_id": usuario_id}
+    e = obtener_emprendedor(db, usuario_id)
+    if e is None:
+        e = _crear_emprendedor(db, usuario_id)
 
-    if hasattr(models.Emprendedor, "negocio"):
-        kwargs["negocio"] = negocio_defecto
-
-    if hasattr(models.Emprendedor, "descripcion"):
-        kwargs["descripcion"] = None
+    # Aseguramos que tenga código (sin reemplazar uno existente)
+    if not e.codigo_cliente:
+        e.codigo_cliente = generate_unique_cliente_code(db)
+        db.commit()
+    return e
 
-    if hasattr(models.Emprendedor, "codigo_cliente"):
-        kwargs["codigo_cliente"] = generate_unique_cliente_code(db)
+def _crear_emprendedor(db: Session, usuario_id: int) -> models.Emprendedor:
+    """
+    INSERT ... ON CONFLICT(usuario_id) DO NOTHING: si dos requests lo crean a
+    la vez, uno inserta y el otro no hace nada; ambos leen después la misma fila.
+    """
+    u = db.get(models.Usuario, usuario_id)
+    if u is None:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    negocio_defecto = u.username or u.email or f"Negocio {usuario_id}"
 
-    # Compatibilidad con esquema antiguo
-    if hasattr(models.Emprendedor, "nombre"):
-        kwargs["nombre"] = nombre_defecto
-    if hasattr(models.Emprendedor, "apellido"):
-        kwargs["apellido"] = ""
+    for _ in range(MAX_INTENTOS_CODIGO):
+        stmt = (
+            sqlite_insert(models.Emprendedor)
+            .values(
+                usuario_id=usuario_id,
+                negocio=negocio_defecto,
+                codigo_cliente=generate_unique_cliente_code(db),
+            )
+            .on_conflict_do_nothing(index_elements=[models.Emprendedor.usuario_id])
+            .returning(models.Emprendedor.id)
+        )
+        try:
+            nuevo_id = db.execute(stmt).scalar()  # None → ya existía (lo creó otro request)
+            db.commit()
+            break
+        except IntegrityError:
+            # otro emprendedor tomó el mismo codigo_cliente entre el SELECT y el INSERT
+            db.rollback()
+    else:
+        raise RuntimeError("No se pudo generar un código único. Intenta de nuevo.")
 
-    # 4) Creamos y devolvemos
-    e = models.Emprendedor(**kwargs)
-    db.add(e)
-    db.commit()
-    db.refresh(e)
-    return e
+    if nuevo_id is not None:
+        return db.get(models.Emprendedor, nuevo_id)
+    return obtener_emprendedor(db, usuario_id)
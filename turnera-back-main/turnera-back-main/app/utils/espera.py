@@ -0,0 +1,76 @@
+# app/utils/espera.py
+from typing import List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.crud import consultas
+from app.notificaciones import get_notificador
+from app.utils import ocupacion
+
+
+def posicion(db: Session, espera: models.EsperaTurno) -> int:
+    """1 = primero en la fila del turno."""
+    E = models.EsperaTurno
+    adelante = (
+        db.query(E.id)
+        .filter(
+            E.turno_id == espera.turno_id,
+            (E.creada < espera.creada) | ((E.creada == espera.creada) & (E.id < espera.id)),
+        )
+        .count()
+    )
+    return adelante + 1
+
+
+def promover(db: Session, turno: models.Turno) -> List[Tuple[int, int]]:
+    """
+    Se liberó lugar en `turno`: pasa a reserva a los primeros de la lista de
+    espera hasta llenarlo. Corre dentro de la transacción que liberó el lugar
+    (no hace commit). Devuelve [(usuario_id, reserva_id)] para notificar.
+    """
+    E = models.EsperaTurno
+    promovidos = []
+    ocupadas = consultas.reservas_en_turno(db, turno.id)
+    if ocupadas >= turno.capacidad:
+        return promovidos
+    # la fila se carga una vez y se recorre acá: con autoflush=False, volver a
+    # pedir "el primero" después de un delete sin flush devuelve la misma fila
+    fila = db.query(E).filter(E.turno_id == turno.id).order_by(E.creada, E.id).all()
+    ya_reservaron = {
+        u for (u,) in db.query(models.Reserva.usuario_id).filter(models.Reserva.turno_id == turno.id)
+    }
+    for espera in fila:
+        if ocupadas >= turno.capacidad:
+            break
+        db.delete(espera)
+        if espera.usuario_id in ya_reservaron:
+            continue  # reservó por su cuenta: sólo sale de la fila
+        reserva = models.Reserva(turno_id=turno.id, usuario_id=espera.usuario_id)
+        db.add(reserva)
+        ocupacion.reserva_creada(db, turno, turno.servicio.emprendedor)
+        db.flush()
+        promovidos.append((espera.usuario_id, reserva.id))
+        ocupadas += 1
+    db.flush()
+    return promovidos
+
+
+def salir_de_la_fila(db: Session, turno_id: int, usuario_id: int) -> None:
+    """El usuario reservó el turno: deja de esperar (dentro de la misma transacción)."""
+    db.query(models.EsperaTurno).filter(
+        models.EsperaTurno.turno_id == turno_id,
+        models.EsperaTurno.usuario_id == usuario_id,
+    ).delete(synchronize_session=False)
+
+
+def notificar_promociones(turno: models.Turno, promovidos: List[Tuple[int, int]]) -> None:
+    """Llamar después del commit."""
+    sink = get_notificador()
+    for usuario_id, reserva_id in promovidos:
+        sink.enviar("espera_promovida", usuario_id, {
+            "reserva_id": reserva_id,
+            "turno_id": turno.id,
+            "servicio_id": turno.servicio_id,
+            "fecha_hora_inicio": turno.fecha_hora_inicio.isoformat() + "Z",
+        })
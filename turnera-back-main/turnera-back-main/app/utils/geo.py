@@ -0,0 +1,118 @@
+# app/utils/geo.py
+import csv
+import math
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Geohash (base32) de lat/lon: celdas con prefijo común están cerca, así que
+# "cerca de" se resuelve con rangos sobre un índice de texto (geohash >= p AND
+# geohash < p + "~") y recién después se calcula la distancia exacta.
+GEOHASH_PRECISION = 9  # ~5 m; lo que se guarda en la columna
+GEOCODING_ARCHIVO = os.getenv("GEOCODING_ARCHIVO", "geocoding.csv")  # direccion,lat,lon
+RADIO_TIERRA_KM = 6371.0088
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_r, lon_r = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, valor, par = [], 0, 0, True  # par → bit de longitud
+    while len(chars) < precision:
+        rango, x = (lon_r, lon) if par else (lat_r, lat)
+        medio = (rango[0] + rango[1]) / 2
+        if x >= medio:
+            valor = (valor << 1) | 1
+            rango[0] = medio
+        else:
+            valor <<= 1
+            rango[1] = medio
+        par = not par
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[valor])
+            bits, valor = 0, 0
+    return "".join(chars)
+
+
+def _tamanio_celda(precision: int) -> Tuple[float, float]:
+    """(alto, ancho) en grados de una celda de `precision` caracteres."""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def celdas_para_radio(lat: float, lon: float, radio_km: float) -> List[str]:
+    """
+    Prefijos geohash que cubren el círculo: se usa la precisión más fina cuyas
+    celdas no sean más chicas que el radio (a lo sumo 3x3 celdas) y se recorre
+    el bounding box.
+    """
+    dlat = math.degrees(radio_km / RADIO_TIERRA_KM)
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlon = min(180.0, dlat / cos_lat)
+
+    precision = 1
+    for p in range(GEOHASH_PRECISION, 0, -1):
+        alto, ancho = _tamanio_celda(p)
+        if alto >= dlat and ancho >= dlon:
+            precision = p
+            break
+    alto, ancho = _tamanio_celda(precision)
+
+    celdas = set()
+    lat_min, lat_max = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    y = lat_min
+    while True:
+        x = lon - dlon
+        while True:
+            lon_n = (x + 180.0) % 360.0 - 180.0  # cruza el antimeridiano
+            celdas.add(geohash(min(y, 90.0 - 1e-9), lon_n, precision))
+            if x >= lon + dlon:
+                break
+            x = min(x + ancho, lon + dlon)
+        if y >= lat_max:
+            break
+        y = min(y + alto, lat_max)
+    return sorted(celdas)
+
+
+# =========================================================
+# Geocodificación offline
+# =========================================================
+def normalizar_direccion(direccion: str) -> str:
+    sin_acentos = unicodedata.normalize("NFKD", direccion).encode("ascii", "ignore").decode()
+    return re.sub(r"[\s,]+", " ", sin_acentos.lower()).strip()
+
+
+@lru_cache(maxsize=4)
+def _cargar(archivo: str) -> Dict[str, Tuple[float, float]]:
+    if not os.path.exists(archivo):
+        return {}
+    tabla = {}
+    with open(archivo, newline="", encoding="utf-8") as f:
+        for fila in csv.DictReader(f):
+            try:
+                tabla[normalizar_direccion(fila["direccion"])] = (float(fila["lat"]), float(fila["lon"]))
+            except (KeyError, TypeError, ValueError):
+                continue  # fila incompleta: se ignora
+    return tabla
+
+
+def geocodificar(direccion: Optional[str], archivo: str = GEOCODING_ARCHIVO) -> Optional[Tuple[float, float]]:
+    """(lat, lon) de la dirección según el archivo local, o None si no figura."""
+    if not direccion:
+        return None
+    return _cargar(archivo).get(normalizar_direccion(direccion))
+
+
+def coordenadas_validas(lat: Optional[float], lon: Optional[float]) -> bool:
+    return lat is not None and lon is not None and -90 <= lat <= 90 and -180 <= lon <= 180
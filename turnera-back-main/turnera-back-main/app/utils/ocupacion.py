@@ -0,0 +1,134 @@
+# app/utils/ocupacion.py
+from collections import defaultdict
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils.tiempo import a_local
+
+# Mantiene ocupacion_diaria al día desde los write paths de turnos/reservas.
+# Cada ajuste es un único UPSERT con incrementos relativos (col = col + n),
+# así dos requests concurrentes no se pisan. Llamar ANTES del commit, para
+# que el resumen quede en la misma transacción que el cambio.
+
+
+def fecha_local(turno: models.Turno, emprendedor: models.Emprendedor) -> date:
+    return a_local(turno.fecha_hora_inicio, emprendedor.zona_horaria).date()
+
+
+def _ajustar(
+    db: Session,
+    emprendedor_id: int,
+    servicio_id: int,
+    fecha: date,
+    turnos: int = 0,
+    capacidad: int = 0,
+    reservados: int = 0,
+):
+    t = models.OcupacionDiaria.__table__
+    stmt = insert(t).values(
+        emprendedor_id=emprendedor_id,
+        servicio_id=servicio_id,
+        fecha=fecha,
+        turnos=turnos,
+        capacidad=capacidad,
+        reservados=reservados,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[t.c.servicio_id, t.c.fecha],
+        set_={
+            "turnos": t.c.turnos + turnos,
+            "capacidad": t.c.capacidad + capacidad,
+            "reservados": t.c.reservados + reservados,
+        },
+    )
+    db.execute(stmt)
+
+
+def turno_creado(db: Session, turno: models.Turno, emprendedor: models.Emprendedor):
+    _ajustar(db, emprendedor.id, turno.servicio_id, fecha_local(turno, emprendedor),
+             turnos=1, capacidad=turno.capacidad or 1)
+
+
+def turno_eliminado(db: Session, turno: models.Turno, emprendedor: models.Emprendedor, reservas: int):
+    _ajustar(db, emprendedor.id, turno.servicio_id, fecha_local(turno, emprendedor),
+             turnos=-1, capacidad=-(turno.capacidad or 1), reservados=-reservas)
+
+
+def turno_modificado(
+    db: Session,
+    turno: models.Turno,
+    emprendedor: models.Emprendedor,
+    fecha_anterior: date,
+    capacidad_anterior: int,
+    reservas: int,
+):
+    """Saca el turno del día/capacidad anteriores y lo suma con los valores nuevos."""
+    _ajustar(db, emprendedor.id, turno.servicio_id, fecha_anterior,
+             turnos=-1, capacidad=-(capacidad_anterior or 1), reservados=-reservas)
+    _ajustar(db, emprendedor.id, turno.servicio_id, fecha_local(turno, emprendedor),
+             turnos=1, capacidad=turno.capacidad or 1, reservados=reservas)
+
+
+def reserva_creada(db: Session, turno: models.Turno, emprendedor: models.Emprendedor):
+    _ajustar(db, emprendedor.id, turno.servicio_id, fecha_local(turno, emprendedor), reservados=1)
+
+
+def reserva_eliminada(db: Session, turno: models.Turno, emprendedor: models.Emprendedor):
+    _ajustar(db, emprendedor.id, turno.servicio_id, fecha_local(turno, emprendedor), reservados=-1)
+
+
+def _turnos_con_reservas(db: Session, T, R, emprendedor_id: Optional[int]):
+    """(turno, emprendedor, cantidad de reservas) para la tabla de turnos T y de reservas R."""
+    conteo = (
+        db.query(R.turno_id.label("turno_id"), func.count(R.id).label("n"))
+        .group_by(R.turno_id)
+        .subquery()
+    )
+    q = (
+        db.query(T, models.Emprendedor, func.coalesce(conteo.c.n, 0))
+        .join(models.Servicio, T.servicio_id == models.Servicio.id)
+        .join(models.Emprendedor, models.Servicio.emprendedor_id == models.Emprendedor.id)
+        .outerjoin(conteo, conteo.c.turno_id == T.id)
+    )
+    if emprendedor_id is not None:
+        q = q.filter(models.Emprendedor.id == emprendedor_id)
+    return q.yield_per(1000)
+
+
+def recalcular(db: Session, emprendedor_id: Optional[int] = None) -> int:
+    """
+    Backfill: reconstruye ocupacion_diaria desde turnos/reservas (activos e historial).
+    Si se pasa emprendedor_id sólo recalcula ese emprendedor. Devuelve filas escritas.
+    """
+    acumulado = defaultdict(lambda: [0, 0, 0])
+    for T, R in (
+        (models.Turno, models.Reserva),
+        (models.TurnoHistorial, models.ReservaHistorial),
+    ):
+        for turno, emprendedor, reservas in _turnos_con_reservas(db, T, R, emprendedor_id):
+            fila = acumulado[(emprendedor.id, turno.servicio_id, fecha_local(turno, emprendedor))]
+            fila[0] += 1
+            fila[1] += turno.capacidad or 1
+            fila[2] += reservas
+
+    borrar = db.query(models.OcupacionDiaria)
+    if emprendedor_id is not None:
+        borrar = borrar.filter(models.OcupacionDiaria.emprendedor_id == emprendedor_id)
+    borrar.delete(synchronize_session=False)
+    db.bulk_insert_mappings(models.OcupacionDiaria, [
+        {
+            "emprendedor_id": e_id,
+            "servicio_id": s_id,
+            "fecha": fecha,
+            "turnos": turnos,
+            "capacidad": capacidad,
+            "reservados": reservados,
+        }
+        for (e_id, s_id, fecha), (turnos, capacidad, reservados) in acumulado.items()
+    ])
+    return len(acumulado)
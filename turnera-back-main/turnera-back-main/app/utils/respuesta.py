@@ -0,0 +1,32 @@
+# app/utils/respuesta.py
+import os
+from functools import lru_cache
+from typing import Annotated, Iterable, List, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.engine import Row
+from typing_extensions import TypedDict
+
+# Listados grandes: devolver ORM/Pydantic hace que FastAPI valide cada objeto
+# contra response_model (from_attributes) y después lo serialice. Acá cada fila
+# pasa como dict a un TypeAdapter compilado una vez por schema (un TypedDict con
+# los mismos campos), que la serializa directo a bytes JSON sin validar ni
+# construir modelos. Los serializadores de campo (FechaUTC) se aplican igual.
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))  # respuestas más chicas van sin comprimir
+
+
+@lru_cache(maxsize=None)
+def _adaptador(modelo: Type[BaseModel]) -> TypeAdapter:
+    campos = {
+        # model_fields separa Annotated[...] en annotation + metadata: se vuelve a armar
+        nombre: Annotated[(f.annotation, *f.metadata)] if f.metadata else f.annotation
+        for nombre, f in modelo.model_fields.items()
+    }
+    return TypeAdapter(List[TypedDict(modelo.__name__, campos)])
+
+
+def lista_json(modelo: Type[BaseModel], filas: Iterable[Row]) -> Response:
+    """`filas`: Rows de un SELECT cuyas columnas tienen los nombres de los campos de `modelo`."""
+    cuerpo = _adaptador(modelo).dump_json([f._asdict() for f in filas])
+    return Response(cuerpo, media_type="application/json")
@@ -0,0 +1,89 @@
+# app/utils/tiempo.py
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from fastapi import HTTPException
+
+# Todas las fechas se guardan en la DB como UTC naive.
+# La zona del emprendedor sólo se usa para interpretar lo que llega del front
+# (fechas sin offset) y para pasar sus horarios de atención ("Lunes 09:00") a UTC.
+ZONA_HORARIA_DEFECTO = "America/Argentina/Buenos_Aires"
+
+DIAS_SEMANA = {
+    "Lunes": 0, "Martes": 1, "Miércoles": 2, "Jueves": 3,
+    "Viernes": 4, "Sábado": 5, "Domingo": 6,
+}
+
+
+@lru_cache(maxsize=64)
+def get_zona(nombre: Optional[str]) -> ZoneInfo:
+    """
+    Devuelve la ZoneInfo para `nombre` (None → zona por defecto).
+    Lanza ValueError si la zona no existe.
+    """
+    try:
+        return ZoneInfo(nombre or ZONA_HORARIA_DEFECTO)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Zona horaria inválida: {nombre}")
+
+
+def validar_zona(nombre: str) -> str:
+    try:
+        get_zona(nombre)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Zona horaria inválida")
+    return nombre
+
+
+def ahora_utc() -> datetime:
+    """Reemplazo de datetime.utcnow() (deprecado): UTC naive."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def a_utc_naive(dt: datetime, zona: Optional[str] = None) -> datetime:
+    """
+    Lleva cualquier datetime a UTC naive.
+    - aware: se convierte a UTC.
+    - naive: se interpreta como hora local de `zona` (la del emprendedor).
+    """
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=get_zona(zona))
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def a_local(dt_utc: datetime, zona: Optional[str] = None) -> datetime:
+    """UTC naive (como viene de la DB) → aware en la zona indicada."""
+    return dt_utc.replace(tzinfo=timezone.utc).astimezone(get_zona(zona))
+
+
+def inicio_de_semana(d: date) -> date:
+    """Lunes de la semana de `d`."""
+    return d - timedelta(days=d.weekday())
+
+
+def local_a_utc(d: date, t: time, zona: Optional[str] = None) -> datetime:
+    """
+    Fecha + hora de pared en `zona` → UTC naive.
+    Horas inexistentes/repetidas por cambio de horario se resuelven con fold=0
+    (la primera ocurrencia), igual que zoneinfo.
+    """
+    local = datetime.combine(d, t).replace(tzinfo=get_zona(zona))
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def ventana_utc(
+    dia_semana: str, hora_inicio: time, hora_fin: time, semana: date, zona: Optional[str] = None
+) -> Optional[Tuple[datetime, datetime]]:
+    """
+    Límites UTC de un horario ("Lunes 09:00-18:00") para la semana que empieza en `semana`.
+    Si hora_fin <= hora_inicio el bloque cruza la medianoche.
+    Devuelve None si el día no se reconoce.
+    """
+    offset = DIAS_SEMANA.get(dia_semana)
+    if offset is None:
+        return None
+    dia = semana + timedelta(days=offset)
+    dia_fin = dia + timedelta(days=1) if hora_fin <= hora_inicio else dia
+    return local_a_utc(dia, hora_inicio, zona), local_a_utc(dia_fin, hora_fin, zona)
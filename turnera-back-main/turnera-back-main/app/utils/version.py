@@ -0,0 +1,34 @@
+# app/utils/version.py
+from typing import Optional
+
+from fastapi import HTTPException, Response
+
+# Concurrencia optimista: Turno, Emprendedor y Horario tienen una columna
+# `version` (version_id_col de SQLAlchemy) que el UPDATE incrementa y compara
+# en el WHERE. Hacia afuera se expone como ETag; un PUT con If-Match viejo
+# (o que pierde la carrera contra otro UPDATE → StaleDataError) devuelve 412.
+CONFLICTO = "El recurso fue modificado por otra persona; recargalo y volvé a intentar"
+
+
+def etag(obj) -> str:
+    return f'"{obj.version}"'
+
+
+def poner_etag(response: Response, obj) -> None:
+    response.headers["ETag"] = etag(obj)
+
+
+def verificar_if_match(if_match: Optional[str], obj) -> None:
+    """Sin If-Match no se valida (compatibilidad con el front actual)."""
+    if if_match is None:
+        return
+    candidatos = [c.strip() for c in if_match.split(",")]
+    if "*" in candidatos:
+        return
+    # W/"3" y "3" valen lo mismo: la versión es la misma representación
+    if etag(obj) not in [c[2:] if c.startswith("W/") else c for c in candidatos]:
+        raise HTTPException(status_code=412, detail=CONFLICTO)
+
+
+def conflicto() -> HTTPException:
+    return HTTPException(status_code=412, detail=CONFLICTO)
@@ -0,0 +1,65 @@
+# benchmarks/bench_archivo.py
+# Latencia de las consultas "calientes" (turnos futuros, reserva activa con un
+# emprendedor, historial del usuario) sin historia, con 200k turnos viejos en
+# las tablas activas y después de archivarlos a *_historial.
+import comun
+from comun import INICIO, medir, sembrar_emprendedor, sembrar_turnos, sembrar_usuarios
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app import database, models
+from app.main import app  # noqa: F401  (crea tablas e índices)
+from app.utils import archivo
+from app.utils.tiempo import ahora_utc
+
+HISTORIA = 200_000
+USUARIOS = 1000
+
+with database.engine.begin() as conn:
+    sembrar_usuarios(conn, USUARIOS)
+    sembrar_emprendedor(conn, 1, 1)
+    sembrar_turnos(conn, 1, 2000, INICIO)
+    conn.execute(text("INSERT INTO reservas (turno_id, usuario_id) VALUES (1, 2)"))
+
+db = database.SessionLocal()
+T, R, S = models.Turno, models.Reserva, models.Servicio
+
+
+def turnos_futuros():
+    db.query(T.id, T.fecha_hora_inicio).filter(
+        T.servicio_id == 1, T.fecha_hora_inicio >= ahora_utc()
+    ).order_by(T.fecha_hora_inicio).limit(50).all()
+
+
+def reserva_activa():
+    db.query(R.id).join(T, R.turno_id == T.id).join(S, T.servicio_id == S.id).filter(
+        R.usuario_id == 2, S.emprendedor_id == 1, T.fecha_hora_inicio >= ahora_utc()
+    ).first()
+
+
+def historial_usuario():
+    db.execute(archivo.reservas_de_usuario(2)).all()
+
+
+def fila(etiqueta):
+    print(f"{etiqueta:<34} {medir(turnos_futuros, 500):8.3f} {medir(reserva_activa, 500):8.3f} "
+          f"{medir(historial_usuario, 50):8.3f}")
+
+
+print(f"{'ms por consulta':<34} {'futuros':>8} {'activa':>8} {'historial':>8}")
+fila("sin historia")
+
+with database.engine.begin() as conn:
+    sembrar_turnos(conn, 1, HISTORIA, datetime(2015, 1, 1), paso=timedelta(minutes=20))
+    conn.execute(text(
+        f"INSERT INTO reservas (turno_id, usuario_id) "
+        f"SELECT id, (id % {USUARIOS - 1}) + 2 FROM turnos WHERE fecha_hora_inicio < '2025'"
+    ))
+fila(f"{HISTORIA // 1000}k turnos viejos en `turnos`")
+
+t0 = comun.time.perf_counter()
+movidos = archivo.archivar_turnos(db, ahora_utc() - timedelta(days=30))
+print(f"archivar {movidos} turnos: {comun.time.perf_counter() - t0:.1f} s")
+fila(f"{HISTORIA // 1000}k archivados en *_historial")
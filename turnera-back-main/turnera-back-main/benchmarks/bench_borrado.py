@@ -0,0 +1,67 @@
+# benchmarks/bench_borrado.py
+# Borrar un emprendedor con 100k turnos (un tercio con reserva): DELETE con
+# ON DELETE CASCADE en la DB (DELETE /emprendedores/{id}) vs lo que hacía el
+# cascade del ORM: cargar servicios → turnos → reservas y borrarlos de a uno.
+# El camino del ORM tarda unos minutos.
+import comun
+from comun import INICIO, sembrar_emprendedor, sembrar_turnos, sembrar_usuarios
+
+import time
+import tracemalloc
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app import database, models
+from app.main import app
+
+TURNOS = 100_000
+
+with database.engine.begin() as conn:
+    sembrar_usuarios(conn, 1000)
+    for e_id in (1, 2):
+        sembrar_emprendedor(conn, e_id, e_id)
+        sembrar_turnos(conn, e_id, TURNOS, INICIO)  # servicio e_id
+    conn.execute(text(
+        "INSERT INTO reservas (turno_id, usuario_id) SELECT id, (id % 997) + 3 FROM turnos WHERE id % 3 = 0"
+    ))
+    filas = conn.execute(text("SELECT count(*) FROM turnos")).scalar(), conn.execute(text("SELECT count(*) FROM reservas")).scalar()
+print(f"{filas[0]} turnos, {filas[1]} reservas (dos emprendedores iguales)")
+
+
+def medir(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    segundos = time.perf_counter() - t0
+    pico = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return segundos, pico
+
+
+def orm_fila_por_fila():
+    db = database.SessionLocal()
+    e = db.get(models.Emprendedor, 2)
+    for servicio in e.servicios:
+        for turno in servicio.turnos:
+            for reserva in turno.reservas:
+                db.delete(reserva)
+            db.delete(turno)
+        db.delete(servicio)
+    db.delete(e)
+    db.commit()
+    db.close()
+
+
+def cascade_en_db():
+    r = TestClient(app).delete("/emprendedores/1")
+    assert r.status_code == 200, r.text
+
+
+print(f"{'':<32} {'segundos':>9} {'pico MiB':>9}")
+for nombre, fn in (("ORM, fila por fila", orm_fila_por_fila), ("DELETE + ON DELETE CASCADE", cascade_en_db)):
+    segundos, pico = medir(fn)
+    print(f"{nombre:<32} {segundos:9.2f} {pico:9.1f}")
+
+with database.engine.connect() as conn:
+    assert conn.execute(text("SELECT count(*) FROM turnos")).scalar() == 0
@@ -0,0 +1,55 @@
+# benchmarks/bench_busqueda.py
+# /buscar con FTS5 (BM25) vs el fallback LIKE, con 100k emprendedores y 100k
+# servicios. El índice FTS lo llenan los triggers al sembrar.
+import comun
+from comun import medir
+
+import random
+
+from sqlalchemy import text
+
+from app import database
+from app.main import app  # noqa: F401  (tabla FTS + triggers)
+from app.utils import busqueda
+
+EMPRENDEDORES = 100_000
+RUBROS = ["Peluquería", "Estética", "Uñas", "Barbería", "Masajes", "Tatuajes", "Odontología", "Psicología"]
+PALABRAS = ("corte color alisado manicura pedicura depilación masaje descontracturante barba "
+            "limpieza facial tatuaje piercing consulta terapia ortodoncia blanqueo turno "
+            "rápido premium clásico unisex niños spa relax").split()
+
+random.seed(1)
+t0 = comun.time.perf_counter()
+with database.engine.begin() as conn:
+    comun.sembrar_usuarios(conn, EMPRENDEDORES)
+    conn.execute(text(
+        "INSERT INTO emprendedores (id, usuario_id, negocio, descripcion, rubro) VALUES (:id, :id, :n, :d, :r)"
+    ), [
+        {"id": i, "n": f"{random.choice(RUBROS)} {random.choice(PALABRAS).title()} {i}",
+         "d": " ".join(random.sample(PALABRAS, 6)), "r": random.choice(RUBROS)}
+        for i in range(1, EMPRENDEDORES + 1)
+    ])
+    conn.execute(text(
+        "INSERT INTO servicios (emprendedor_id, nombre, descripcion, duracion, precio) VALUES (:e, :n, :d, 30, 0)"
+    ), [
+        {"e": i, "n": " ".join(random.sample(PALABRAS, 2)).capitalize(), "d": " ".join(random.sample(PALABRAS, 5))}
+        for i in range(1, EMPRENDEDORES + 1)
+    ])
+print(f"sembrado {EMPRENDEDORES} emprendedores + servicios: {comun.time.perf_counter() - t0:.1f} s")
+
+db = database.SessionLocal()
+CONSULTAS = [
+    ("peluqueria", None),          # sin acento: LIKE no encuentra "Peluquería"
+    ("corte color", None),
+    ("masaje relax", "Masajes"),
+    ("ortodoncia blanqueo", None),
+    ("inexistente", None),
+]
+print(f"{'consulta':<28} {'FTS ms':>8} {'LIKE ms':>8} {'FTS res':>8} {'LIKE res':>8}")
+for q, rubro in CONSULTAS:
+    fts = medir(lambda: busqueda.buscar(db, q, rubro, 20, 0), 20)
+    like = medir(lambda: busqueda._buscar_like(db, q, rubro, 20, 0), 3)
+    n_fts = len(busqueda.buscar(db, q, rubro, 20, 0))
+    n_like = len(busqueda._buscar_like(db, q, rubro, 20, 0))
+    etiqueta = q + (f" [{rubro}]" if rubro else "")
+    print(f"{etiqueta:<28} {fts:8.2f} {like:8.2f} {n_fts:8d} {n_like:8d}")
@@ -0,0 +1,44 @@
+# benchmarks/bench_consultas.py
+# µs por llamada de las consultas del hot path: db.query(...) como estaban
+# antes (el statement se arma y se busca en el cache en cada llamada; count()
+# envuelve en subquery) vs app.crud.consultas con lambda_stmt.
+import comun
+from comun import INICIO, medir, sembrar_emprendedor, sembrar_turnos, sembrar_usuarios
+
+from sqlalchemy import text
+
+from app import database, models
+from app.crud import consultas
+from app.main import app  # noqa: F401  (crea las tablas)
+
+N = 5000
+
+with database.engine.begin() as conn:
+    sembrar_usuarios(conn, 100)
+    sembrar_emprendedor(conn, 1, 1)
+    sembrar_turnos(conn, 1, 1000, INICIO)
+    conn.execute(text("INSERT INTO reservas (turno_id, usuario_id) SELECT 500, id FROM usuarios WHERE id > 1"))
+
+db = database.SessionLocal()
+M = models
+CASOS = [
+    ("turno_por_id",
+     lambda: db.query(M.Turno).filter(M.Turno.id == 500).first(),
+     lambda: consultas.turno_por_id(db, 500)),
+    ("reservas_en_turno",
+     lambda: db.query(M.Reserva).filter(M.Reserva.turno_id == 500).count(),
+     lambda: consultas.reservas_en_turno(db, 500)),
+    ("emprendedor_de_usuario",
+     lambda: db.query(M.Emprendedor).filter(M.Emprendedor.usuario_id == 1).first(),
+     lambda: consultas.emprendedor_de_usuario(db, 1)),
+    ("usuario_por_id",
+     lambda: db.query(M.Usuario).filter(M.Usuario.id == 1).first(),
+     lambda: consultas.usuario_por_id(db, 1)),
+]
+
+assert consultas.reservas_en_turno(db, 500) == 99
+print(f"{'consulta':<24} {'db.query µs':>12} {'lambda_stmt µs':>15}")
+for nombre, antes, ahora in CASOS:
+    assert antes() == ahora()
+    print(f"{nombre:<24} {medir(antes, N) * 1000:12.0f} {medir(ahora, N) * 1000:15.0f}")
+db.close()
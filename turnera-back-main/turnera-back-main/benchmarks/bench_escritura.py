@@ -0,0 +1,104 @@
+# benchmarks/bench_escritura.py
+# Throughput de escrituras chicas concurrentes (una reserva por turno, como
+# crear_reserva): commit por request vs ESCRITURA_AGRUPADA (group commit).
+# Ojo: si el directorio temporal está en tmpfs (o el disco tiene cache de
+# escritura) el fsync es casi gratis y el group commit no tiene qué ahorrar.
+# BENCH_DIR=/ruta/en/disco usa otro directorio; BENCH_FSYNC_MS=N simula un
+# fsync de N ms por commit real de SQLite (durante el commit se tiene el lock
+# de escritura). Cuenta tanto COMMIT como el RELEASE de un SAVEPOINT abierto
+# fuera de una transacción, que en SQLite también confirma.
+import os
+
+import comun
+from comun import INICIO, sembrar_emprendedor, sembrar_turnos, sembrar_usuarios
+
+if os.getenv("BENCH_DIR"):
+    os.chdir(os.environ["BENCH_DIR"])
+
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from app import database, escritura, models
+from app.main import app  # noqa: F401
+
+HILOS = 16
+POR_HILO = 150
+FSYNC_MS = float(os.getenv("BENCH_FSYNC_MS", "0"))
+
+commits = [0]
+_savepoints = {}  # conexión DBAPI → pila: ¿el SAVEPOINT abrió la transacción?
+
+
+def _commit_real():
+    commits[0] += 1
+    if FSYNC_MS:
+        time.sleep(FSYNC_MS / 1000)
+
+
+@event.listens_for(Engine, "commit")  # todos los engines (incluido el del hilo escritor)
+def _al_commit(conn):
+    if conn.connection.dbapi_connection.in_transaction:  # si no, commit() no hace nada
+        _commit_real()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _al_ejecutar(conn, cursor, sentencia, *args):
+    dbapi = conn.connection.dbapi_connection
+    palabra = sentencia.lstrip()[:8].upper()
+    if palabra.startswith("SAVEPOIN"):
+        _savepoints.setdefault(id(dbapi), []).append(not dbapi.in_transaction)
+    elif palabra.startswith(("RELEASE", "ROLLBACK")) and _savepoints.get(id(dbapi)):
+        if _savepoints[id(dbapi)].pop() and palabra.startswith("RELEASE"):
+            _commit_real()  # RELEASE del SAVEPOINT más externo = commit
+    elif palabra.startswith("COMMIT"):
+        _commit_real()
+
+with database.engine.begin() as conn:
+    sembrar_usuarios(conn, 2)
+    sembrar_emprendedor(conn, 1, 1)
+    sembrar_turnos(conn, 1, 2 * HILOS * POR_HILO, INICIO)
+
+
+def correr(agrupada: bool, primer_turno: int):
+    """Devuelve (escrituras confirmadas por segundo, fallidas, commits de SQLite)."""
+    escritura.ESCRITURA_AGRUPADA = agrupada
+    commits[0] = 0
+    fallidas = []
+
+    def trabajador(h: int):
+        db = database.SessionLocal()
+        try:
+            for i in range(POR_HILO):
+                turno_id = primer_turno + h * POR_HILO + i
+
+                def escribir(db, turno_id=turno_id):
+                    db.add(models.Reserva(turno_id=turno_id, usuario_id=2))
+                    db.flush()
+
+                try:
+                    escritura.ejecutar(db, escribir)
+                except OperationalError:  # "database is locked" tras el busy timeout
+                    fallidas.append(turno_id)
+        finally:
+            db.close()
+
+    hilos = [threading.Thread(target=trabajador, args=(h,)) for h in range(HILOS)]
+    t0 = time.perf_counter()
+    for t in hilos:
+        t.start()
+    for t in hilos:
+        t.join()
+    return (HILOS * POR_HILO - len(fallidas)) / (time.perf_counter() - t0), len(fallidas), commits[0]
+
+
+total = HILOS * POR_HILO
+print(f"{HILOS} hilos x {POR_HILO} escrituras, fsync simulado {FSYNC_MS} ms, {os.getcwd()}")
+for nombre, agrupada, primer_turno in (("commit por request", False, 1), ("group commit", True, total + 1)):
+    por_segundo, fallidas, n_commits = correr(agrupada, primer_turno)
+    print(f"{nombre:<19}: {por_segundo:8.0f} escrituras/s, {n_commits:5d} commits, "
+          f"{fallidas} fallidas (database is locked)")
+print(f"ventana {escritura.ESCRITURA_VENTANA_MS} ms, lote máx. {escritura.ESCRITURA_MAX_LOTE}")
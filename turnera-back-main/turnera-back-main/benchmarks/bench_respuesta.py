@@ -0,0 +1,81 @@
+# benchmarks/bench_respuesta.py
+# CPU por respuesta de listados de 10k filas.
+#   antes: objetos ORM validados contra response_model (from_attributes) y
+#          serializados, que es lo que hace FastAPI con un list[Modelo]
+#   ahora: columnas del SELECT → lista_json (TypeAdapter sobre TypedDict)
+# y, de punta a punta, el endpoint real por TestClient (incluye GZip).
+import comun
+from comun import INICIO, sembrar_emprendedor, sembrar_turnos, sembrar_usuarios
+
+import time
+from typing import List
+
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from sqlalchemy import text
+
+from app import database, models, schemas
+from app.main import app
+from app.routers.emprendedores import _COLUMNAS_TURNO
+from app.utils.respuesta import lista_json
+
+FILAS = 10_000
+
+with database.engine.begin() as conn:
+    sembrar_usuarios(conn, 2)
+    sembrar_emprendedor(conn, 1, 1)
+    sembrar_turnos(conn, 1, FILAS, INICIO)
+    conn.execute(text("INSERT INTO reservas (turno_id, usuario_id) SELECT id, 2 FROM turnos"))
+
+
+def cpu_ms(fn, n: int = 5) -> float:
+    fn()
+    mejor = float("inf")
+    for _ in range(n):
+        t0 = time.process_time()
+        fn()
+        mejor = min(mejor, time.process_time() - t0)
+    return mejor * 1000
+
+
+def antes(modelo, consulta):
+    adaptador = TypeAdapter(List[modelo])
+
+    def fn():
+        db = database.SessionLocal()
+        objetos = consulta(db).all()
+        adaptador.dump_json(adaptador.validate_python(objetos, from_attributes=True))
+        db.close()
+    return fn
+
+
+def ahora(modelo, consulta):
+    def fn():
+        db = database.SessionLocal()
+        lista_json(modelo, consulta(db).all())
+        db.close()
+    return fn
+
+
+T, R = models.Turno, models.Reserva
+CASOS = [
+    ("/servicios/1/turnos", schemas.TurnoResponse,
+     lambda db: db.query(T).filter(T.servicio_id == 1),
+     lambda db: db.query(*_COLUMNAS_TURNO).filter(T.servicio_id == 1)),
+    ("/reservas/?emprendedor_id=1", schemas.ReservaResponse,
+     lambda db: db.query(R),
+     lambda db: db.query(R.id, R.turno_id, R.usuario_id)),
+]
+
+cliente = TestClient(app)
+print(f"{FILAS} filas, ms de CPU por respuesta")
+print(f"{'endpoint':<30} {'antes':>8} {'ahora':>8} {'HTTP':>8} {'HTTP gzip':>10}")
+for ruta, modelo, q_antes, q_ahora in CASOS:
+    http = cpu_ms(lambda: cliente.get(ruta, headers={"Accept-Encoding": "identity"}))
+    http_gzip = cpu_ms(lambda: cliente.get(ruta))
+    print(f"{ruta:<30} {cpu_ms(antes(modelo, q_antes)):8.1f} {cpu_ms(ahora(modelo, q_ahora)):8.1f} "
+          f"{http:8.1f} {http_gzip:10.1f}")
+
+r = cliente.get("/usuarios/2/reservas")
+print(f"/usuarios/2/reservas (UNION activas + historial): {cpu_ms(lambda: cliente.get('/usuarios/2/reservas')):.1f} ms, "
+      f"{len(r.content)} bytes sin comprimir")
@@ -0,0 +1,59 @@
+# benchmarks/comun.py
+# Base común de los benchmarks: se importa ANTES que `app`. Corre en un
+# directorio temporal (la DB es "sqlite:///./basedatos.db", relativa al cwd)
+# y siembra datos con SQL directo, que con el ORM tardaría minutos.
+#
+#   python benchmarks/bench_<algo>.py
+import os
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timedelta
+
+warnings.filterwarnings("ignore")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp(prefix="turnera-bench-"))
+
+from sqlalchemy import text  # noqa: E402
+
+INICIO = datetime(2030, 1, 7, 12, 0)  # lunes, UTC naive
+
+
+def medir(fn, n: int) -> float:
+    """Milisegundos por llamada (mejor de 3 corridas de n llamadas)."""
+    fn()  # calentar caches (statement cache, páginas de SQLite)
+    mejor = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        mejor = min(mejor, (time.perf_counter() - t0) / n)
+    return mejor * 1000
+
+
+def sembrar_usuarios(conn, cantidad: int, desde: int = 1) -> None:
+    conn.execute(text(
+        "INSERT INTO usuarios (id, email, username, password, rol) VALUES (:id, :e, :u, 'x', 'cliente')"
+    ), [{"id": i, "e": f"u{i}@b.com", "u": f"u{i}"} for i in range(desde, desde + cantidad)])
+
+
+def sembrar_emprendedor(conn, emprendedor_id: int, usuario_id: int, servicios: int = 1) -> None:
+    conn.execute(text(
+        "INSERT INTO emprendedores (id, usuario_id, negocio) VALUES (:id, :u, :n)"
+    ), {"id": emprendedor_id, "u": usuario_id, "n": f"negocio {emprendedor_id}"})
+    conn.execute(text(
+        "INSERT INTO servicios (emprendedor_id, nombre, duracion, precio) VALUES (:e, :n, 30, 0)"
+    ), [{"e": emprendedor_id, "n": f"servicio {i}"} for i in range(servicios)])
+
+
+def sembrar_turnos(conn, servicio_id: int, cantidad: int, desde: datetime, paso=timedelta(minutes=30)) -> None:
+    conn.execute(text(
+        "INSERT INTO turnos (servicio_id, fecha_hora_inicio, duracion_minutos, capacidad, precio, version, creado_por_reserva) "
+        "VALUES (:s, :f, 30, 1, 0, 1, 0)"
+    ), [{"s": servicio_id, "f": fecha_sql(desde + paso * i)} for i in range(cantidad)])
+
+
+def fecha_sql(dt: datetime) -> str:
+    """Mismo formato que guarda el tipo DateTime de SQLAlchemy en SQLite."""
+    return dt.strftime("%Y-%m-%d %H:%M:%S.%f")
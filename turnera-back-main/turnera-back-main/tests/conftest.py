@@ -0,0 +1,32 @@
+# tests/conftest.py
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# La app usa "sqlite:///./basedatos.db" (relativo al cwd) y crea tablas al
+# importar main: los tests corren en un directorio temporal con su propia DB.
+os.chdir(tempfile.mkdtemp(prefix="turnera-tests-"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def registrar(client):
+    """Crea un usuario con nombre único y devuelve (headers, usuario_id)."""
+    def _registrar(rol: str = "cliente"):
+        nombre = f"u{uuid.uuid4().hex[:10]}"
+        client.post("/usuarios/registro", json={
+            "username": nombre, "password": "x", "email": f"{nombre}@test.com", "rol": rol,
+        })
+        r = client.post("/usuarios/login", json={"username": nombre, "password": "x"}).json()
+        return {"Authorization": "Bearer " + r["token"]}, r["user_schema"]["id"]
+    return _registrar
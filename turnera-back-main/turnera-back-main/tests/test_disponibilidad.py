@@ -0,0 +1,75 @@
+# tests/test_disponibilidad.py
+from datetime import date, timedelta
+
+from sqlalchemy import event, text
+
+from app import database
+from app.utils import agenda
+
+
+def test_proximo_disponible_no_escribe(client, registrar):
+    headers, _ = registrar("emprendedor")
+    e_id = client.get("/emprendedores/mi", headers=headers).json()["id"]
+    client.post("/mis/servicios", headers=headers, json={"nombre": "corte", "duracion": 30})
+    r = client.put(f"/emprendedores/{e_id}/horarios:replace", json=[
+        {"dia_semana": "lunes", "hora_inicio": "09:00", "hora_fin": "12:00"},
+    ])
+    assert r.status_code == 204, r.text
+    url = f"/emprendedores/{e_id}/proximo-disponible?n=10"
+    precalculadas = client.get(url).json()  # semanas ya guardadas en horarios_ventanas
+    assert len(precalculadas) == 10
+
+    with database.engine.begin() as conn:  # como si el horizonte precalculado ya hubiera pasado
+        conn.execute(text("DELETE FROM horarios_ventanas WHERE emprendedor_id = :e"), {"e": e_id})
+
+    escrituras = []
+
+    def registrar_sql(conn, cursor, sentencia, *args):
+        if sentencia.lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE", "SAVEPOINT")):
+            escrituras.append(sentencia)
+
+    motores = {database.engine, database.engine_lectura}
+    for motor in motores:
+        event.listen(motor, "before_cursor_execute", registrar_sql)
+    try:
+        en_memoria = client.get(url).json()  # semanas faltantes: se calculan sin guardarlas
+    finally:
+        for motor in motores:
+            event.remove(motor, "before_cursor_execute", registrar_sql)
+
+    assert escrituras == []
+    assert en_memoria == precalculadas
+    with database.engine.connect() as conn:
+        assert conn.execute(
+            text("SELECT count(*) FROM horarios_ventanas WHERE emprendedor_id = :e"), {"e": e_id}
+        ).scalar() == 0
+
+
+def test_reservar_valida_el_horario_contra_la_db(client, registrar, monkeypatch):
+    headers, _ = registrar("emprendedor")
+    e_id = client.get("/emprendedores/mi", headers=headers).json()["id"]
+    servicio = client.post("/mis/servicios", headers=headers, json={"nombre": "corte", "duracion": 30}).json()
+    client.put(f"/emprendedores/{e_id}/horarios:replace", json=[
+        {"dia_semana": "lunes", "hora_inicio": "09:00", "hora_fin": "12:00"},
+    ])
+    hoy = date.today()
+    lunes = hoy + timedelta(days=7 - hoy.weekday())
+    assert len(client.get(f"/emprendedores/{e_id}/proximo-disponible?n=10").json()) == 10  # cache cargado
+
+    # Otro worker achica el horario: este proceso no se entera (su cache sigue igual)
+    monkeypatch.setattr(agenda, "invalidar", lambda *a, **k: None)
+    client.put(f"/emprendedores/{e_id}/horarios:replace", json=[
+        {"dia_semana": "lunes", "hora_inicio": "09:00", "hora_fin": "10:00"},
+    ])
+
+    cliente, _ = registrar()
+    r = client.post("/reservas/directo", headers=cliente, json={
+        "servicio_id": servicio["id"], "fecha_hora_inicio": f"{lunes.isoformat()}T11:00:00",
+    })
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Fuera del horario de atención"
+
+    r = client.post("/reservas/directo", headers=cliente, json={
+        "servicio_id": servicio["id"], "fecha_hora_inicio": f"{lunes.isoformat()}T09:00:00",
+    })
+    assert r.status_code == 200, r.text
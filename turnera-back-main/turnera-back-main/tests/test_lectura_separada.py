@@ -0,0 +1,112 @@
+# tests/test_lectura_separada.py
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from starlette.requests import Request
+
+from app import database, dependencies
+from app.dependencies import get_read_db
+
+
+def _servicios(client):
+    r = client.get("/servicios/")  # sin usuario: va a la sesión de lectura
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_lecturas_siguen_durante_una_escritura_larga(client, registrar):
+    headers, _ = registrar("emprendedor")
+    client.post("/mis/servicios", headers=headers, json={"nombre": "base", "duracion": 30})
+    e_id = client.get("/emprendedores/mi", headers=headers).json()["id"]
+    antes = len(_servicios(client))
+
+    tomado, soltar = threading.Event(), threading.Event()
+
+    def escritor():
+        # transacción de escritura abierta (lock de escritura de SQLite tomado)
+        with database.engine.connect() as conn:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            conn.execute(
+                text("INSERT INTO servicios (nombre, duracion, precio, emprendedor_id) VALUES ('nuevo', 30, 0, :e)"),
+                {"e": e_id},
+            )
+            tomado.set()
+            soltar.wait(5)
+            conn.exec_driver_sql("COMMIT")
+
+    hilo = threading.Thread(target=escritor)
+    hilo.start()
+    try:
+        assert tomado.wait(5)
+        inicio = time.monotonic()
+        durante = _servicios(client)
+        assert time.monotonic() - inicio < 1  # no esperó al lock de escritura
+        assert len(durante) == antes           # y no ve lo que todavía no se confirmó
+    finally:
+        soltar.set()
+        hilo.join()
+
+    assert len(_servicios(client)) == antes + 1
+
+
+def test_escritura_activa_leer_de_la_primaria_para_ese_usuario(client, registrar, monkeypatch):
+    if database.engine_lectura is database.engine:
+        pytest.skip("sin sesión de lectura separada")
+    headers, usuario_id = registrar("emprendedor")
+    otro, otro_id = registrar()
+    assert not dependencies.lee_de_primaria(usuario_id)
+
+    r = client.post("/mis/servicios", headers=headers, json={"nombre": "s", "duracion": 30})
+    assert r.status_code == 200
+    assert "set-cookie" not in r.headers  # no depende de cookies (el front es de otro origen)
+    assert dependencies.lee_de_primaria(usuario_id)
+    assert not dependencies.lee_de_primaria(otro_id)
+
+    lecturas = []
+    original = database.SessionLectura
+    monkeypatch.setattr(database, "SessionLectura", lambda: lecturas.append(1) or original())
+    assert client.get("/servicios/", headers=headers).status_code == 200
+    assert lecturas == []  # el que escribió lee de la primaria
+    assert client.get("/servicios/", headers=otro).status_code == 200
+    assert lecturas == [1]  # el resto sigue en la sesión de lectura
+
+    # una escritura rechazada no abre la ventana
+    assert client.put(f"/usuarios/{usuario_id}", headers=otro, json={"nombre": "x"}).status_code == 403
+    assert not dependencies.lee_de_primaria(otro_id)
+
+
+def test_ventana_vence(monkeypatch):
+    monkeypatch.setattr(dependencies, "LEER_PRIMARIA_SEGUNDOS", 0)
+    dependencies.marcar_escritura(987654)
+    time.sleep(0.01)
+    assert not dependencies.lee_de_primaria(987654)
+
+
+def _sesion_de_lectura(leer_primaria=None):
+    scope = {"type": "http", "headers": []}
+    if leer_primaria is not None:
+        scope["state"] = {"leer_primaria": leer_primaria}  # lo pone el middleware
+    gen = get_read_db(Request(scope))
+    db = next(gen)
+    gen.close()
+    return db
+
+
+def test_get_read_db_elige_la_sesion_segun_el_middleware():
+    assert _sesion_de_lectura().get_bind() is database.engine_lectura
+    assert _sesion_de_lectura(False).get_bind() is database.engine_lectura
+    assert _sesion_de_lectura(True).get_bind() is database.engine
+
+
+def test_sesion_de_lectura_no_escribe():
+    if database.engine_lectura is database.engine:
+        pytest.skip("sin sesión de lectura separada")
+    db = database.SessionLectura()
+    try:
+        with pytest.raises(OperationalError):
+            db.execute(text("DELETE FROM servicios"))
+    finally:
+        db.close()
@@ -0,0 +1,51 @@
+# tests/test_ocupacion.py
+from datetime import datetime
+
+from app import database
+from app.utils import archivo, ocupacion
+
+LUEGO = datetime(2040, 1, 1)  # `antes_de` que alcanza a todos los turnos del test
+
+
+def _dia_con_una_reserva(client, registrar):
+    """Emprendedor con 3 turnos el mismo día y 1 reservado: 33.33 % de ocupación."""
+    headers, _ = registrar("emprendedor")
+    servicio = client.post("/mis/servicios", headers=headers, json={"nombre": "corte", "duracion": 30}).json()
+    e_id = client.get("/emprendedores/mi", headers=headers).json()["id"]
+    turnos = [
+        client.post("/turnos/", headers=headers, json={
+            "servicio_id": servicio["id"], "fecha_hora_inicio": f"2031-03-10T{hora}:00:00",
+            "duracion_minutos": 30, "capacidad": 1, "precio": 0,
+        }).json()
+        for hora in (10, 11, 12)
+    ]
+    cliente, _ = registrar()
+    r = client.post("/reservas/", headers=cliente, json={"turno_id": turnos[0]["id"]})
+    assert r.status_code == 200, r.text
+    return headers, e_id
+
+
+def _ocupacion(client, headers, e_id):
+    r = client.get(f"/emprendedores/{e_id}/ocupacion", headers=headers)
+    assert r.status_code == 200
+    return [(o["fecha"], o["turnos"], o["capacidad"], o["reservados"], o["porcentaje"]) for o in r.json()]
+
+
+def test_purgar_y_archivar_no_cambian_la_ocupacion(client, registrar):
+    headers, e_id = _dia_con_una_reserva(client, registrar)
+    antes = _ocupacion(client, headers, e_id)
+    assert antes == [("2031-03-10", 3, 3, 1, 33.33)]
+
+    with database.SessionLocal() as db:
+        assert archivo.purgar_turnos_vacios(db, LUEGO) >= 2  # los dos turnos sin reservas
+    assert _ocupacion(client, headers, e_id) == antes
+
+    with database.SessionLocal() as db:
+        assert archivo.archivar_turnos(db, LUEGO) >= 1  # el turno reservado
+    assert _ocupacion(client, headers, e_id) == antes
+
+    # el backfill reconstruye desde turnos + historial: tiene que dar lo mismo
+    with database.SessionLocal() as db:
+        ocupacion.recalcular(db, e_id)
+        db.commit()
+    assert _ocupacion(client, headers, e_id) == antes
@@ -0,0 +1,95 @@
+# tests/test_refresh_token.py
+import threading
+import uuid
+from datetime import timedelta
+
+from fastapi import HTTPException
+
+from app import database, models
+from app.auth import _hash_refresh, rotar_refresh_token
+from app.utils.tiempo import ahora_utc
+
+
+def _login(client, nombre=None):
+    """Loguea (registrando antes si no se pasa nombre). Devuelve (usuario_id, token, refresh_token)."""
+    if nombre is None:
+        nombre = f"u{uuid.uuid4().hex[:10]}"
+        client.post("/usuarios/registro", json={
+            "username": nombre, "password": "x", "email": f"{nombre}@test.com", "rol": "cliente",
+        })
+    r = client.post("/usuarios/login", json={"username": nombre, "password": "x"}).json()
+    return r["user_schema"]["id"], r["token"], r["refresh_token"]
+
+
+def _refresh(client, refresh_token):
+    return client.post("/usuarios/token/refresh", json={"refresh_token": refresh_token})
+
+
+def test_rotacion_devuelve_un_par_nuevo(client):
+    _, _, refresh = _login(client)
+    r = _refresh(client, refresh)
+    assert r.status_code == 200
+    nuevo = r.json()
+    assert nuevo["refresh_token"] != refresh
+    assert client.get("/usuarios/perfil", headers={"Authorization": "Bearer " + nuevo["token"]}).status_code == 200
+    assert _refresh(client, nuevo["refresh_token"]).status_code == 200  # el nuevo también rota
+
+
+def test_reusar_un_token_revoca_toda_la_familia(client):
+    _, _, viejo = _login(client)
+    nuevo = _refresh(client, viejo).json()["refresh_token"]
+
+    assert _refresh(client, viejo).status_code == 401
+    # el token legítimo de la misma familia también quedó revocado
+    assert _refresh(client, nuevo).status_code == 401
+
+
+def test_dos_canjes_simultaneos_gana_uno_solo(client):
+    _, _, refresh = _login(client)
+    barrera = threading.Barrier(2)
+    resultados = []
+
+    def canjear():
+        with database.SessionLocal() as db:
+            barrera.wait()
+            try:
+                rotar_refresh_token(db, refresh)
+                resultados.append("ok")
+            except HTTPException as exc:
+                resultados.append(exc.status_code)
+
+    hilos = [threading.Thread(target=canjear) for _ in range(2)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert sorted(resultados, key=str) == [401, "ok"]
+
+
+def test_token_vencido(client):
+    _, _, refresh = _login(client)
+    with database.SessionLocal() as db:
+        db.query(models.RefreshToken).filter(
+            models.RefreshToken.token_hash == _hash_refresh(refresh)
+        ).update({"expira": ahora_utc() - timedelta(seconds=1)})
+        db.commit()
+    assert _refresh(client, refresh).status_code == 401
+
+
+def test_logout_revoca_el_refresh_token(client):
+    _, _, refresh = _login(client)
+    assert client.post("/usuarios/logout", json={"refresh_token": refresh}).status_code == 200
+    assert _refresh(client, refresh).status_code == 401
+
+
+def test_cambiar_contrasena_revoca_todas_las_sesiones(client):
+    usuario_id, token, refresh = _login(client)
+    nombre = client.get("/usuarios/perfil", headers={"Authorization": "Bearer " + token}).json()["username"]
+    _, _, otro = _login(client, nombre)  # otra sesión (otra familia), ya rotada una vez
+    otra_sesion = _refresh(client, otro).json()["refresh_token"]
+
+    r = client.put(f"/usuarios/{usuario_id}", headers={"Authorization": "Bearer " + token},
+                   json={"current_password": "x", "new_password": "y"})
+    assert r.status_code == 200
+    assert _refresh(client, refresh).status_code == 401
+    assert _refresh(client, otra_sesion).status_code == 401
@@ -0,0 +1,78 @@
+# tests/test_zonas_horarias.py
+import pytest
+
+# Ida y vuelta hora local → UTC → respuesta, a ambos lados de un cambio de
+# horario (DST), en zonas con y sin horario de verano y en los dos hemisferios.
+# Todos los días son lunes; el horario de atención es lunes 09:00-18:00 local.
+CASOS = [
+    # zona, hora local del turno, UTC esperado
+    ("America/New_York", "2030-03-04T09:30:00", "2030-03-04T14:30:00+00:00"),  # EST (-5)
+    ("America/New_York", "2030-03-11T09:30:00", "2030-03-11T13:30:00+00:00"),  # EDT (-4)
+    ("Europe/Madrid", "2030-03-25T09:30:00", "2030-03-25T08:30:00+00:00"),     # CET (+1)
+    ("Europe/Madrid", "2030-04-01T09:30:00", "2030-04-01T07:30:00+00:00"),     # CEST (+2)
+    ("Australia/Sydney", "2030-04-01T09:30:00", "2030-03-31T22:30:00+00:00"),  # AEDT (+11)
+    ("Australia/Sydney", "2030-04-08T09:30:00", "2030-04-07T23:30:00+00:00"),  # AEST (+10)
+    ("America/Argentina/Buenos_Aires", "2030-03-04T09:30:00", "2030-03-04T12:30:00+00:00"),
+]
+
+
+@pytest.fixture
+def emprendedor(client, registrar):
+    """Emprendedor en `zona` con un servicio de 30' y horario lunes 09-18 local."""
+    def _crear(zona: str):
+        headers, _ = registrar("emprendedor")
+        e_id = client.get("/emprendedores/mi", headers=headers).json()["id"]
+        r = client.put(f"/emprendedores/{e_id}", json={"zona_horaria": zona})
+        assert r.status_code == 200, r.text
+        servicio = client.post("/mis/servicios", headers=headers, json={"nombre": "corte", "duracion": 30}).json()
+        r = client.put(f"/emprendedores/{e_id}/horarios:replace", json=[
+            {"dia_semana": "lunes", "hora_inicio": "09:00", "hora_fin": "18:00"},
+        ])
+        assert r.status_code == 204, r.text
+        return servicio["id"]
+    return _crear
+
+
+def _reservar(client, registrar, servicio_id: int, fecha: str):
+    headers, _ = registrar()  # un cliente por reserva (una reserva futura por emprendimiento)
+    return client.post("/reservas/directo", headers=headers, json={
+        "servicio_id": servicio_id, "fecha_hora_inicio": fecha,
+    })
+
+
+@pytest.mark.parametrize("zona,local,utc", CASOS)
+def test_hora_local_se_guarda_y_devuelve_en_utc(client, registrar, emprendedor, zona, local, utc):
+    servicio_id = emprendedor(zona)
+    r = _reservar(client, registrar, servicio_id, local)
+    assert r.status_code == 200, r.text
+
+    turno = client.get(f"/turnos/{r.json()['turno_id']}").json()
+    assert turno["fecha_hora_inicio"] == utc
+
+
+@pytest.mark.parametrize("zona,local,utc", CASOS)
+def test_horario_de_atencion_en_hora_local(client, registrar, emprendedor, zona, local, utc):
+    servicio_id = emprendedor(zona)
+    dia = local[:10]
+    # 08:30 local queda afuera aunque en UTC caiga dentro del horario "sin zona"
+    r = _reservar(client, registrar, servicio_id, f"{dia}T08:30:00")
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Fuera del horario de atención"
+    # el último slot que entra antes de las 18:00 local
+    assert _reservar(client, registrar, servicio_id, f"{dia}T17:30:00").status_code == 200
+
+
+def test_fecha_con_offset_equivale_a_la_local(client, registrar, emprendedor):
+    servicio_id = emprendedor("America/New_York")
+    r = _reservar(client, registrar, servicio_id, "2030-03-11T10:00:00-04:00")
+    assert r.status_code == 200, r.text
+    turno = client.get(f"/turnos/{r.json()['turno_id']}").json()
+    assert turno["fecha_hora_inicio"] == "2030-03-11T14:00:00+00:00"
+
+
+def test_zona_invalida(client, registrar):
+    headers, _ = registrar("emprendedor")
+    e_id = client.get("/emprendedores/mi", headers=headers).json()["id"]
+    r = client.put(f"/emprendedores/{e_id}", json={"zona_horaria": "America/Atlantida"})
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Zona horaria inválida"